@@ -0,0 +1,405 @@
+# benchmarks/bench_load.py
+"""
+Concurrent load test of the Flask routes.
+
+Replays a weighted mix of dashboard filters, data-table pages and CSV uploads
+from --concurrency threads, each acting as one user, for --duration seconds.
+By default requests go through the Flask test client in this process against
+a copy of the database (uploads write to it, so the original is left alone);
+with --url they go over HTTP to a running server instead.
+
+An upload only queues a background import job, so each upload request also
+waits for its job (polling /imports/<job_id>): the upload latency covers the
+actual write, and a failed job counts as an error ("locked" when the
+database was locked).
+
+Run from the project root:
+
+    PYTHONPATH=src python benchmarks/bench_load.py
+    PYTHONPATH=src python benchmarks/bench_load.py --db /tmp/big.db -c 16 -d 30
+    PYTHONPATH=src python benchmarks/bench_load.py --mix dashboard=6,data=3,upload=1
+    PYTHONPATH=src python benchmarks/bench_load.py --url http://127.0.0.1:8000
+
+Per route the report lists requests, errors, "database is locked" errors,
+throughput and p50 / p95 / p99 latency.
+
+The file is named bench_*.py so pytest does not collect it.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from student_wellbeing_monitor.database import db_core
+
+DEFAULT_MIX = "dashboard=5,data=4,upload=1"
+PER_PAGE = 10  # rows per data-table page, as in ui/app.py
+JOB_TIMEOUT = 120.0  # seconds an upload waits for its import job
+
+# (route label, method, path, body) — body is a CSV for uploads
+Request = Tuple[str, str, str, Optional[bytes]]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# =========================================================
+# Request mix
+# =========================================================
+class Workload:
+    """Random requests drawn from the ids, weeks and table sizes in the DB."""
+
+    def __init__(self, db_path: str, mix: Dict[str, int], seed: int):
+        conn = sqlite3.connect(db_path)
+        try:
+            self.weeks = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT DISTINCT week FROM wellbeing ORDER BY week"
+                )
+            ] or [1]
+            self.programmes = [
+                r[0] for r in conn.execute("SELECT programme_id FROM programme")
+            ]
+            self.modules = conn.execute(
+                "SELECT module_id, programme_id FROM module"
+            ).fetchall()
+            self.students = [
+                r[0] for r in conn.execute("SELECT student_id FROM student")
+            ]
+            self.table_sizes = {
+                "students": conn.execute("SELECT COUNT(*) FROM student").fetchone()[0],
+                "wellbeing": conn.execute("SELECT COUNT(*) FROM wellbeing").fetchone()[
+                    0
+                ],
+                "attendance": conn.execute(
+                    "SELECT COUNT(*) FROM attendance"
+                ).fetchone()[0],
+                "submissions": conn.execute(
+                    "SELECT COUNT(*) FROM submission"
+                ).fetchone()[0],
+            }
+        finally:
+            conn.close()
+
+        self.kinds: List[Callable[[random.Random], Request]] = []
+        weights = []
+        for name, weight in mix.items():
+            self.kinds.append(getattr(self, f"_{name}"))
+            weights.append(weight)
+        self.weights = weights
+        self.seed = seed
+
+    def rng(self, worker: int) -> random.Random:
+        return random.Random(self.seed * 1000 + worker)
+
+    def next(self, rng: random.Random) -> Request:
+        return rng.choices(self.kinds, weights=self.weights)[0](rng)
+
+    def _week_range(self, rng: random.Random) -> str:
+        start, end = sorted(
+            rng.sample(self.weeks, 2) if len(self.weeks) > 1 else self.weeks * 2
+        )
+        return f"start_week={start}&end_week={end}"
+
+    def _dashboard(self, rng: random.Random) -> Request:
+        if rng.random() < 0.5 or not self.modules:
+            programme = rng.choice(self.programmes + [""])
+            path = (
+                f"/dashboard/wellbeing?{self._week_range(rng)}&programme_id={programme}"
+            )
+        else:
+            module_id, programme = rng.choice(self.modules)
+            module = module_id if rng.random() < 0.5 else ""
+            path = (
+                f"/dashboard/course_leader?{self._week_range(rng)}"
+                f"&programme_id={programme}&module_id={module}"
+            )
+        return ("/dashboard/<role>", "GET", path, None)
+
+    def _data(self, rng: random.Random) -> Request:
+        data_type = rng.choice(list(self.table_sizes))
+        pages = max(1, -(-self.table_sizes[data_type] // PER_PAGE))
+        path = f"/data/wellbeing/{data_type}?page={rng.randint(1, pages)}"
+        if data_type != "students" and rng.random() < 0.2 and self.students:
+            path += f"&student_id={rng.choice(self.students)}"
+        return ("/data/<role>/<data_type>", "GET", path, None)
+
+    def _upload(self, rng: random.Random) -> Request:
+        # a small weekly correction: upserts, so repeated uploads stay valid
+        lines = ["student_id,week,stress_level,hours_slept"]
+        for student in rng.sample(self.students, min(20, len(self.students))):
+            lines.append(
+                f"{student},{rng.choice(self.weeks)},{rng.randint(1, 5)},"
+                f"{rng.randint(4, 9)}"
+            )
+        return (
+            "/upload/<role>",
+            "POST",
+            "/upload/wellbeing",
+            "\n".join(lines).encode(),
+        )
+
+
+# =========================================================
+# Clients
+# =========================================================
+def _multipart(csv_bytes: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="data_type"\r\n\r\nwellbeing\r\n'
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="load.csv"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode()
+        + csv_bytes
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class FlaskClientSender:
+    """Requests through the Flask test client (one client per thread)."""
+
+    def __init__(self):
+        from student_wellbeing_monitor.ui.app import app
+
+        # exceptions reach the load generator instead of becoming bare 500s
+        app.config["PROPAGATE_EXCEPTIONS"] = True
+        self.app = app
+        self.local = threading.local()
+
+    def _client(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        return client
+
+    def send(
+        self, method: str, path: str, body: Optional[bytes]
+    ) -> Tuple[int, Optional[str]]:
+        """(status code, redirect target or None)."""
+        if method == "GET":
+            response = self._client().get(path)
+        else:
+            response = self._client().post(
+                path,
+                data={"data_type": "wellbeing", "file": (io.BytesIO(body), "load.csv")},
+                content_type="multipart/form-data",
+            )
+        return response.status_code, response.headers.get("Location")
+
+    def get_json(self, path: str) -> Dict:
+        return self._client().get(path).get_json()
+
+
+class HttpSender:
+    """Requests over HTTP to a running server."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def send(
+        self, method: str, path: str, body: Optional[bytes]
+    ) -> Tuple[int, Optional[str]]:
+        """(status code, final URL after redirects)."""
+        request = urllib.request.Request(self.base_url + path, method=method)
+        if body is not None:
+            data, content_type = _multipart(body)
+            request.data = data
+            request.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status, response.geturl()
+        except urllib.error.HTTPError as e:
+            text = e.read().decode("utf-8", "replace")
+            if "database is locked" in text:
+                raise sqlite3.OperationalError("database is locked") from e
+            return e.code, None
+
+    def get_json(self, path: str) -> Dict:
+        with urllib.request.urlopen(self.base_url + path, timeout=60) as response:
+            return json.load(response)
+
+
+def wait_for_import(sender, location: Optional[str]) -> Dict:
+    """Poll the import job an upload redirected to until it has finished."""
+    job = parse_qs(urlsplit(location or "").query).get("job", [None])[0]
+    if job is None:
+        raise RuntimeError("upload was not queued as an import job")
+    deadline = time.perf_counter() + JOB_TIMEOUT
+    while True:
+        status = sender.get_json(f"/imports/{job}")
+        if status["state"] in ("done", "failed"):
+            return status
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"import job {job} still {status['state']}")
+        time.sleep(0.02)
+
+
+def _job_locked(status: Dict) -> bool:
+    messages = [status.get("error") or ""]
+    messages += [r["error"] for r in status.get("rejects", [])]
+    return any("locked" in message for message in messages)
+
+
+# =========================================================
+# Run + report
+# =========================================================
+def run(workload: Workload, sender, concurrency: int, duration: float) -> Dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    locks: Dict[str, int] = defaultdict(int)
+    failed_jobs = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(worker: int):
+        rng = workload.rng(worker)
+        while time.perf_counter() < deadline:
+            route, method, path, body = workload.next(rng)
+            start = time.perf_counter()
+            failed = locked = False
+            try:
+                status, location = sender.send(method, path, body)
+                failed = status >= 400
+                if body is not None and not failed:
+                    # the upload is only queued: wait for the real write
+                    job = wait_for_import(sender, location)
+                    failed = job["state"] == "failed"
+                    locked = _job_locked(job)
+                    if failed:
+                        with lock:
+                            failed_jobs[0] += 1
+            except sqlite3.OperationalError as e:
+                failed = True
+                locked = "locked" in str(e)
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[route].append(elapsed)
+                errors[route] += failed
+                locks[route] += locked
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "locks": locks,
+        "failed_jobs": failed_jobs[0],
+        "wall": wall,
+    }
+
+
+def report(result: Dict) -> None:
+    wall = result["wall"]
+    print(
+        f"{'route':<28} {'reqs':>7} {'err':>5} {'locked':>7} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    total = 0
+    for route in sorted(result["latencies"]):
+        values = sorted(result["latencies"][route])
+        total += len(values)
+        print(
+            f"{route:<28} {len(values):>7} {result['errors'][route]:>5} "
+            f"{result['locks'][route]:>7} {len(values) / wall:>8.1f} "
+            f"{percentile(values, 50) * 1000:>8.1f} "
+            f"{percentile(values, 95) * 1000:>8.1f} "
+            f"{percentile(values, 99) * 1000:>8.1f}"
+        )
+    print(f"\n{total} requests in {wall:.1f}s → {total / wall:.1f} req/s overall")
+    print(f"{result['failed_jobs']} import job(s) failed")
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("dashboard", "data", "upload"):
+            raise SystemExit(f"Unknown request kind in --mix: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a weighted request mix against the web app."
+    )
+    parser.add_argument("--db", type=str, default=None, help="Benchmark SQLite file.")
+    parser.add_argument("--url", type=str, default=None, help="Running server to hit.")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Seconds.")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    source = args.db or str(db_core.DB_PATH)
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory(prefix="wellbeing-load-") as tmp:
+        if args.url:
+            # the server owns its database; only read ids from --db
+            workload = Workload(source, mix, args.seed)
+            sender = HttpSender(args.url)
+            target = args.url
+        else:
+            bench_db = Path(tmp) / "student.db"
+            # the backup API gives a consistent copy even of a live database
+            src, dst = sqlite3.connect(source), sqlite3.connect(bench_db)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            db_core.DB_PATH = bench_db
+            workload = Workload(str(bench_db), mix, args.seed)
+            sender = FlaskClientSender()
+
+            from student_wellbeing_monitor.services.import_jobs import import_jobs
+
+            import_jobs.spool_dir = Path(tmp) / "spool"
+            target = f"test client on a copy of {source}"
+
+        print(f"target: {target}")
+        print(
+            f"mix: {mix}  concurrency: {args.concurrency}  duration: {args.duration}s\n"
+        )
+        # the read layer prints its SQL; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(workload, sender, args.concurrency, args.duration)
+            if not args.url:
+                import_jobs.stop()
+        report(result)
+
+
+if __name__ == "__main__":
+    main()
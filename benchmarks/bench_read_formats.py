@@ -0,0 +1,95 @@
+# benchmarks/bench_read_formats.py
+"""
+Peak memory and time of the analytic read path, tuples vs columns.
+
+Run from the project root (uses database/student.db unless --db is given):
+
+    PYTHONPATH=src python benchmarks/bench_read_formats.py
+    PYTHONPATH=src python benchmarks/bench_read_formats.py --db /tmp/big.db --repeat 10
+
+For each case the script reports the best wall time over --repeat runs and the
+peak traced allocation (tracemalloc) of a single run.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from student_wellbeing_monitor.database import db_core
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """(best seconds, peak bytes) for fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_cases(cases: List[Tuple[str, Callable[[], object]]], repeat: int) -> None:
+    print(f"{'case':<46} {'best ms':>10} {'peak KiB':>10}")
+    for name, fn in cases:
+        # the read layer prints its SQL; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            best, peak = measure(fn, repeat)
+        print(f"{name:<46} {best * 1000:>10.2f} {peak / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark tuple vs columnar results of the analytic reads."
+    )
+    parser.add_argument("--db", type=str, default=None, help="SQLite file to use.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case.")
+    args = parser.parse_args()
+
+    if args.db:
+        db_core.DB_PATH = args.db
+
+    from student_wellbeing_monitor.database.read import (
+        programme_wellbeing_engagement,
+    )
+    from student_wellbeing_monitor.services.course_service import CourseService
+
+    service = CourseService()
+    rows = programme_wellbeing_engagement()
+    cols = programme_wellbeing_engagement(as_columns=True)
+    programme_id = cols.value_at("programme_id", 0) if len(cols) else None
+
+    print(f"database: {db_core.DB_PATH}")
+    print(f"engagement rows: {len(rows)}  columnar bytes: {cols.nbytes}\n")
+
+    run_cases(
+        [
+            ("read: engagement as tuples", programme_wellbeing_engagement),
+            (
+                "read: engagement as columns",
+                lambda: programme_wellbeing_engagement(as_columns=True),
+            ),
+            (
+                "service: get_programme_wellbeing_engagement",
+                service.get_programme_wellbeing_engagement,
+            ),
+            (
+                "service: high_stress_sleep_engagement",
+                lambda: service.get_high_stress_sleep_engagement_analysis(programme_id),
+            ),
+        ],
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# cohort.py
+"""
+Lifecycle of the per-academic-year databases routed by db_core.
+
+  create_cohort("2025-26")               → new empty database (status "open")
+  create_cohort("2024-25", source=path)  → adopt an existing file
+  activate_cohort("2025-26")             → make it the live database
+  close_cohort("2024-25")                → index, analyse, compact, read-only
+
+Only the active cohort takes everyday writes, so it stays small however many
+past years are kept; past years are still queryable through
+db_core.get_conn(cohort=...) and db_core.open_cohorts(...).
+"""
+
+import os
+import re
+import sqlite3
+import stat
+import time
+from pathlib import Path
+from typing import Optional
+
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.database.schema import init_db_schema
+
+_COHORT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+# read paths of finished years scan by week and by module; a closed file is
+# never written again, so these indexes cost nothing after close
+CLOSED_COHORT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_wellbeing_week ON wellbeing (week, student_id)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_week ON attendance (week, module_id)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_module ON attendance (module_id, week)",
+    "CREATE INDEX IF NOT EXISTS idx_submission_module ON submission (module_id)",
+)
+
+
+def create_cohort(
+    cohort_id: str, source: Optional[str] = None, activate: bool = False
+) -> Path:
+    """
+    Register a cohort and create its database file.
+
+    source: copy an existing database (e.g. the pre-cohort student.db) with
+    the SQLite backup API instead of starting empty.
+    """
+    if not _COHORT_ID.match(cohort_id):
+        raise ValueError(f"Invalid cohort id: {cohort_id!r}")
+    if cohort_id in db_core.get_cohorts():
+        raise ValueError(f"Cohort {cohort_id} already exists")
+
+    path = db_core.cohort_db_path(cohort_id)
+    if path.exists():
+        raise ValueError(f"{path} already exists")
+
+    target = sqlite3.connect(path)
+    try:
+        if source is not None:
+            origin = sqlite3.connect(source)
+            try:
+                origin.backup(target)
+            finally:
+                origin.close()
+    finally:
+        target.close()
+
+    registry = db_core.get_registry_conn()
+    try:
+        registry.execute(
+            "INSERT INTO cohort (cohort_id, db_file, status, created_at) "
+            "VALUES (?, ?, 'open', ?)",
+            (cohort_id, path.name, time.time()),
+        )
+        registry.commit()
+    finally:
+        registry.close()
+
+    # tables that are missing (all of them for a new file) are created
+    init_db_schema(cohort=cohort_id)
+
+    if activate:
+        activate_cohort(cohort_id)
+    return path
+
+
+def activate_cohort(cohort_id: str) -> None:
+    """
+    Make ``cohort_id`` the live database. Takes effect in this process at
+    once; running servers pick it up on restart.
+    """
+    cohorts = db_core.get_cohorts()
+    if cohort_id not in cohorts:
+        raise ValueError(f"Unknown cohort: {cohort_id}")
+    if cohorts[cohort_id]["status"] == "closed":
+        raise ValueError(f"Cohort {cohort_id} is closed (read-only)")
+
+    registry = db_core.get_registry_conn()
+    try:
+        registry.execute("UPDATE cohort SET status = 'open' WHERE status = 'active'")
+        registry.execute(
+            "UPDATE cohort SET status = 'active' WHERE cohort_id = ?", (cohort_id,)
+        )
+        registry.commit()
+    finally:
+        registry.close()
+    db_core.DB_PATH = db_core.cohort_db_path(cohort_id)
+
+
+def close_cohort(cohort_id: str, index: bool = True, compact: bool = True) -> None:
+    """
+    Freeze a finished academic year:
+      - index: add the read-side indexes in CLOSED_COHORT_INDEXES
+      - compact: VACUUM the file (after ANALYZE, so the planner stats stay)
+    then mark it closed and drop write permission on the file. Every later
+    connection opens it read-only.
+    """
+    cohorts = db_core.get_cohorts()
+    if cohort_id not in cohorts:
+        raise ValueError(f"Unknown cohort: {cohort_id}")
+    status = cohorts[cohort_id]["status"]
+    if status == "active":
+        raise ValueError(f"Cohort {cohort_id} is active; activate another one first")
+    if status == "closed":
+        return
+
+    conn = db_core.get_conn(cohort=cohort_id)
+    try:
+        if index:
+            for ddl in CLOSED_COHORT_INDEXES:
+                conn.execute(ddl)
+            conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+        if compact:
+            conn.execute("VACUUM")
+        # read-only opens of a WAL file need a writable -shm next to it
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+
+    registry = db_core.get_registry_conn()
+    try:
+        registry.execute(
+            "UPDATE cohort SET status = 'closed', closed_at = ? WHERE cohort_id = ?",
+            (time.time(), cohort_id),
+        )
+        registry.commit()
+    finally:
+        registry.close()
+
+    path = db_core.cohort_db_path(cohort_id)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+
+def reopen_cohort(cohort_id: str) -> None:
+    """Undo close_cohort's read-only mark (e.g. to correct late data)."""
+    cohorts = db_core.get_cohorts()
+    if cohorts.get(cohort_id) is None or cohorts[cohort_id]["status"] != "closed":
+        raise ValueError(f"Cohort {cohort_id} is not closed")
+
+    path = db_core.cohort_db_path(cohort_id)
+    os.chmod(path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    registry = db_core.get_registry_conn()
+    try:
+        registry.execute(
+            "UPDATE cohort SET status = 'open', closed_at = NULL WHERE cohort_id = ?",
+            (cohort_id,),
+        )
+        registry.commit()
+    finally:
+        registry.close()
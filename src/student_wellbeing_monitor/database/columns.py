@@ -0,0 +1,122 @@
+# columns.py
+"""
+Column-oriented result container for the analytic read functions.
+
+A ColumnarRows holds one NumPy array per column instead of one tuple per row:
+  - "code"     → int32 index into a per-column list of distinct values
+                 (ids, names, status strings; NULL is just another value)
+  - "int8"     → small integers, NULL stored as NULL_INT
+  - "int16"    → weeks and other counters, NULL stored as NULL_INT
+  - "float64"  → measurements and grades, NULL stored as NaN
+
+Services aggregate over the arrays with masks and np.bincount, so no Python
+object is created per row.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NULL_INT = -1
+
+_DTYPES = {
+    "code": np.int32,
+    "int8": np.int8,
+    "int16": np.int16,
+    "float64": np.float64,
+}
+
+
+class ColumnarRows:
+    __slots__ = ("names", "kinds", "_arrays", "_pending", "_values")
+
+    def __init__(self, spec: Sequence[Tuple[str, str]]):
+        self.names: Tuple[str, ...] = tuple(name for name, _kind in spec)
+        self.kinds: Dict[str, str] = dict(spec)
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=_DTYPES[kind]) for name, kind in spec
+        }
+        # chunks appended since the last access, joined once on demand
+        self._pending: Dict[str, List[np.ndarray]] = {name: [] for name in self.names}
+        # per "code" column: (distinct values, {value: code})
+        self._values: Dict[str, Tuple[List[Any], Dict[Any, int]]] = {
+            name: ([], {}) for name, kind in spec if kind == "code"
+        }
+
+    @classmethod
+    def from_rows(
+        cls, spec: Sequence[Tuple[str, str]], rows: Iterable[Sequence]
+    ) -> "ColumnarRows":
+        """Build a container from tuples laid out in ``spec`` order."""
+        result = cls(spec)
+        result.extend(list(rows))
+        return result
+
+    def extend(self, rows: List[Sequence]) -> None:
+        """Append a chunk of row tuples (e.g. one cursor.fetchmany())."""
+        if not rows:
+            return
+        for name, raw in zip(self.names, zip(*rows)):
+            kind = self.kinds[name]
+            if kind == "code":
+                values, codes = self._values[name]
+                # setdefault hands out the next code to unseen values
+                chunk = np.fromiter(
+                    (codes.setdefault(v, len(codes)) for v in raw),
+                    dtype=np.int32,
+                    count=len(raw),
+                )
+                values.extend(list(codes)[len(values) :])
+            elif kind == "float64":
+                chunk = np.array(raw, dtype=np.float64)  # None → NaN
+            else:
+                chunk = np.array(
+                    [NULL_INT if v is None else v for v in raw], dtype=_DTYPES[kind]
+                )
+            self._pending[name].append(chunk)
+
+    def _column(self, name: str) -> np.ndarray:
+        pending = self._pending[name]
+        if pending:
+            self._arrays[name] = np.concatenate([self._arrays[name], *pending])
+            pending.clear()
+        return self._arrays[name]
+
+    # -------------------------------------------------
+    # access
+    # -------------------------------------------------
+    def __len__(self) -> int:
+        return int(self._column(self.names[0]).shape[0]) if self.names else 0
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """The raw array of a column (codes for "code" columns)."""
+        return self._column(name)
+
+    def values(self, name: str) -> List[Any]:
+        """Distinct values of a "code" column, indexed by code."""
+        return self._values[name][0]
+
+    def code_of(self, name: str, value: Any) -> Optional[int]:
+        """Code of ``value`` in a "code" column, or None if it never occurs."""
+        return self._values[name][1].get(value)
+
+    def equals(self, name: str, value: Any) -> np.ndarray:
+        """Boolean mask of the rows whose "code" column holds ``value``."""
+        code = self.code_of(name, value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self._column(name) == code
+
+    def value_at(self, name: str, index: int) -> Any:
+        """Decoded value of one cell (None for NULL)."""
+        cell = self._column(name)[index]
+        kind = self.kinds[name]
+        if kind == "code":
+            return self._values[name][0][int(cell)]
+        if kind == "float64":
+            return None if np.isnan(cell) else float(cell)
+        return None if cell == NULL_INT else int(cell)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._column(name).nbytes for name in self.names)
@@ -1,75 +1,73 @@
 # create.py
-from student_wellbeing_monitor.database.db_core import _hash_pwd, get_conn
+from student_wellbeing_monitor.database.db_core import _hash_pwd, bump_data_version
+from student_wellbeing_monitor.database.risk_state import refresh_risk_state
+from student_wellbeing_monitor.database.student_features import (
+    refresh_student_features,
+)
+from student_wellbeing_monitor.database.writer import write_op
+
+# Every helper runs on the single writer (see writer.py): call it to wait for
+# the new row id, or use ``.submit(...)`` to get a Future.
 
 # ================= Programme (Create) ==================
 
 
+@write_op
 def insert_programme(
+    cur,
     programme_id,
     programme_name,
     programme_code,
 ):
     """Create a new programme."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO programme (programme_id, programme_name, programme_code) VALUES (?, ?, ?)",
         (programme_id, programme_name, programme_code),
     )
-    conn.commit()
-    sid = cur.lastrowid
-    conn.close()
-    return sid
+    bump_data_version(cur, "programme")
+    return cur.lastrowid
 
 
 # ================== Student  (Create) ==================
+@write_op
 def insert_student(
+    cur,
     student_id,
     name,
     programme_id,
     email=None,
 ):
     """Create a new student."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO student (student_id, name, email,programme_id) VALUES (?, ?, ?,?)",
         (student_id, name, email, programme_id),
     )
-    conn.commit()
-    sid = cur.lastrowid
-    conn.close()
-    return sid
+    bump_data_version(cur, "student")
+    return cur.lastrowid
 
 
 # ================== Module  (Create) ==================
-def insert_module(module_id: str, module_name, module_code, programme_id):
+@write_op
+def insert_module(cur, module_id: str, module_name, module_code, programme_id):
     """Create a new module."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO module (module_id, module_name, module_code, programme_id) VALUES (?, ?, ?, ?)",
         (module_id, module_name, module_code, programme_id),
     )
-    conn.commit()
-    sid = cur.lastrowid
-    conn.close()
-    return sid
+    bump_data_version(cur, "module")
+    return cur.lastrowid
 
 
 # ================== Student - Module  (Create) ==================
 
 
-def insert_student_module(student_id: str, module_id: str):
+@write_op
+def insert_student_module(cur, student_id: str, module_id: str):
     """
     Insert a record into student_module table.
     Only student_id and module_id are required,
     because id is AUTOINCREMENT.
     """
-
-    conn = get_conn()
-    cur = conn.cursor()
-
     cur.execute(
         """
         INSERT INTO student_module (student_id, module_id)
@@ -77,52 +75,49 @@ def insert_student_module(student_id: str, module_id: str):
         """,
         (student_id, module_id),
     )
-
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+    refresh_student_features(cur, [student_id])
+    bump_data_version(cur, "student_module")
+    return cur.lastrowid
 
 
 # ================== Wellbeing (Create) ==================
 
 
-def insert_wellbeing(student_id, week, stress_level, hours_slept, comment=None):
+@write_op
+def insert_wellbeing(cur, student_id, week, stress_level, hours_slept, comment=None):
     """Create a wellbeing record."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO wellbeing (student_id, week, stress_level, hours_slept, comment) "
         "VALUES (?, ?, ?, ?, ?)",
         (student_id, week, stress_level, hours_slept, comment),
     )
-    conn.commit()
-    wid = cur.lastrowid
-    conn.close()
-    return wid
+    refresh_risk_state(cur, [student_id])
+    refresh_student_features(cur, [student_id])
+    bump_data_version(cur, "wellbeing")
+    return cur.lastrowid
 
 
 # ================== Attendance (Create) ==================
 
 
-def insert_attendance(student_id, module_id, week, status, session_number=1):
+@write_op
+def insert_attendance(cur, student_id, module_id, week, status, session_number=1):
     """status: 1 present / 0 absent"""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO attendance (student_id, module_id, week, status, session_number) VALUES (?, ?, ?, ? ,?)",
         (student_id, module_id, week, status, session_number),
     )
-    conn.commit()
-    aid = cur.lastrowid
-    conn.close()
-    return aid
+    refresh_student_features(cur, [student_id])
+    bump_data_version(cur, "attendance")
+    return cur.lastrowid
 
 
 # ================== Assignment / Submission (Create) ==================
 
 
+@write_op
 def insert_submission(
+    cur,
     student_id,
     module_id,
     due_date,
@@ -132,8 +127,6 @@ def insert_submission(
     assignment_no=1,
 ):
     """Create a submission record."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         """
         INSERT INTO submission (
@@ -143,28 +136,187 @@ def insert_submission(
         """,
         (student_id, module_id, assignment_no, submitted, grade, due_date, submit_date),
     )
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+    refresh_student_features(cur, [student_id])
+    bump_data_version(cur, "submission")
+    return cur.lastrowid
 
 
 # ================== User & Roles (Create) ==================
 # TODO： Authority Control
 
 
-def create_user(username, password, role):
+@write_op
+def create_user(cur, username, password, role):
     """
     role: 'swo' = wellbeing officer
         'cd'  = course director
     """
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
         (username, _hash_pwd(password), role),
     )
-    conn.commit()
-    uid = cur.lastrowid
-    conn.close()
-    return uid
+    return cur.lastrowid
+
+
+# ================== Bulk upsert (Import) ==================
+# Re-importing a corrected weekly file must not trip the UNIQUE keys halfway.
+# Each bulk helper writes a whole file as one writer operation (one savepoint:
+# all rows or none) and upserts on the table's natural key:
+#   mode="upsert"     → changed rows are updated, identical rows left alone
+#   mode="insert_new" → existing rows are kept as they are
+# An identical re-upload changes nothing, not even the data_version stamps.
+IMPORT_MODES = ("upsert", "insert_new")
+
+# table → (insert columns, conflict key, updated columns, columns kept when NULL)
+_UPSERT_SPECS = {
+    "wellbeing": (
+        ("student_id", "week", "stress_level", "hours_slept", "comment"),
+        ("student_id", "week"),
+        ("stress_level", "hours_slept", "comment"),
+        ("comment",),
+    ),
+    "attendance": (
+        ("student_id", "module_id", "week", "session_number", "status"),
+        ("student_id", "module_id", "week", "session_number"),
+        ("status",),
+        (),
+    ),
+    "submission": (
+        (
+            "student_id",
+            "module_id",
+            "assignment_no",
+            "submitted",
+            "grade",
+            "due_date",
+            "submit_date",
+        ),
+        ("student_id", "module_id", "assignment_no"),
+        ("submitted", "grade", "due_date", "submit_date"),
+        (),
+    ),
+}
+
+
+def _upsert_sql(table: str, mode: str) -> str:
+    columns, key, updated, keep_if_null = _UPSERT_SPECS[table]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT({', '.join(key)}) "
+    )
+    if mode == "insert_new":
+        return sql + "DO NOTHING RETURNING id"
+
+    new = {
+        col: (
+            f"COALESCE(excluded.{col}, {col})"
+            if col in keep_if_null
+            else f"excluded.{col}"
+        )
+        for col in updated
+    }
+    assignments = ", ".join(f"{col} = {value}" for col, value in new.items())
+    changed = " OR ".join(f"{col} IS NOT {value}" for col, value in new.items())
+    return sql + f"DO UPDATE SET {assignments} WHERE {changed} RETURNING id"
+
+
+def _upsert_rows(cur, table: str, rows, mode: str):
+    """
+    Upsert ``rows`` (tuples in the spec's column order) into ``table``.
+    Returns ({"inserted": n, "updated": n, "unchanged": n}, touched student ids).
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+
+    sql = _upsert_sql(table, mode)
+    max_id = cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    inserted_ids = set()
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    touched = set()
+
+    for row in rows:
+        hit = cur.execute(sql, tuple(row)).fetchone()
+        if hit is None:
+            counts["unchanged"] += 1
+            continue
+        # a row id beyond the old maximum was created by this import
+        if hit[0] > max_id and hit[0] not in inserted_ids:
+            inserted_ids.add(hit[0])
+            counts["inserted"] += 1
+        else:
+            counts["updated"] += 1
+        touched.add(row[0])
+
+    if counts["updated"]:
+        bump_data_version(cur, table, rewrite=True)
+    elif counts["inserted"]:
+        bump_data_version(cur, table)
+    return counts, touched
+
+
+@write_op
+def upsert_wellbeing(cur, rows, mode="upsert"):
+    """
+    rows: [(student_id, week, stress_level, hours_slept, comment), ...]
+    A NULL comment keeps the stored one.
+    """
+    counts, touched = _upsert_rows(cur, "wellbeing", rows, mode)
+    refresh_risk_state(cur, touched)
+    refresh_student_features(cur, touched)
+    return counts
+
+
+@write_op
+def upsert_attendance(cur, rows, mode="upsert"):
+    """rows: [(student_id, module_id, week, session_number, status), ...]"""
+    counts, touched = _upsert_rows(cur, "attendance", rows, mode)
+    refresh_student_features(cur, touched)
+    return counts
+
+
+@write_op
+def upsert_submissions(cur, rows, mode="upsert"):
+    """
+    rows: [(student_id, module_id, assignment_no,
+            submitted, grade, due_date, submit_date), ...]
+    """
+    counts, touched = _upsert_rows(cur, "submission", rows, mode)
+    refresh_student_features(cur, touched)
+    return counts
+
+
+@write_op
+def insert_many(cur, table: str, rows, refresh: bool = True) -> int:
+    """
+    Plain bulk INSERT (executemany) for seeding empty tables: rows are tuples
+    in the column order of the table's upsert spec above. Returns the count.
+    With refresh=False the risk state and features of the touched students
+    are left to the caller (see refresh_students), e.g. to refresh them once
+    after many batches instead of once per batch.
+    """
+    columns, _key, _updated, _keep = _UPSERT_SPECS[table]
+    rows = list(rows)
+    cur.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        rows,
+    )
+    if refresh:
+        touched = {row[0] for row in rows}
+        if table == "wellbeing":
+            refresh_risk_state(cur, touched)
+        refresh_student_features(cur, touched)
+    bump_data_version(cur, table)
+    return len(rows)
+
+
+@write_op
+def refresh_students(cur, student_ids, wellbeing_ids=()) -> None:
+    """
+    Refresh the features of ``student_ids`` and the risk state of
+    ``wellbeing_ids`` (students whose wellbeing rows changed), after
+    insert_many(..., refresh=False).
+    """
+    refresh_risk_state(cur, wellbeing_ids)
+    refresh_student_features(cur, student_ids)
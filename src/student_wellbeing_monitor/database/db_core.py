@@ -1,20 +1,236 @@
 # db_core.py
 import hashlib
+import os
 import sqlite3
+import time
 from pathlib import Path
+from typing import Dict, Optional, Sequence
 
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 
-DB_PATH = PROJECT_ROOT / "database" / "student.db"
+DB_DIR = PROJECT_ROOT / "database"
+LEGACY_DB_PATH = DB_DIR / "student.db"
 
 
-def get_conn(row_factory=sqlite3.Row):
-    conn = sqlite3.connect(DB_PATH)
+# ================== Cohort routing ==================
+# One SQLite file per academic year (cohort), listed in a small registry:
+#   COHORT_REGISTRY / cohort(cohort_id, db_file, status, ...)
+#   status: "active" → the live database every get_conn() uses
+#           "open"   → writable, but not the default
+#           "closed" → finished year, opened read-only
+# Without a registry (or an active cohort) everything uses student.db.
+# WELLBEING_COHORT=<cohort_id> overrides the active cohort for one process.
+COHORT_REGISTRY = DB_DIR / "cohorts.db"
+MAX_ATTACHED_COHORTS = 10  # SQLite's default SQLITE_MAX_ATTACHED
+
+_COHORT_REGISTRY_DDL = """
+    CREATE TABLE IF NOT EXISTS cohort (
+        cohort_id   TEXT PRIMARY KEY,          -- academic year, e.g. 2024-25
+        db_file     TEXT NOT NULL,             -- relative to the registry
+        status      TEXT NOT NULL CHECK(status IN ('active', 'open', 'closed')),
+        created_at  REAL NOT NULL,
+        closed_at   REAL
+    )
+"""
+
+
+def cohort_db_path(cohort_id: str) -> Path:
+    """File of a cohort: student_<cohort_id>.db next to the registry."""
+    return Path(COHORT_REGISTRY).parent / f"student_{cohort_id}.db"
+
+
+def get_registry_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(COHORT_REGISTRY)
+    conn.row_factory = sqlite3.Row
+    conn.execute(_COHORT_REGISTRY_DDL)
+    return conn
+
+
+def get_cohorts() -> Dict[str, sqlite3.Row]:
+    """{cohort_id: registry row}, oldest first; {} without a registry."""
+    if not Path(COHORT_REGISTRY).exists():
+        return {}
+    conn = get_registry_conn()
+    try:
+        rows = conn.execute("SELECT * FROM cohort ORDER BY cohort_id").fetchall()
+    finally:
+        conn.close()
+    return {row["cohort_id"]: row for row in rows}
+
+
+def get_active_cohort() -> Optional[str]:
+    override = os.environ.get("WELLBEING_COHORT")
+    if override:
+        return override
+    for cohort_id, row in get_cohorts().items():
+        if row["status"] == "active":
+            return cohort_id
+    return None
+
+
+def resolve_db_path() -> Path:
+    """Path of the live database: the active cohort's file, else student.db."""
+    cohort_id = get_active_cohort()
+    if cohort_id is None:
+        return LEGACY_DB_PATH
+    return cohort_db_path(cohort_id)
+
+
+DB_PATH = resolve_db_path()
+
+
+def _cohort_uri(cohort_id: str, read_only: bool) -> str:
+    uri = cohort_db_path(cohort_id).resolve().as_uri()
+    return uri + ("?mode=ro" if read_only else "?mode=rw")
+
+
+def get_conn(row_factory=sqlite3.Row, cohort: Optional[str] = None):
+    """
+    Connection to the live database, or to ``cohort``'s file when given.
+    Closed cohorts are opened read-only.
+    """
+    if cohort is None:
+        conn = sqlite3.connect(DB_PATH)
+    else:
+        row = get_cohorts().get(cohort)
+        if row is None:
+            raise ValueError(f"Unknown cohort: {cohort}")
+        conn = sqlite3.connect(
+            _cohort_uri(cohort, read_only=row["status"] == "closed"), uri=True
+        )
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.row_factory = row_factory
     return conn
 
 
+def open_cohorts(cohort_ids: Sequence[str], row_factory=sqlite3.Row):
+    """
+    In-memory connection with each cohort ATTACHed read-only, for queries
+    comparing years. Return (conn, {cohort_id: schema alias}); the alias
+    qualifies table names, e.g. f"{alias}.wellbeing".
+    """
+    cohorts = get_cohorts()
+    unknown = [cid for cid in cohort_ids if cid not in cohorts]
+    if unknown:
+        raise ValueError(f"Unknown cohort(s): {', '.join(unknown)}")
+    if len(cohort_ids) > MAX_ATTACHED_COHORTS:
+        raise ValueError(f"At most {MAX_ATTACHED_COHORTS} cohorts can be compared")
+
+    conn = sqlite3.connect("file::memory:", uri=True)
+    conn.row_factory = row_factory
+    aliases: Dict[str, str] = {}
+    for i, cohort_id in enumerate(dict.fromkeys(cohort_ids)):
+        alias = f"cohort_{i}"
+        conn.execute(
+            f"ATTACH DATABASE ? AS {alias}", (_cohort_uri(cohort_id, read_only=True),)
+        )
+        aliases[cohort_id] = alias
+    return conn, aliases
+
+
+# ================== Analytics snapshot ==================
+# Optional read replica for the analytic queries in read.py, copied from the
+# live file by services/analytics_snapshot.py with the online backup API.
+# The replica's mtime is set to the moment its copy started, so its age is
+# an upper bound on how far it lags behind the live database.
+ANALYTICS_SNAPSHOT = os.environ.get("WELLBEING_ANALYTICS_SNAPSHOT", "") == "1"
+ANALYTICS_MAX_STALENESS = float(os.environ.get("WELLBEING_ANALYTICS_STALENESS", 60))
+
+
+def analytics_db_path() -> Path:
+    """Replica next to the live file: student.db → student.analytics.db."""
+    path = Path(DB_PATH)
+    return path.with_name(f"{path.stem}.analytics{path.suffix}")
+
+
+def snapshot_time() -> Optional[float]:
+    """
+    Start time of the replica copy the analytic reads use right now, or None
+    when they go to the live database (snapshot mode off, or the replica is
+    missing or older than ANALYTICS_MAX_STALENESS seconds).
+    """
+    if not ANALYTICS_SNAPSHOT:
+        return None
+    try:
+        copied_at = os.path.getmtime(analytics_db_path())
+    except OSError:
+        return None
+    if time.time() - copied_at > ANALYTICS_MAX_STALENESS:
+        return None
+    return copied_at
+
+
+def get_analytics_conn(row_factory=sqlite3.Row):
+    """Connection for analytic reads: the replica (read-only) or the live file."""
+    if snapshot_time() is None:
+        return get_conn(row_factory)
+    conn = sqlite3.connect(
+        analytics_db_path().resolve().as_uri() + "?mode=ro", uri=True
+    )
+    conn.row_factory = row_factory
+    return conn
+
+
 def _hash_pwd(pwd: str) -> str:
     """Simple SHA-256 password hashing."""
     return hashlib.sha256(pwd.encode("utf-8")).hexdigest()
+
+
+# ================== Data version ==================
+# One row per table, bumped by every write in create / update / delete.
+#   version          → any change (insert, update, delete)
+#   rewrite_version  → existing rows changed or removed; caches that only
+#                      append new rows by id must reload instead
+#   updated_at       → unix time of the last write
+_DATA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS data_version (
+        table_name       TEXT PRIMARY KEY,
+        version          INTEGER NOT NULL DEFAULT 0,
+        rewrite_version  INTEGER NOT NULL DEFAULT 0,
+        updated_at       REAL NOT NULL
+    )
+"""
+
+
+def bump_data_version(cur, *tables: str, rewrite: bool = False) -> None:
+    """
+    Record a write to ``tables`` in the caller's transaction.
+
+    Call it before the caller commits, so the stamp changes in the same
+    transaction as the data it describes. The statements run on a sibling
+    cursor, so the caller's ``cur.lastrowid`` is left untouched.
+    """
+    cur = cur.connection.cursor()
+    cur.execute(_DATA_VERSION_DDL)
+    now = time.time()
+    for table in tables:
+        cur.execute(
+            """
+            INSERT INTO data_version (table_name, version, rewrite_version, updated_at)
+            VALUES (?, 1, ?, ?)
+            ON CONFLICT(table_name) DO UPDATE SET
+                version = version + 1,
+                rewrite_version = rewrite_version + excluded.rewrite_version,
+                updated_at = excluded.updated_at
+            """,
+            (table, 1 if rewrite else 0, now),
+        )
+
+
+def get_data_versions() -> dict:
+    """
+    Return {table_name: (version, rewrite_version, updated_at)}.
+
+    Databases created before the data_version table existed return {} until
+    their first write.
+    """
+    conn = get_conn(row_factory=None)
+    try:
+        rows = conn.execute(
+            "SELECT table_name, version, rewrite_version, updated_at FROM data_version"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return {name: (version, rewrite, ts) for name, version, rewrite, ts in rows}
@@ -1,53 +1,174 @@
 # delete.py
-from student_wellbeing_monitor.database.db_core import get_conn
+from student_wellbeing_monitor.database.db_core import bump_data_version, get_conn
+from student_wellbeing_monitor.database.risk_state import clear_risk_state
+from student_wellbeing_monitor.database.student_features import (
+    clear_student_features,
+    refresh_student_features,
+)
+from student_wellbeing_monitor.database.writer import write_op
 
 
-def delete_student(student_id: str):
+@write_op
+def delete_student(cur, student_id: str):
     """Permanently delete a student."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute("DELETE FROM students WHERE student_id = ?", (student_id,))
-    conn.commit()
-    conn.close()
+    bump_data_version(cur, "student", rewrite=True)
     print(f"Student {student_id} and all related records have been deleted")
 
 
-def delete_all_students():
-    conn = get_conn()
-    cur = conn.cursor()
+@write_op
+def delete_all_students(cur):
     cur.execute("DELETE FROM student")
-    conn.commit()
-    conn.close()
+    bump_data_version(cur, "student", rewrite=True)
 
 
-def delete_all_wellbeing():
-    conn = get_conn()
-    cur = conn.cursor()
+@write_op
+def delete_all_wellbeing(cur):
     cur.execute("DELETE FROM wellbeing")
-    conn.commit()
-    conn.close()
+    clear_risk_state(cur)
+    refresh_student_features(cur)
+    bump_data_version(cur, "wellbeing", rewrite=True)
 
 
-def delete_all_attendance():
-    conn = get_conn()
-    cur = conn.cursor()
+@write_op
+def delete_all_attendance(cur):
     cur.execute("DELETE FROM attendance")
-    conn.commit()
-    conn.close()
+    refresh_student_features(cur)
+    bump_data_version(cur, "attendance", rewrite=True)
 
 
-def delete_all_submissions():
-    conn = get_conn()
-    cur = conn.cursor()
+@write_op
+def delete_all_submissions(cur):
     cur.execute("DELETE FROM submission")
-    conn.commit()
-    conn.close()
+    refresh_student_features(cur)
+    bump_data_version(cur, "submission", rewrite=True)
 
 
-def delete_all_student_modules():
+@write_op
+def delete_all_student_modules(cur):
     """Delete all rows from the student_module junction table."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute("DELETE FROM student_module")
-    conn.commit()
+    refresh_student_features(cur)
+    bump_data_version(cur, "student_module", rewrite=True)
+
+
+# ================== Bulk purge (archive) ==================
+
+# Tables that reference student.student_id, purged before the parent rows.
+STUDENT_CHILD_TABLES = ("wellbeing", "attendance", "submission", "student_module")
+
+
+def purge_student_data(chunk_size: int = 500, reclaim: bool = True) -> dict:
+    """
+    Delete every student together with all of their records.
+
+    Students are removed in batches of ``chunk_size``; each batch deletes the
+    student rows and their wellbeing / attendance / submission / student_module
+    rows in a single writer operation. A crash therefore never leaves a student
+    half-deleted, and other queued writes get their turn between batches so
+    the web app can keep reading and writing while the purge runs.
+
+    When ``reclaim`` is True the freed pages are handed back to the file system
+    afterwards (see ``reclaim_free_pages``).
+
+    return:
+        {
+          "deleted": {"wellbeing": 120, ..., "student": 30},
+          "freed_pages": 42
+        }
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+
+    deleted = {table: 0 for table in (*STUDENT_CHILD_TABLES, "student")}
+    conn = get_conn()
+    pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
     conn.close()
+
+    # 1) students + everything that belongs to them, one batch at a time
+    while True:
+        removed = _purge_student_chunk(chunk_size)
+        if removed is None:
+            break
+        for table, count in removed.items():
+            deleted[table] += count
+
+    # 2) sweep child rows that no longer point at a student (e.g. inserted
+    #    while foreign keys were off), using the same bounded chunks
+    for table in STUDENT_CHILD_TABLES:
+        while True:
+            removed = _purge_orphan_chunk(table, chunk_size)
+            if removed <= 0:
+                break
+            deleted[table] += removed
+
+    freed_pages = 0
+    if reclaim:
+        conn = get_conn()
+        try:
+            reclaim_free_pages(conn)
+            pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            conn.close()
+        freed_pages = max(0, pages_before - pages_after)
+
+    return {"deleted": deleted, "freed_pages": freed_pages}
+
+
+@write_op
+def _purge_student_chunk(cur, chunk_size: int):
+    """Delete up to ``chunk_size`` students and their rows; None when done."""
+    ids = [
+        r[0]
+        for r in cur.execute(
+            "SELECT student_id FROM student LIMIT ?", (chunk_size,)
+        ).fetchall()
+    ]
+    if not ids:
+        return None
+
+    removed = {}
+    placeholders = ",".join("?" * len(ids))
+    for table in STUDENT_CHILD_TABLES:
+        cur.execute(f"DELETE FROM {table} WHERE student_id IN ({placeholders})", ids)
+        removed[table] = cur.rowcount
+    cur.execute(f"DELETE FROM student WHERE student_id IN ({placeholders})", ids)
+    removed["student"] = cur.rowcount
+    clear_risk_state(cur, ids)
+    clear_student_features(cur, ids)
+    bump_data_version(cur, *STUDENT_CHILD_TABLES, "student", rewrite=True)
+    return removed
+
+
+@write_op
+def _purge_orphan_chunk(cur, table: str, chunk_size: int) -> int:
+    cur.execute(
+        f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} LIMIT ?)",
+        (chunk_size,),
+    )
+    removed = cur.rowcount
+    if removed > 0:
+        bump_data_version(cur, table, rewrite=True)
+    return removed
+
+
+def reclaim_free_pages(conn, pages_per_step: int = 256) -> None:
+    """
+    Return free pages to the file system.
+
+    Databases created by ``init_db_schema`` use ``auto_vacuum = INCREMENTAL``,
+    so the free list is released a few pages at a time with
+    ``PRAGMA incremental_vacuum`` and never blocks writers for long. Older files
+    still in ``auto_vacuum = NONE`` are switched to incremental mode, which
+    needs one full VACUUM; after a purge the file is small, so this is cheap.
+    """
+    cur = conn.cursor()
+    auto_vacuum = cur.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+    if auto_vacuum != 2:  # 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cur.execute("VACUUM")
+        return
+
+    while cur.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+        cur.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
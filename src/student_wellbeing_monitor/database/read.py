@@ -3,11 +3,57 @@ student_wellbeing_monitor.database.read 的 Docstring
 """
 
 import sqlite3 as _sqlite3
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import pandas as pd
 
-from student_wellbeing_monitor.database.db_core import _hash_pwd, get_conn
+from student_wellbeing_monitor.database.columns import ColumnarRows
+from student_wellbeing_monitor.database.db_core import (
+    _hash_pwd,
+    get_analytics_conn,
+    get_conn,
+    open_cohorts,
+)
+from student_wellbeing_monitor.database.teaching_weeks import (
+    due_day_sql,
+    week_day_range,
+)
+
+# ================== Streaming reads ==================
+# The iter_* functions are generator counterparts of list-returning reads:
+# rows are stepped out of the SQLite cursor ``batch_size`` at a time, so a
+# caller that only aggregates never holds the whole result. The connection is
+# only opened on the first next(), and closed when the generator is
+# exhausted, closed early, or garbage-collected; wrap partial reads in
+# contextlib.closing() to close it at a known point.
+ITER_BATCH_SIZE = 1000
+
+
+def _iter_query(
+    sql: str,
+    params: Sequence,
+    batch_size: int,
+    connect=get_conn,
+    row_factory=_sqlite3.Row,
+    header: bool = False,
+):
+    """
+    Yield the rows of ``sql`` in fetchmany batches from a ``connect()``;
+    with ``header`` the column names come first, as a tuple.
+    """
+    conn = connect(row_factory=row_factory)
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        if header:
+            yield tuple(col[0] for col in cur.description)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
 
 
 # ================== Student-related (Read) ==================
@@ -94,15 +140,12 @@ def get_student_by_id(sid):
 
 
 # ================== Wellbeing (Read) ==================
-def get_wellbeing_records(
+def _wellbeing_records_query(
     start_week: int,
     end_week: int,
     programme_id: Optional[str] = None,
     student_id: Optional[str] = None,
-):
-    conn = get_conn()
-    cur = conn.cursor()
-
+) -> Tuple[str, List]:
     # ------ 1. SQL ------
     sql = """
         SELECT
@@ -129,8 +172,57 @@ def get_wellbeing_records(
 
     # ------ 3. sort ------
     sql += " ORDER BY w.student_id, w.week"
+    return sql, params
 
-    cur.execute(sql, params)
+
+def iter_wellbeing_records(
+    start_week: int,
+    end_week: int,
+    programme_id: Optional[str] = None,
+    student_id: Optional[str] = None,
+    batch_size: int = ITER_BATCH_SIZE,
+):
+    """
+    Stream of get_wellbeing_records:
+      (student_id, week, stress_level, hours_slept, programme_id)
+    """
+    sql, params = _wellbeing_records_query(
+        start_week, end_week, programme_id, student_id
+    )
+    return _iter_query(sql, params, batch_size)
+
+
+def get_wellbeing_records(
+    start_week: int,
+    end_week: int,
+    programme_id: Optional[str] = None,
+    student_id: Optional[str] = None,
+):
+    return list(iter_wellbeing_records(start_week, end_week, programme_id, student_id))
+
+
+def get_wellbeing_facts(after_id: int = 0) -> List[Tuple]:
+    """
+    Raw wellbeing facts for the in-memory WellbeingStore, oldest row first.
+    Only rows with id > after_id are returned, so the store can append
+    newly inserted rows without re-reading the table.
+
+    return:
+      (id, student_id, week, stress_level, hours_slept, programme_id)
+    """
+    conn = get_conn(row_factory=None)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT w.id, w.student_id, w.week, w.stress_level, w.hours_slept,
+               s.programme_id
+        FROM wellbeing AS w
+        JOIN student AS s ON w.student_id = s.student_id
+        WHERE w.id > ?
+        ORDER BY w.id
+        """,
+        (after_id,),
+    )
     rows = cur.fetchall()
     conn.close()
     return rows
@@ -225,6 +317,142 @@ def get_wellbeing_by_id(record_id: int):
     return row
 
 
+# ================== Snapshot export (Read) ==================
+
+
+def get_table_weeks(table: str) -> list[int]:
+    """Distinct weeks present in a weekly fact table (wellbeing / attendance)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT DISTINCT week FROM {table} ORDER BY week")
+    rows = cur.fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+def fetch_table_chunks(
+    table: str,
+    columns: List[str],
+    week: Optional[int] = None,
+    chunk_size: int = 10000,
+):
+    """
+    Yield the rows of ``table`` as lists of tuples, at most ``chunk_size`` rows
+    at a time, so a full-table export never holds the table in memory.
+
+    ``table`` and ``columns`` come from internal constants, never user input.
+    """
+    conn = get_conn(row_factory=None)
+    cur = conn.cursor()
+
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    params: List = []
+    if week is not None:
+        sql += " WHERE week = ?"
+        params.append(week)
+    sql += " ORDER BY rowid"
+
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+# ================== Data-table download (Read) ==================
+# Same rows as the data-table pages, unpaged. Per data_type:
+#   sql     → SELECT ... FROM ... (no WHERE / ORDER BY)
+#   student → column matched by the student_id filter
+#   week    → column sorted by sort_week, or None if the table has no week
+#   order   → default ORDER BY
+EXPORT_QUERIES = {
+    "students": {
+        "sql": """
+            SELECT s.student_id, s.name, s.email, s.programme_id,
+                   p.programme_code, p.programme_name
+            FROM student AS s
+            LEFT JOIN programme AS p ON s.programme_id = p.programme_id
+        """,
+        "student": "s.student_id",
+        "week": None,
+        "order": "s.student_id",
+    },
+    "wellbeing": {
+        "sql": """
+            SELECT w.id, w.student_id, s.name, w.week,
+                   w.stress_level, w.hours_slept, w.comment
+            FROM wellbeing AS w
+            JOIN student AS s ON w.student_id = s.student_id
+        """,
+        "student": "w.student_id",
+        "week": "w.week",
+        "order": "w.student_id, w.week",
+    },
+    "attendance": {
+        "sql": """
+            SELECT a.id, a.student_id, s.name, a.module_id, m.module_code,
+                   m.module_name, a.week, a.session_number, a.status
+            FROM attendance AS a
+            JOIN student AS s ON a.student_id = s.student_id
+            JOIN module  AS m ON a.module_id = m.module_id
+        """,
+        "student": "a.student_id",
+        "week": "a.week",
+        "order": "a.student_id, a.week",
+    },
+    "submissions": {
+        "sql": """
+            SELECT sub.id, sub.student_id, s.name AS student_name,
+                   p.programme_name, sub.module_id, m.module_name,
+                   sub.assignment_no, sub.submitted, sub.grade,
+                   sub.due_date, sub.submit_date
+            FROM submission AS sub
+            JOIN student AS s ON sub.student_id = s.student_id
+            JOIN module AS m ON sub.module_id = m.module_id
+            JOIN programme AS p ON s.programme_id = p.programme_id
+        """,
+        "student": "sub.student_id",
+        "week": None,
+        "order": "sub.student_id, sub.module_id, sub.assignment_no",
+    },
+}
+
+
+def iter_export_rows(
+    data_type: str,
+    student_id: Optional[str] = None,
+    sort_week: Optional[str] = None,  # 'asc' / 'desc' / None
+    chunk_size: int = 1000,
+):
+    """
+    Yield the column names, then every row of a data table as a tuple.
+
+    Rows are stepped out of the SQLite cursor ``chunk_size`` at a time, so a
+    full extract is never held in memory. The connection is closed when the
+    generator finishes or is closed early (e.g. the client disconnects).
+    """
+    spec = EXPORT_QUERIES.get(data_type)
+    if spec is None:
+        raise ValueError(f"Unknown data type: {data_type}")
+
+    sql = spec["sql"]
+    params: List = []
+    if student_id:
+        sql += f" WHERE {spec['student']} = ?"
+        params.append(student_id)
+
+    if spec["week"] and sort_week in ("asc", "desc"):
+        sql += f" ORDER BY {spec['week']} {sort_week.upper()}, {spec['order']}"
+    else:
+        sql += f" ORDER BY {spec['order']}"
+
+    yield from _iter_query(sql, params, chunk_size, row_factory=None, header=True)
+
+
 # ================== Programme (Read) ==================
 
 
@@ -314,20 +542,9 @@ def get_attendance_rate(sid):
     return present * 1.0 / total
 
 
-def get_attendance_page(
-    limit=20,
-    offset=0,
-    student_id: Optional[str] = None,
-    sort_week: Optional[str] = None,
-):
-    """
-    返回带学生姓名 + 模块名称的分页出勤记录：
-    id, student_id, student_name, module_code, module_name, week, status
-    """
-
-    conn = get_conn()
-    cur = conn.cursor()
-
+def _attendance_records_query(
+    student_id: Optional[str] = None, sort_week: Optional[str] = None
+) -> Tuple[str, List]:
     sql = """
         SELECT
             a.id,
@@ -357,6 +574,24 @@ def get_attendance_page(
         sql += " ORDER BY a.week DESC"
     else:
         sql += " ORDER BY a.student_id, a.week"
+    return sql, params
+
+
+def get_attendance_page(
+    limit=20,
+    offset=0,
+    student_id: Optional[str] = None,
+    sort_week: Optional[str] = None,
+):
+    """
+    返回带学生姓名 + 模块名称的分页出勤记录：
+    id, student_id, student_name, module_code, module_name, week, status
+    """
+
+    conn = get_conn()
+    cur = conn.cursor()
+
+    sql, params = _attendance_records_query(student_id, sort_week)
 
     # ---------- page ----------
     sql += " LIMIT ? OFFSET ?"
@@ -368,6 +603,16 @@ def get_attendance_page(
     return rows
 
 
+def iter_attendance_records(
+    student_id: Optional[str] = None,
+    sort_week: Optional[str] = None,
+    batch_size: int = ITER_BATCH_SIZE,
+):
+    """Every row of get_attendance_page, unpaged, as a stream."""
+    sql, params = _attendance_records_query(student_id, sort_week)
+    return _iter_query(sql, params, batch_size)
+
+
 def get_attendance_filtered(programme_id, module_id, week_start, week_end):
 
     conn = get_conn(row_factory=_sqlite3.Row)
@@ -404,6 +649,50 @@ def get_attendance_filtered(programme_id, module_id, week_start, week_end):
     return rows
 
 
+def attendance_totals_filtered(
+    programme_id=None, module_id=None, week_start=None, week_end=None
+) -> Tuple[int, int]:
+    """
+    (present, total) attendance records for the same filters as
+    get_attendance_filtered, counted in SQLite. total only counts records
+    with a status of 0 (absent) or 1 (present).
+    """
+    conn = get_analytics_conn()
+    cur = conn.cursor()
+
+    sql = """
+        SELECT
+            COALESCE(SUM(CASE WHEN a.status = 1 THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN a.status IN (0, 1) THEN 1 ELSE 0 END), 0)
+        FROM attendance a
+        JOIN student s ON a.student_id = s.student_id
+        WHERE 1=1
+    """
+
+    params = []
+
+    if programme_id:
+        sql += " AND s.programme_id = ?"
+        params.append(programme_id)
+
+    if module_id:  # if empty = all modules
+        sql += " AND a.module_id = ?"
+        params.append(module_id)
+
+    if week_start:
+        sql += " AND a.week >= ?"
+        params.append(week_start)
+
+    if week_end:
+        sql += " AND a.week <= ?"
+        params.append(week_end)
+
+    cur.execute(sql, params)
+    present, total = cur.fetchone()
+    conn.close()
+    return present, total
+
+
 def get_attendance_by_id(record_id: int):
     conn = get_conn()
     cur = conn.cursor()
@@ -437,15 +726,7 @@ def count_submission(student_id: Optional[str] = None):
     return total
 
 
-def get_submission_page(
-    limit: int = 20,
-    offset: int = 0,
-    student_id: Optional[str] = None,
-    sort_due: Optional[str] = None,  # 'asc' / 'desc' / None
-):
-    conn = get_conn()
-    cur = conn.cursor()
-
+def _submission_records_query(student_id: Optional[str] = None) -> Tuple[str, List]:
     sql = """
         SELECT
             sub.id,
@@ -469,6 +750,19 @@ def get_submission_page(
     if student_id:
         sql += " WHERE sub.student_id = ?"
         params.append(student_id)
+    return sql, params
+
+
+def get_submission_page(
+    limit: int = 20,
+    offset: int = 0,
+    student_id: Optional[str] = None,
+    sort_due: Optional[str] = None,  # 'asc' / 'desc' / None
+):
+    conn = get_conn()
+    cur = conn.cursor()
+
+    sql, params = _submission_records_query(student_id)
 
     # -------- 2) page --------
     sql += " LIMIT ? OFFSET ?"
@@ -480,6 +774,14 @@ def get_submission_page(
     return rows
 
 
+def iter_submission_records(
+    student_id: Optional[str] = None, batch_size: int = ITER_BATCH_SIZE
+):
+    """Every row of get_submission_page, unpaged, as a stream."""
+    sql, params = _submission_records_query(student_id)
+    return _iter_query(sql, params, batch_size)
+
+
 def get_submissions_filtered(programme_id=None, module_id=None):
 
     conn = get_conn(row_factory=_sqlite3.Row)
@@ -508,6 +810,72 @@ def get_submissions_filtered(programme_id=None, module_id=None):
     return rows
 
 
+def _due_week_filter(
+    cur, week_start: Optional[int], week_end: Optional[int]
+) -> Tuple[str, List]:
+    """
+    " AND ..." conditions keeping the submissions of alias ``sub`` due in
+    teaching weeks week_start..week_end: a due_day range, so the
+    (due_day, student_id) index does the filtering (see teaching_weeks.py).
+    """
+    first_day, last_day = week_day_range(week_start, week_end)
+    due_day = due_day_sql("sub", cur)
+    where = ""
+    params: List = []
+    if first_day is not None:
+        where += f" AND {due_day} >= ?"
+        params.append(first_day)
+    if last_day is not None:
+        where += f" AND {due_day} <= ?"
+        params.append(last_day)
+    return where, params
+
+
+def submission_totals_filtered(
+    programme_id=None,
+    module_id=None,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+) -> Tuple[int, int, Optional[float]]:
+    """
+    (submitted, total, avg_grade) over the submissions matched by
+    get_submissions_filtered, computed in SQLite. avg_grade ignores NULL
+    grades and is None when there are none. week_start / week_end keep the
+    assignments due in those teaching weeks.
+    """
+    conn = get_analytics_conn()
+    cur = conn.cursor()
+
+    sql = """
+        SELECT
+            COALESCE(SUM(CASE WHEN sub.submitted = 1 THEN 1 ELSE 0 END), 0),
+            COUNT(*),
+            AVG(sub.grade)
+        FROM submission sub
+        JOIN student s ON sub.student_id = s.student_id
+        WHERE 1=1
+    """
+
+    params = []
+
+    if programme_id:
+        sql += " AND s.programme_id = ?"
+        params.append(programme_id)
+
+    if module_id:
+        sql += " AND sub.module_id = ?"
+        params.append(module_id)
+
+    due_where, due_params = _due_week_filter(cur, week_start, week_end)
+    sql += due_where
+    params += due_params
+
+    cur.execute(sql, params)
+    submitted, total, avg_grade = cur.fetchone()
+    conn.close()
+    return submitted, total, avg_grade
+
+
 def get_submission_by_id(record_id: int):
     conn = get_conn()
     cur = conn.cursor()
@@ -580,6 +948,8 @@ def get_course_stats(course_id: str):
 # =========================================================
 # ================ Analytical Functions ===================
 # =========================================================
+# These read through get_analytics_conn: the analytics replica in snapshot
+# mode (see db_core), the live database otherwise.
 
 # ---------- weekly wellbeing summary ----------
 
@@ -588,7 +958,7 @@ def weekly_wellbeing_summary(start_week, end_week):
     """
     return [(week, avg_stress, avg_sleep, count), ...]
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -614,7 +984,7 @@ def weekly_wellbeing_summary(start_week, end_week):
 
 def find_high_stress_weeks(threshold=4):
     """Weeks where the average stress level is ≥ the threshold."""
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -642,7 +1012,7 @@ def get_at_risk_students():
     if a student has ≥2 weeks where (stress >= 4 and sleep < 6),
     mark as at-risk. Returns {student_id: [week1, week2, ...]}.
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -671,7 +1041,7 @@ def stress_vs_attendance():
     Weekly view: stress level vs attendance rate.
     return [(week, avg_stress, attendance_rate), ...]
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -691,6 +1061,66 @@ def stress_vs_attendance():
     return rows
 
 
+def attendance_weekly_by_module(
+    programme_id: Optional[str] = None,
+    module_ids: Optional[Sequence[str]] = None,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+) -> List[Tuple]:
+    """
+    Weekly attendance counts per module, grouped in SQLite:
+      (module_id, week, present, total)
+
+    - programme_id 可选：只看该专业的学生（None → 所有学生）
+    - module_ids 可选：限定到这些课（None → 所有 module）
+    - week_start / week_end 可选：限定周范围
+
+    Only enrolled (student_module) attendance counts, as in
+    attendance_for_course. Ordered by module_id, week.
+    """
+    conn = get_analytics_conn()
+    cur = conn.cursor()
+
+    sql = """
+        SELECT
+            a.module_id,
+            a.week,
+            SUM(CASE WHEN a.status = 1 THEN 1 ELSE 0 END) AS present,
+            COUNT(*) AS total
+        FROM attendance AS a
+        JOIN student_module AS sm
+          ON a.student_id = sm.student_id
+         AND a.module_id  = sm.module_id
+        JOIN student AS s
+          ON sm.student_id = s.student_id
+        WHERE a.week IS NOT NULL
+    """
+    params: List = []
+
+    if programme_id:
+        sql += " AND s.programme_id = ?"
+        params.append(programme_id)
+
+    if module_ids:
+        sql += f" AND a.module_id IN ({', '.join('?' * len(module_ids))})"
+        params.extend(module_ids)
+
+    if week_start is not None:
+        sql += " AND a.week >= ?"
+        params.append(week_start)
+
+    if week_end is not None:
+        sql += " AND a.week <= ?"
+        params.append(week_end)
+
+    sql += " GROUP BY a.module_id, a.week ORDER BY a.module_id, a.week"
+
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
 # ---------- attendance trend ----------
 
 
@@ -699,7 +1129,7 @@ def attendance_trend():
     Overall attendance trend by week.
     return [(week, attendance_rate), ...]
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -724,7 +1154,7 @@ def submission_behaviour():
     View submission status for each assignment:
     (assignment_id, no_submit, on_time, total)
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -755,7 +1185,7 @@ def low_attendance(threshold=0.7):
     Students whose attendance rate is below the threshold.
     return [(student_id, att_rate), ...]
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -781,7 +1211,7 @@ def repeated_late_submissions(min_bad=2):
     Students with late or missing submissions ≥ min_bad.
     return [(student_id, bad_count), ...]
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -807,7 +1237,7 @@ def attendance_vs_grade():
     """
     Returns (student_id, attendance_rate, avg_grade).
     """
-    conn = get_conn()
+    conn = get_analytics_conn()
     cur = conn.cursor()
     cur.execute(
         """
@@ -825,44 +1255,13 @@ def attendance_vs_grade():
     return rows
 
 
-def get_continuous_high_stress_students():
-    """Students with high stress levels for three or more consecutive weeks."""
-    conn = get_conn()
-    conn.row_factory = _sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(
-        """
-        WITH high AS (
-            SELECT s.student_id, s.name, w.week, w.stress_level
-            FROM wellbeing w
-            JOIN student s ON w.student_id = s.student_id
-            WHERE w.stress_level >= 4
-        ),
-        grouped AS (
-            SELECT *,
-                week - ROW_NUMBER() OVER (PARTITION BY student_id ORDER BY week) AS grp
-            FROM high
-        )
-        SELECT student_id, name,
-            COUNT(*) AS weeks,
-            GROUP_CONCAT('Week ' || week) AS weeks_list
-        FROM grouped
-        GROUP BY student_id, name, grp
-        HAVING weeks >= 3
-        ORDER BY weeks DESC
-        """
-    )
-    result = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return result
-
-
-def attendance_for_course(
+def iter_attendance_for_course(
     programme_id: str,
     module_id: Optional[str] = None,
     week_start: Optional[int] = None,
     week_end: Optional[int] = None,
-) -> List[Tuple]:
+    batch_size: int = ITER_BATCH_SIZE,
+):
     """
     为 get_attendance_trends / course_leader_summary 提供原始数据。
 
@@ -876,9 +1275,6 @@ def attendance_for_course(
          None  → 该专业所有 module 的出勤记录
     - week_start / week_end 可选：限定周范围
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
-    cur = conn.cursor()
-
     sql = """
         SELECT
             m.module_id,
@@ -914,29 +1310,36 @@ def attendance_for_course(
         params.append(week_end)
 
     sql += " ORDER BY a.week, s.student_id"
+    return _iter_query(
+        sql, params, batch_size, connect=get_analytics_conn, row_factory=None
+    )
 
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    conn.close()
 
-    return [tuple(r) for r in rows]
+def attendance_for_course(
+    programme_id: str,
+    module_id: Optional[str] = None,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+) -> List[Tuple]:
+    """List form of iter_attendance_for_course."""
+    return list(
+        iter_attendance_for_course(programme_id, module_id, week_start, week_end)
+    )
 
 
-def attendance_detail_for_students(
+def iter_attendance_detail_for_students(
     module_id: str,
     programme_id: Optional[str] = None,
     week_start: Optional[int] = None,
     week_end: Optional[int] = None,
-) -> List[Tuple]:
+    batch_size: int = ITER_BATCH_SIZE,
+):
     """
     为 get_low_attendance_students 提供原始数据。
 
     返回：
       (module_id, module_name, student_id, student_name, email, week, status)
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
-    cur = conn.cursor()
-
     sql = """
         SELECT
             m.module_id,
@@ -971,11 +1374,23 @@ def attendance_detail_for_students(
         params.append(week_end)
 
     sql += " ORDER BY s.student_id, a.week"
+    return _iter_query(
+        sql, params, batch_size, connect=get_analytics_conn, row_factory=None
+    )
 
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    conn.close()
-    return [tuple(r) for r in rows]
+
+def attendance_detail_for_students(
+    module_id: str,
+    programme_id: Optional[str] = None,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+) -> List[Tuple]:
+    """List form of iter_attendance_detail_for_students."""
+    return list(
+        iter_attendance_detail_for_students(
+            module_id, programme_id, week_start, week_end
+        )
+    )
 
 
 def submissions_for_course(
@@ -993,7 +1408,7 @@ def submissions_for_course(
     返回：
       (module_id, module_name, student_id, submitted)
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
+    conn = get_analytics_conn(row_factory=_sqlite3.Row)
     cur = conn.cursor()
 
     join_condition = """
@@ -1040,6 +1455,7 @@ def unsubmissions_for_repeated_issues(
     programme_id: Optional[str] = None,
     week_start: Optional[int] = None,
     week_end: Optional[int] = None,
+    min_offending_modules: Optional[int] = None,
 ) -> List[Tuple]:
     """
     为 get_repeated_missing_students 提供数据。
@@ -1049,46 +1465,70 @@ def unsubmissions_for_repeated_issues(
     返回：
       (module_id, module_name, assignment_no,
        student_id, student_name, email, submitted)
+
+    With min_offending_modules, SQLite first counts each student's distinct
+    modules with an unsubmitted assignment (GROUP BY ... HAVING), and only
+    the unsubmitted rows of students reaching that count are returned.
+
+    week_start / week_end keep the assignments due in those teaching weeks
+    (see teaching_weeks.py).
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
+    conn = get_analytics_conn(row_factory=_sqlite3.Row)
     cur = conn.cursor()
 
-    sql = """
-        SELECT
-            m.module_id,
-            m.module_name,
-            sub.assignment_no,
-            s.student_id,
-            s.name AS student_name,
-            s.email,
-            sub.submitted
-        FROM submission AS sub
-        JOIN student AS s
-          ON sub.student_id = s.student_id
-        JOIN module AS m
-          ON sub.module_id = m.module_id
-        WHERE 1 = 1
-    """
+    where = ""
     params: List = []
 
     if module_id is not None:
-        sql += " AND m.module_id = ?"
+        where += " AND sub.module_id = ?"
         params.append(module_id)
 
     if programme_id is not None:
-        sql += " AND s.programme_id = ?"
+        where += " AND s.programme_id = ?"
         params.append(programme_id)
 
-    # If there is no "week" in your submission, you can change it to filter by the due_date range
-    # if week_start is not None:
-    #     sql += " AND sub.week >= ?"
-    #     params.append(week_start)
+    due_where, due_params = _due_week_filter(cur, week_start, week_end)
+    where += due_where
+    params += due_params
 
-    # if week_end is not None:
-    #     sql += " AND sub.week <= ?"
-    #     params.append(week_end)
-
-    sql += " ORDER BY s.student_id, m.module_id, sub.assignment_no"
+    # one pass over the due_day range: the qualifying set and the detail rows
+    # both read the filtered rows (SQLite materializes a CTE used twice)
+    sql = f"""
+        WITH missing AS (
+            SELECT sub.student_id, sub.module_id, sub.assignment_no,
+                   sub.submitted
+            FROM submission AS sub
+            JOIN student AS s
+              ON sub.student_id = s.student_id
+            WHERE 1 = 1 {where}
+        )
+        SELECT
+            m.module_id,
+            m.module_name,
+            x.assignment_no,
+            s.student_id,
+            s.name AS student_name,
+            s.email,
+            x.submitted
+        FROM missing AS x
+        JOIN student AS s
+          ON x.student_id = s.student_id
+        JOIN module AS m
+          ON x.module_id = m.module_id
+    """
+    if min_offending_modules is not None:
+        sql += """
+        WHERE COALESCE(x.submitted, 0) = 0
+          AND x.student_id IN (
+            SELECT student_id
+            FROM missing
+            WHERE COALESCE(submitted, 0) = 0
+            GROUP BY student_id
+            HAVING COUNT(DISTINCT module_id) >= ?
+          )
+        """
+        params.append(min_offending_modules)
+    sql += " ORDER BY s.student_id, m.module_id, x.assignment_no"
 
     cur.execute(sql, params)
     rows = cur.fetchall()
@@ -1103,74 +1543,161 @@ def attendance_and_grades(
     week_end: Optional[int] = None,
 ) -> List[Tuple]:
     """
-    Provide data for get_attendance_vs_grades.
-
-    Return each attendance + grade record:
-      (module_id, module_name, student_id, student_name, week, status, grade)
+    Provide data for get_attendance_vs_grades, one row per student:
+      (module_name, student_id, student_name, present, total, avg_grade)
+
+    Attendance and grades are aggregated in two independent GROUP BY
+    subqueries and joined on student_id, so several assignments per module
+    no longer repeat every attendance week. Students appear if they have
+    attendance in the filtered range; avg_grade is NULL without any grade.
+    The week range applies to attendance only (submissions have no week).
+    module_name is the filtered module's name (the first one by name when
+    no module filter is given).
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
+    conn = get_analytics_conn(row_factory=_sqlite3.Row)
     cur = conn.cursor()
 
-    sql = """
-        SELECT
-            m.module_id,
-            m.module_name,
-            s.student_id,
-            s.name AS student_name,
-            a.week,
-            a.status,
-            sub.grade
-        FROM attendance AS a
-        JOIN student_module AS sm
-          ON a.student_id = sm.student_id
-         AND a.module_id  = sm.module_id
-        JOIN student AS s
-          ON sm.student_id = s.student_id
-        JOIN module AS m
-          ON sm.module_id = m.module_id
-        LEFT JOIN submission AS sub
-          ON sub.student_id = sm.student_id
-         AND sub.module_id  = sm.module_id
-        WHERE 1=1
-    """
-    params: List = []
+    att_where = ""
+    att_params: List = []
+    grade_where = ""
+    grade_params: List = []
 
     # ----- 1) optional module filter -----
-    # If module_id is given and not empty, filter by this module only.
     if module_id:
-        sql += " AND m.module_id = ?"
-        params.append(module_id)
+        att_where += " AND a.module_id = ?"
+        att_params.append(module_id)
+        grade_where += " AND sub.module_id = ?"
+        grade_params.append(module_id)
 
     # ----- 2) optional programme filter -----
     if programme_id:
-        sql += " AND s.programme_id = ?"
-        params.append(programme_id)
+        att_where += " AND s.programme_id = ?"
+        att_params.append(programme_id)
+        grade_where += " AND s.programme_id = ?"
+        grade_params.append(programme_id)
 
     # ----- 3) optional week range filter -----
     if week_start is not None:
-        sql += " AND a.week >= ?"
-        params.append(week_start)
+        att_where += " AND a.week >= ?"
+        att_params.append(week_start)
 
     if week_end is not None:
-        sql += " AND a.week <= ?"
-        params.append(week_end)
+        att_where += " AND a.week <= ?"
+        att_params.append(week_end)
 
-    sql += " ORDER BY s.student_id, a.week"
-
-    print("attendance_and_grades SQL =", sql)
-    print("params =", params)
+    sql = f"""
+        SELECT
+            att.module_name,
+            att.student_id,
+            s.name AS student_name,
+            att.present,
+            att.total,
+            g.avg_grade
+        FROM (
+            SELECT
+                a.student_id,
+                MIN(m.module_name) AS module_name,
+                SUM(CASE WHEN a.status = 1 THEN 1 ELSE 0 END) AS present,
+                COUNT(*) AS total
+            FROM attendance AS a
+            JOIN student_module AS sm
+              ON a.student_id = sm.student_id
+             AND a.module_id  = sm.module_id
+            JOIN student AS s
+              ON a.student_id = s.student_id
+            JOIN module AS m
+              ON a.module_id = m.module_id
+            WHERE 1=1 {att_where}
+            GROUP BY a.student_id
+        ) AS att
+        JOIN student AS s
+          ON att.student_id = s.student_id
+        LEFT JOIN (
+            SELECT
+                sub.student_id,
+                AVG(sub.grade) AS avg_grade
+            FROM submission AS sub
+            JOIN student_module AS sm
+              ON sub.student_id = sm.student_id
+             AND sub.module_id  = sm.module_id
+            JOIN student AS s
+              ON sub.student_id = s.student_id
+            WHERE sub.grade IS NOT NULL {grade_where}
+            GROUP BY sub.student_id
+        ) AS g
+          ON att.student_id = g.student_id
+        ORDER BY att.student_id
+    """
 
-    cur.execute(sql, params)
+    cur.execute(sql, att_params + grade_params)
     rows = cur.fetchall()
     conn.close()
     return [tuple(r) for r in rows]
 
 
+def first_module_name(
+    student_id: str,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+    attended: bool = False,
+) -> Optional[str]:
+    """
+    The first module name (by name) a student is enrolled in; with
+    ``attended``, only modules with attendance in the week range, as in
+    attendance_and_grades. Names the course of programme-wide results that
+    are read from the student feature vectors.
+    """
+    conn = get_analytics_conn(row_factory=None)
+    sql = """
+        SELECT MIN(m.module_name)
+        FROM student_module AS sm
+        JOIN module AS m
+          ON sm.module_id = m.module_id
+    """
+    params: List = []
+    if attended:
+        sql += """
+        JOIN attendance AS a
+          ON a.student_id = sm.student_id
+         AND a.module_id  = sm.module_id
+        """
+        if week_start is not None:
+            sql += " AND a.week >= ?"
+            params.append(week_start)
+        if week_end is not None:
+            sql += " AND a.week <= ?"
+            params.append(week_end)
+    sql += " WHERE sm.student_id = ?"
+    params.append(student_id)
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+# column layout of programme_wellbeing_engagement(as_columns=True)
+ENGAGEMENT_COLUMNS = (
+    ("module_id", "code"),
+    ("module_name", "code"),
+    ("student_id", "code"),
+    ("programme_id", "code"),
+    ("programme_name", "code"),
+    ("week", "int16"),
+    ("stress_level", "int8"),
+    ("hours_slept", "float64"),
+    ("attendance_status", "int8"),
+    ("submission_status", "code"),
+    ("grade", "float64"),
+)
+
+
 def programme_wellbeing_engagement(
     programme_id: Optional[str] = None,
     week_start: Optional[int] = None,
     week_end: Optional[int] = None,
-) -> List[Tuple]:
+    as_columns: bool = False,
+    chunk_size: int = 5000,
+):
     """
     为 get_programme_wellbeing_engagement 提供“按专业”分析的原始记录。
 
@@ -1184,8 +1711,11 @@ def programme_wellbeing_engagement(
        attendance_status,
        submission_status,   -- 'submit' / 'unsubmit'
        grade)
+
+    as_columns=True returns a ColumnarRows laid out as ENGAGEMENT_COLUMNS,
+    filled chunk_size rows at a time, instead of a list of tuples.
     """
-    conn = get_conn(row_factory=_sqlite3.Row)
+    conn = get_analytics_conn(row_factory=None if as_columns else _sqlite3.Row)
     cur = conn.cursor()
 
     sql = """
@@ -1242,6 +1772,62 @@ def programme_wellbeing_engagement(
     sql += " ORDER BY p.programme_id, s.student_id, w.week"
 
     cur.execute(sql, params)
+    if as_columns:
+        result = ColumnarRows(ENGAGEMENT_COLUMNS)
+        try:
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                result.extend(chunk)
+        finally:
+            conn.close()
+        return result
+
     rows = cur.fetchall()
     conn.close()
     return [tuple(r) for r in rows]
+
+
+# ================== Cohorts (Read) ==================
+def cohort_weekly_comparison(cohort_ids: Sequence[str]) -> List[Tuple]:
+    """
+    Weekly figures of several academic-year databases side by side, each
+    ATTACHed read-only and aggregated in one UNION ALL query:
+      (cohort_id, week, avg_stress, avg_sleep, responses, attendance_rate)
+    Ordered by cohort_id, week.
+    """
+    if not cohort_ids:
+        return []
+    conn, aliases = open_cohorts(cohort_ids, row_factory=None)
+
+    parts = []
+    params: List = []
+    for cohort_id, alias in aliases.items():
+        parts.append(
+            f"""
+            SELECT ? AS cohort_id, w.week AS week, w.avg_stress, w.avg_sleep, w.responses,
+                   a.attendance_rate
+            FROM (
+                SELECT week,
+                       AVG(stress_level) AS avg_stress,
+                       AVG(hours_slept)  AS avg_sleep,
+                       COUNT(*)          AS responses
+                FROM {alias}.wellbeing
+                GROUP BY week
+            ) AS w
+            LEFT JOIN (
+                SELECT week, AVG(status) AS attendance_rate
+                FROM {alias}.attendance
+                GROUP BY week
+            ) AS a
+              ON a.week = w.week
+            """
+        )
+        params.append(cohort_id)
+    sql = " UNION ALL ".join(parts) + " ORDER BY cohort_id, week"
+
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
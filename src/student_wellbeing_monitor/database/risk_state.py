@@ -0,0 +1,330 @@
+# risk_state.py
+"""
+Per-student wellbeing risk state, maintained at write time.
+
+student_risk_state holds one row per student with wellbeing data:
+  - risk_type        → "high_risk" / "potential_risk" / "normal"
+  - streak_len       → current run of risky weeks, ending at the latest week
+  - first_hit_week   → first week with stress >= threshold and sleep < sleep
+                       threshold (plus that week's stress and sleep)
+  - high_start_week / high_end_week → first run of HIGH_RISK_WEEKS risky weeks
+
+The rules are the ones of WellbeingService.get_risk_students over a student's
+whole history. create / update / delete call refresh_risk_state in their own
+transaction; only the students touched by the write are re-evaluated, from
+their own rows via the (student_id, week) index.
+
+risk_state_config holds the thresholds the table was built with and the week
+range it covers. A database without that row (created before this table
+existed) has no state yet: writes skip the refresh and readers fall back to
+computing risk from the wellbeing rows until init_db_schema or
+rebuild_risk_state builds it.
+"""
+
+import sqlite3 as _sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from student_wellbeing_monitor.database.db_core import get_conn
+from student_wellbeing_monitor.database.writer import write_op
+
+RISK_THRESHOLD = 4.5
+RISK_SLEEP_THRESHOLD = 6.0
+HIGH_RISK_WEEKS = 3
+
+AT_RISK_TYPES = ("high_risk", "potential_risk")
+
+_RISK_STATE_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS student_risk_state (
+        student_id        TEXT PRIMARY KEY,
+        risk_type         TEXT NOT NULL,
+        streak_len        INTEGER NOT NULL DEFAULT 0,
+        first_hit_week    INTEGER,
+        first_hit_stress  REAL,
+        first_hit_sleep   REAL,
+        high_start_week   INTEGER,
+        high_end_week     INTEGER,
+        last_week         INTEGER,
+        updated_at        REAL NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_student_risk_state_type
+        ON student_risk_state (risk_type, student_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS risk_state_config (
+        id               INTEGER PRIMARY KEY CHECK (id = 1),
+        threshold        REAL NOT NULL,
+        sleep_threshold  REAL NOT NULL,
+        min_week         INTEGER,
+        max_week         INTEGER,
+        built_at         REAL NOT NULL
+    )
+    """,
+)
+
+
+def create_risk_state_tables(cur) -> None:
+    """
+    Create the state tables with the default thresholds. On a database that
+    already holds wellbeing rows, the state is built from them right away.
+    """
+    for ddl in _RISK_STATE_DDL:
+        cur.execute(ddl)
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO risk_state_config
+            (id, threshold, sleep_threshold, min_week, max_week, built_at)
+        VALUES (1, ?, ?, NULL, NULL, ?)
+        """,
+        (RISK_THRESHOLD, RISK_SLEEP_THRESHOLD, time.time()),
+    )
+    if cur.rowcount == 1:
+        _rebuild(cur, RISK_THRESHOLD, RISK_SLEEP_THRESHOLD)
+
+
+def get_risk_config(cur) -> Optional[Tuple[float, float, Optional[int], Optional[int]]]:
+    """(threshold, sleep_threshold, min_week, max_week), or None if never built."""
+    try:
+        row = cur.execute(
+            "SELECT threshold, sleep_threshold, min_week, max_week "
+            "FROM risk_state_config WHERE id = 1"
+        ).fetchone()
+    except _sqlite3.OperationalError:
+        return None
+    return tuple(row) if row is not None else None
+
+
+# ================== Evaluation ==================
+def evaluate_risk(
+    records: Sequence[Tuple[int, float, Optional[float]]],
+    threshold: float,
+    sleep_threshold: float,
+) -> Dict[str, Any]:
+    """
+    State of one student from [(week, stress, sleep), ...] sorted by week.
+    Same rules as WellbeingService.get_risk_students.
+    """
+    streak = 0
+    first_hit = None
+    high = None
+    for i, (week, stress, sleep) in enumerate(records):
+        if stress >= threshold and sleep is not None and sleep < sleep_threshold:
+            streak += 1
+            if first_hit is None:
+                first_hit = (week, stress, sleep)
+            if high is None and streak >= HIGH_RISK_WEEKS:
+                high = (records[i - HIGH_RISK_WEEKS + 1][0], week)
+        else:
+            streak = 0
+
+    if high is not None:
+        risk_type = "high_risk"
+    elif first_hit is not None:
+        risk_type = "potential_risk"
+    else:
+        risk_type = "normal"
+
+    return {
+        "risk_type": risk_type,
+        "streak_len": streak,
+        "first_hit_week": first_hit[0] if first_hit else None,
+        "first_hit_stress": first_hit[1] if first_hit else None,
+        "first_hit_sleep": first_hit[2] if first_hit else None,
+        "high_start_week": high[0] if high else None,
+        "high_end_week": high[1] if high else None,
+        "last_week": records[-1][0] if records else None,
+    }
+
+
+# ================== Maintenance (write path) ==================
+def _student_records(cur, student_id: str) -> List[Tuple[int, float, Optional[float]]]:
+    rows = cur.execute(
+        """
+        SELECT week, stress_level, hours_slept
+        FROM wellbeing
+        WHERE student_id = ? AND stress_level IS NOT NULL
+        ORDER BY week
+        """,
+        (student_id,),
+    ).fetchall()
+    return [(int(w), float(s), None if sl is None else float(sl)) for w, s, sl in rows]
+
+
+def _write_states(cur, student_ids: Iterable[str], threshold, sleep_threshold) -> int:
+    now = time.time()
+    count = 0
+    for student_id in student_ids:
+        records = _student_records(cur, student_id)
+        if not records:
+            cur.execute(
+                "DELETE FROM student_risk_state WHERE student_id = ?", (student_id,)
+            )
+            continue
+        state = evaluate_risk(records, threshold, sleep_threshold)
+        cur.execute(
+            """
+            INSERT OR REPLACE INTO student_risk_state (
+                student_id, risk_type, streak_len,
+                first_hit_week, first_hit_stress, first_hit_sleep,
+                high_start_week, high_end_week, last_week, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                student_id,
+                state["risk_type"],
+                state["streak_len"],
+                state["first_hit_week"],
+                state["first_hit_stress"],
+                state["first_hit_sleep"],
+                state["high_start_week"],
+                state["high_end_week"],
+                state["last_week"],
+                now,
+            ),
+        )
+        count += 1
+    return count
+
+
+def refresh_risk_state(cur, student_ids: Iterable[str]) -> None:
+    """
+    Re-evaluate ``student_ids`` in the caller's transaction (call before the
+    caller commits). No-op on databases whose state was never built.
+    """
+    cur = cur.connection.cursor()  # keep the caller's lastrowid
+    config = get_risk_config(cur)
+    if config is None:
+        return
+    threshold, sleep_threshold, _lo, _hi = config
+    student_ids = {str(sid) for sid in student_ids if sid is not None}
+    if not student_ids:
+        return
+
+    _write_states(cur, student_ids, threshold, sleep_threshold)
+
+    # widen the covered week range; shrinking it only costs a fallback
+    placeholders = ",".join("?" * len(student_ids))
+    lo, hi = cur.execute(
+        f"SELECT MIN(week), MAX(week) FROM wellbeing WHERE student_id IN ({placeholders})",
+        list(student_ids),
+    ).fetchone()
+    if lo is not None:
+        cur.execute(
+            """
+            UPDATE risk_state_config
+            SET min_week = MIN(COALESCE(min_week, ?), ?),
+                max_week = MAX(COALESCE(max_week, ?), ?)
+            WHERE id = 1
+            """,
+            (lo, lo, hi, hi),
+        )
+
+
+def clear_risk_state(cur, student_ids: Optional[Sequence[str]] = None) -> None:
+    """Drop the state of ``student_ids`` (all students when None)."""
+    cur = cur.connection.cursor()
+    if get_risk_config(cur) is None:
+        return
+    if student_ids is None:
+        cur.execute("DELETE FROM student_risk_state")
+        cur.execute(
+            "UPDATE risk_state_config SET min_week = NULL, max_week = NULL WHERE id = 1"
+        )
+    elif student_ids:
+        placeholders = ",".join("?" * len(student_ids))
+        cur.execute(
+            f"DELETE FROM student_risk_state WHERE student_id IN ({placeholders})",
+            list(student_ids),
+        )
+
+
+def _rebuild(cur, threshold: float, sleep_threshold: float) -> int:
+    cur.execute("DELETE FROM student_risk_state")
+    student_ids = [
+        r[0]
+        for r in cur.execute(
+            "SELECT DISTINCT student_id FROM wellbeing ORDER BY student_id"
+        ).fetchall()
+    ]
+    count = _write_states(cur, student_ids, threshold, sleep_threshold)
+
+    lo, hi = cur.execute("SELECT MIN(week), MAX(week) FROM wellbeing").fetchone()
+    cur.execute(
+        """
+        UPDATE risk_state_config
+        SET threshold = ?, sleep_threshold = ?, min_week = ?, max_week = ?,
+            built_at = ?
+        WHERE id = 1
+        """,
+        (threshold, sleep_threshold, lo, hi, time.time()),
+    )
+    return count
+
+
+@write_op
+def rebuild_risk_state(
+    cur, threshold: Optional[float] = None, sleep_threshold: Optional[float] = None
+) -> int:
+    """
+    Recompute the state of every student, e.g. after changing thresholds.
+    Omitted thresholds keep their current value (or the defaults on a first
+    build). Runs as one writer operation; returns the number of students stored.
+    """
+    create_risk_state_tables(cur)
+    old_threshold, old_sleep, _lo, _hi = get_risk_config(cur)
+    threshold = old_threshold if threshold is None else threshold
+    sleep_threshold = old_sleep if sleep_threshold is None else sleep_threshold
+    return _rebuild(cur, threshold, sleep_threshold)
+
+
+# ================== Lookup (read path) ==================
+def get_at_risk_states(
+    programme_id: Optional[str] = None,
+    risk_types: Sequence[str] = AT_RISK_TYPES,
+) -> List[_sqlite3.Row]:
+    """
+    State rows of the students in ``risk_types`` (index lookup on risk_type),
+    joined with the student's programme, ordered by student_id.
+    """
+    conn = get_conn(row_factory=_sqlite3.Row)
+    placeholders = ",".join("?" * len(risk_types))
+    sql = f"""
+        SELECT r.*, s.programme_id
+        FROM student_risk_state AS r
+        JOIN student AS s
+          ON r.student_id = s.student_id
+        WHERE r.risk_type IN ({placeholders})
+    """
+    params: List[Any] = list(risk_types)
+    if programme_id is not None:
+        sql += " AND s.programme_id = ?"
+        params.append(programme_id)
+    sql += " ORDER BY r.student_id"
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def risk_state_covers(start_week: int, end_week: int, threshold, sleep_threshold):
+    """
+    True when the stored state answers get_risk_students(start_week, end_week)
+    exactly: it was built with these thresholds and the window spans every
+    stored week.
+    """
+    conn = get_conn(row_factory=None)
+    try:
+        config = get_risk_config(conn.cursor())
+    finally:
+        conn.close()
+    if config is None:
+        return False
+    built_threshold, built_sleep, min_week, max_week = config
+    if built_threshold != threshold or built_sleep != sleep_threshold:
+        return False
+    if min_week is None:
+        return True  # no wellbeing data yet
+    return start_week <= min_week and end_week >= max_week
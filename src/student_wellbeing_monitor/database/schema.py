@@ -1,13 +1,30 @@
 # schema.py
 # create database schema
-from student_wellbeing_monitor.database.db_core import get_conn
+from student_wellbeing_monitor.database.db_core import _DATA_VERSION_DDL, get_conn
+from student_wellbeing_monitor.database.risk_state import create_risk_state_tables
+from student_wellbeing_monitor.database.search import create_search_tables
+from student_wellbeing_monitor.database.student_features import (
+    create_student_features_tables,
+)
+from student_wellbeing_monitor.database.teaching_weeks import (
+    create_submission_day_columns,
+)
 
 
-def init_db_schema():
-    """Create all SQLite tables for the system."""
-    conn = get_conn()
+def init_db_schema(cohort=None):
+    """Create all SQLite tables for the system (in ``cohort``'s file if given)."""
+    conn = get_conn(cohort=cohort)
     cur = conn.cursor()
 
+    # Only takes effect on a new (empty) file: lets purges hand freed pages
+    # back with PRAGMA incremental_vacuum instead of a blocking VACUUM.
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Write-ahead log: readers (a slow CSV download, the snapshot copy, other
+    # gunicorn workers) keep their snapshot while writers commit, instead of
+    # holding a SHARED lock that makes every commit wait. Persistent per file.
+    cur.execute("PRAGMA journal_mode = WAL")
+
     # --------------------
     # programme
     # --------------------
@@ -118,6 +135,8 @@ def init_db_schema():
             assignment_no  INTEGER NOT NULL DEFAULT 1,
             due_date     TEXT NOT NULL,                -- YYYY-MM-DD
             submit_date  TEXT,                         -- NULL if not submitted
+            due_day      INTEGER,                      -- due_date as days since 1970-01-01
+            submit_day   INTEGER,                      -- submit_date, likewise
             FOREIGN KEY(student_id) REFERENCES student(student_id),
             FOREIGN KEY(module_id)  REFERENCES module(module_id),
             UNIQUE(student_id, module_id, assignment_no)
@@ -125,6 +144,9 @@ def init_db_schema():
         """
     )
 
+    # integer day columns for the dates, kept by triggers (see teaching_weeks.py)
+    create_submission_day_columns(cur)
+
     # --------------------
     # user accounts
     # --------------------
@@ -139,6 +161,26 @@ def init_db_schema():
     """
     )
 
+    # --------------------
+    # data version stamps (see db_core.bump_data_version)
+    # --------------------
+    cur.execute(_DATA_VERSION_DDL)
+
+    # --------------------
+    # per-student risk state (see risk_state.refresh_risk_state)
+    # --------------------
+    create_risk_state_tables(cur)
+
+    # --------------------
+    # per-student feature vectors (see student_features.refresh_student_features)
+    # --------------------
+    create_student_features_tables(cur)
+
+    # --------------------
+    # full-text search indexes, kept in sync by triggers (see search.py)
+    # --------------------
+    create_search_tables(cur)
+
     conn.commit()
     conn.close()
     print("Database schema initialized.")
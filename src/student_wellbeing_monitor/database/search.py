@@ -0,0 +1,319 @@
+# search.py
+"""
+Full-text search over student names / emails and wellbeing comments (FTS5).
+
+Two FTS5 tables are kept in sync with their source tables by triggers, so
+every write path (single inserts, CSV upserts, edits, purges) updates them
+without any Python involvement:
+
+  student_fts    → name, email; rowid from student_fts_map
+  wellbeing_fts  → comment; external content table over wellbeing, keyed by
+                   wellbeing.id, so the comment text is not stored twice
+
+student has no INTEGER PRIMARY KEY, and VACUUM may renumber its rowids, so
+student_fts keeps its own copy of the text under a stable rowid handed out by
+student_fts_map (student_id → fts_rowid). The triggers delete by that rowid,
+so removing a student is an index lookup, not a scan of the FTS table.
+
+Queries are ranked with bm25 (FTS5's ``rank``) and return a snippet of the
+matching text in which hits are wrapped in MARK_START / MARK_END. User input
+is never passed to MATCH as syntax: every word becomes a quoted prefix term,
+all of which must match ("ali exam" finds alice@example.com).
+
+A database created before these tables existed is searched with LIKE scans
+until init_db_schema builds the index.
+"""
+
+import re
+import sqlite3 as _sqlite3
+from typing import Any, Dict, List, Optional
+
+from student_wellbeing_monitor.database.db_core import get_conn
+
+MARK_START = "\x02"  # around each hit in a snippet
+MARK_END = "\x03"
+SNIPPET_TOKENS = 12
+
+_STUDENT_FTS_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS student_fts_map (
+        fts_rowid   INTEGER PRIMARY KEY,
+        student_id  TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS student_fts USING fts5(name, email)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS student_fts_insert AFTER INSERT ON student BEGIN
+        INSERT INTO student_fts_map (student_id) VALUES (new.student_id);
+        INSERT INTO student_fts (rowid, name, email)
+        VALUES (
+            (SELECT fts_rowid FROM student_fts_map WHERE student_id = new.student_id),
+            new.name,
+            new.email
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS student_fts_delete AFTER DELETE ON student BEGIN
+        DELETE FROM student_fts WHERE rowid =
+            (SELECT fts_rowid FROM student_fts_map WHERE student_id = old.student_id);
+        DELETE FROM student_fts_map WHERE student_id = old.student_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS student_fts_update
+    AFTER UPDATE OF student_id, name, email ON student BEGIN
+        UPDATE student_fts_map SET student_id = new.student_id
+        WHERE student_id = old.student_id;
+        DELETE FROM student_fts WHERE rowid =
+            (SELECT fts_rowid FROM student_fts_map WHERE student_id = new.student_id);
+        INSERT INTO student_fts (rowid, name, email)
+        VALUES (
+            (SELECT fts_rowid FROM student_fts_map WHERE student_id = new.student_id),
+            new.name,
+            new.email
+        );
+    END
+    """,
+)
+
+_WELLBEING_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS wellbeing_fts USING fts5(
+        comment, content = 'wellbeing', content_rowid = 'id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS wellbeing_fts_insert AFTER INSERT ON wellbeing BEGIN
+        INSERT INTO wellbeing_fts (rowid, comment) VALUES (new.id, new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS wellbeing_fts_delete AFTER DELETE ON wellbeing BEGIN
+        INSERT INTO wellbeing_fts (wellbeing_fts, rowid, comment)
+        VALUES ('delete', old.id, old.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS wellbeing_fts_update
+    AFTER UPDATE OF comment ON wellbeing BEGIN
+        INSERT INTO wellbeing_fts (wellbeing_fts, rowid, comment)
+        VALUES ('delete', old.id, old.comment);
+        INSERT INTO wellbeing_fts (rowid, comment) VALUES (new.id, new.comment);
+    END
+    """,
+)
+
+
+def _has_table(cur, name: str) -> bool:
+    return (
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        is not None
+    )
+
+
+def create_search_tables(cur) -> None:
+    """
+    Create the FTS tables and their triggers; a newly created index is filled
+    from the rows already in the database. A student index from before
+    student_fts_map existed (keyed by an unindexed student_id column) is
+    dropped and rebuilt.
+    """
+    if not _has_table(cur, "student_fts_map"):
+        for event in ("insert", "delete", "update"):
+            cur.execute(f"DROP TRIGGER IF EXISTS student_fts_{event}")
+        cur.execute("DROP TABLE IF EXISTS student_fts")
+        for ddl in _STUDENT_FTS_DDL:
+            cur.execute(ddl)
+        cur.execute(
+            "INSERT INTO student_fts_map (student_id) "
+            "SELECT student_id FROM student ORDER BY student_id"
+        )
+        cur.execute(
+            """
+            INSERT INTO student_fts (rowid, name, email)
+            SELECT m.fts_rowid, s.name, s.email
+            FROM student_fts_map AS m
+            JOIN student AS s ON s.student_id = m.student_id
+            """
+        )
+
+    existed = _has_table(cur, "wellbeing_fts")
+    for ddl in _WELLBEING_FTS_DDL:
+        cur.execute(ddl)
+    if not existed:
+        cur.execute("INSERT INTO wellbeing_fts (wellbeing_fts) VALUES ('rebuild')")
+
+
+def match_query(text: Optional[str]) -> Optional[str]:
+    """
+    FTS5 query for free text typed by a user: every word as a quoted prefix
+    term, all required. None when the text has no words.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _like_terms(text: str) -> List[str]:
+    return [f"%{word}%" for word in re.findall(r"\w+", text or "")]
+
+
+# ================== Students ==================
+def search_students(query: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+    """
+    Students whose name or email matches ``query``, best match first.
+
+    return:
+        {
+          "total": 3,          # all matches, for pagination
+          "rows": [Row(student_id, name, email, programme_id, snippet), ...]
+        }
+    """
+    match = match_query(query)
+    if match is None:
+        return {"total": 0, "rows": []}
+
+    conn = get_conn(row_factory=_sqlite3.Row)
+    cur = conn.cursor()
+    try:
+        if not _has_table(cur, "student_fts_map"):
+            return _like_students(cur, query, limit, offset)
+        total = cur.execute(
+            "SELECT COUNT(*) FROM student_fts WHERE student_fts MATCH ?", (match,)
+        ).fetchone()[0]
+        rows = cur.execute(
+            """
+            SELECT
+                s.student_id,
+                s.name,
+                s.email,
+                s.programme_id,
+                snippet(student_fts, -1, ?, ?, '…', ?) AS snippet
+            FROM student_fts AS f
+            JOIN student_fts_map AS m ON m.fts_rowid = f.rowid
+            JOIN student AS s ON s.student_id = m.student_id
+            WHERE student_fts MATCH ?
+            ORDER BY f.rank, s.student_id
+            LIMIT ? OFFSET ?
+            """,
+            (MARK_START, MARK_END, SNIPPET_TOKENS, match, limit, offset),
+        ).fetchall()
+        return {"total": total, "rows": rows}
+    finally:
+        conn.close()
+
+
+def _like_students(cur, query: str, limit: int, offset: int) -> Dict[str, Any]:
+    terms = _like_terms(query)
+    where = " AND ".join("(name LIKE ? OR IFNULL(email, '') LIKE ?)" for _ in terms)
+    params = [t for term in terms for t in (term, term)]
+    total = cur.execute(
+        f"SELECT COUNT(*) FROM student WHERE {where}", params
+    ).fetchone()[0]
+    rows = cur.execute(
+        f"""
+        SELECT student_id, name, email, programme_id,
+               name || ' ' || IFNULL(email, '') AS snippet
+        FROM student WHERE {where}
+        ORDER BY student_id LIMIT ? OFFSET ?
+        """,
+        params + [limit, offset],
+    ).fetchall()
+    return {"total": total, "rows": rows}
+
+
+# ================== Wellbeing comments ==================
+def search_wellbeing(
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    student_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Wellbeing records whose comment matches ``query``, best match first,
+    optionally for one student.
+
+    return:
+        {
+          "total": 12,
+          "rows": [Row(id, student_id, name, week, stress_level, hours_slept,
+                       snippet), ...]
+        }
+    """
+    match = match_query(query)
+    if match is None:
+        return {"total": 0, "rows": []}
+
+    conn = get_conn(row_factory=_sqlite3.Row)
+    cur = conn.cursor()
+    try:
+        if not _has_table(cur, "wellbeing_fts"):
+            return _like_wellbeing(cur, query, limit, offset, student_id)
+        student_where = ""
+        params: List[Any] = [match]
+        if student_id:
+            student_where = " AND w.student_id = ?"
+            params.append(student_id)
+        total = cur.execute(
+            f"""
+            SELECT COUNT(*)
+            FROM wellbeing_fts AS f
+            JOIN wellbeing AS w ON w.id = f.rowid
+            WHERE wellbeing_fts MATCH ? {student_where}
+            """,
+            params,
+        ).fetchone()[0]
+        rows = cur.execute(
+            f"""
+            SELECT
+                w.id,
+                w.student_id,
+                s.name,
+                w.week,
+                w.stress_level,
+                w.hours_slept,
+                snippet(wellbeing_fts, 0, ?, ?, '…', ?) AS snippet
+            FROM wellbeing_fts AS f
+            JOIN wellbeing AS w ON w.id = f.rowid
+            JOIN student AS s ON s.student_id = w.student_id
+            WHERE wellbeing_fts MATCH ? {student_where}
+            ORDER BY f.rank, w.id
+            LIMIT ? OFFSET ?
+            """,
+            [MARK_START, MARK_END, SNIPPET_TOKENS] + params + [limit, offset],
+        ).fetchall()
+        return {"total": total, "rows": rows}
+    finally:
+        conn.close()
+
+
+def _like_wellbeing(
+    cur, query: str, limit: int, offset: int, student_id: Optional[str]
+) -> Dict[str, Any]:
+    terms = _like_terms(query)
+    where = " AND ".join("w.comment LIKE ?" for _ in terms)
+    params: List[Any] = list(terms)
+    if student_id:
+        where += " AND w.student_id = ?"
+        params.append(student_id)
+    total = cur.execute(
+        f"SELECT COUNT(*) FROM wellbeing AS w WHERE {where}", params
+    ).fetchone()[0]
+    rows = cur.execute(
+        f"""
+        SELECT w.id, w.student_id, s.name, w.week, w.stress_level, w.hours_slept,
+               w.comment AS snippet
+        FROM wellbeing AS w
+        JOIN student AS s ON s.student_id = w.student_id
+        WHERE {where}
+        ORDER BY w.id LIMIT ? OFFSET ?
+        """,
+        params + [limit, offset],
+    ).fetchall()
+    return {"total": total, "rows": rows}
@@ -0,0 +1,301 @@
+# student_features.py
+"""
+Per-student feature vectors, maintained at write time.
+
+A student is described by the same few numbers across the analytics:
+attendance rate, submission rate, average grade, mean stress and mean sleep.
+Instead of deriving them from the raw rows in every service (the programme-wide
+attendance-vs-grade scatter reads them from here), two tables keep the
+additive parts:
+
+  student_features         one row per (student, week):
+                             att_present / att_total → attendance sessions
+                                                       of enrolled modules
+                             stress_level / hours_slept / has_wellbeing
+                                                     → that week's check-in
+  student_feature_totals   one row per student (submissions have no week):
+                             sub_submitted / sub_total / grade_sum / grade_cnt
+
+so a vector for any week range is one GROUP BY over the (student_id, week)
+primary key (get_student_features).
+
+Like risk_state, create / update / delete call refresh_student_features in
+their own transaction with the students they touched, and those students'
+rows are rebuilt from their raw rows. student_features_config marks a built
+table: on a database without it writes skip the refresh and
+get_student_features returns None, so services compute from the raw rows
+until init_db_schema or rebuild_student_features builds it.
+"""
+
+import sqlite3 as _sqlite3
+import time
+from typing import Iterable, List, Optional, Sequence
+
+from student_wellbeing_monitor.database.columns import ColumnarRows
+from student_wellbeing_monitor.database.db_core import get_analytics_conn
+from student_wellbeing_monitor.database.writer import write_op
+
+_REFRESH_CHUNK = 500  # students per IN (...) list
+
+_FEATURES_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS student_features (
+        student_id     TEXT NOT NULL,
+        week           INTEGER NOT NULL,
+        att_present    INTEGER NOT NULL DEFAULT 0,
+        att_total      INTEGER NOT NULL DEFAULT 0,
+        stress_level   INTEGER,
+        hours_slept    REAL,
+        has_wellbeing  INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, week)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS student_feature_totals (
+        student_id     TEXT PRIMARY KEY,
+        sub_submitted  INTEGER NOT NULL DEFAULT 0,
+        sub_total      INTEGER NOT NULL DEFAULT 0,
+        grade_sum      REAL NOT NULL DEFAULT 0,
+        grade_cnt      INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS student_features_config (
+        id        INTEGER PRIMARY KEY CHECK (id = 1),
+        built_at  REAL NOT NULL
+    )
+    """,
+)
+
+
+def create_student_features_tables(cur) -> None:
+    """
+    Create the feature tables. On a database that already holds records, the
+    features are built from them right away.
+    """
+    for ddl in _FEATURES_DDL:
+        cur.execute(ddl)
+    cur.execute(
+        "INSERT OR IGNORE INTO student_features_config (id, built_at) VALUES (1, ?)",
+        (time.time(),),
+    )
+    if cur.rowcount == 1:
+        _rebuild(cur)
+
+
+def features_built(cur) -> bool:
+    try:
+        row = cur.execute(
+            "SELECT 1 FROM student_features_config WHERE id = 1"
+        ).fetchone()
+    except _sqlite3.OperationalError:
+        return False
+    return row is not None
+
+
+# ================== Maintenance (write path) ==================
+def _write_features(cur, student_ids: Sequence[str]) -> None:
+    """Replace the rows of ``student_ids`` with ones built from raw records."""
+    placeholders = ",".join("?" * len(student_ids))
+    ids = list(student_ids)
+    cur.execute(
+        f"DELETE FROM student_features WHERE student_id IN ({placeholders})", ids
+    )
+    cur.execute(
+        f"DELETE FROM student_feature_totals WHERE student_id IN ({placeholders})",
+        ids,
+    )
+    cur.execute(
+        f"""
+        INSERT INTO student_features (
+            student_id, week, att_present, att_total,
+            stress_level, hours_slept, has_wellbeing
+        )
+        SELECT student_id, week, SUM(present), SUM(total),
+               MAX(stress_level), MAX(hours_slept), MAX(has_wellbeing)
+        FROM (
+            SELECT a.student_id, a.week,
+                   a.status AS present, 1 AS total,
+                   NULL AS stress_level, NULL AS hours_slept, 0 AS has_wellbeing
+            FROM attendance AS a
+            JOIN student_module AS sm
+              ON a.student_id = sm.student_id
+             AND a.module_id  = sm.module_id
+            WHERE a.student_id IN ({placeholders})
+            UNION ALL
+            SELECT w.student_id, w.week,
+                   0, 0,
+                   w.stress_level, w.hours_slept, 1
+            FROM wellbeing AS w
+            WHERE w.student_id IN ({placeholders})
+        )
+        GROUP BY student_id, week
+        """,
+        ids + ids,
+    )
+    cur.execute(
+        f"""
+        INSERT INTO student_feature_totals (
+            student_id, sub_submitted, sub_total, grade_sum, grade_cnt
+        )
+        SELECT sub.student_id,
+               SUM(sub.submitted), COUNT(*),
+               COALESCE(SUM(sub.grade), 0), COUNT(sub.grade)
+        FROM submission AS sub
+        JOIN student_module AS sm
+          ON sub.student_id = sm.student_id
+         AND sub.module_id  = sm.module_id
+        WHERE sub.student_id IN ({placeholders})
+        GROUP BY sub.student_id
+        """,
+        ids,
+    )
+
+
+def refresh_student_features(cur, student_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Rebuild the features of ``student_ids`` (every student when None) in the
+    caller's transaction. No-op on databases whose features were never built.
+    """
+    cur = cur.connection.cursor()  # keep the caller's lastrowid
+    if not features_built(cur):
+        return
+    if student_ids is None:
+        _rebuild(cur)
+        return
+    student_ids = sorted({str(sid) for sid in student_ids if sid is not None})
+    for i in range(0, len(student_ids), _REFRESH_CHUNK):
+        _write_features(cur, student_ids[i : i + _REFRESH_CHUNK])
+
+
+def clear_student_features(cur, student_ids: Sequence[str]) -> None:
+    """Drop the features of ``student_ids`` (e.g. purged students)."""
+    cur = cur.connection.cursor()
+    if not student_ids or not features_built(cur):
+        return
+    placeholders = ",".join("?" * len(student_ids))
+    for table in ("student_features", "student_feature_totals"):
+        cur.execute(
+            f"DELETE FROM {table} WHERE student_id IN ({placeholders})",
+            list(student_ids),
+        )
+
+
+def _rebuild(cur) -> int:
+    cur.execute("DELETE FROM student_features")
+    cur.execute("DELETE FROM student_feature_totals")
+    student_ids = [
+        r[0]
+        for r in cur.execute(
+            """
+            SELECT student_id FROM attendance
+            UNION SELECT student_id FROM wellbeing
+            UNION SELECT student_id FROM submission
+            """
+        ).fetchall()
+    ]
+    for i in range(0, len(student_ids), _REFRESH_CHUNK):
+        _write_features(cur, student_ids[i : i + _REFRESH_CHUNK])
+    cur.execute(
+        "UPDATE student_features_config SET built_at = ? WHERE id = 1", (time.time(),)
+    )
+    return len(student_ids)
+
+
+@write_op
+def rebuild_student_features(cur) -> int:
+    """
+    Recompute the features of every student, e.g. once for a database created
+    before the tables existed. Returns the number of students with records.
+    """
+    create_student_features_tables(cur)
+    return _rebuild(cur)
+
+
+# ================== Lookup (read path) ==================
+# column layout of get_student_features
+FEATURE_COLUMNS = (
+    ("student_id", "code"),
+    ("name", "code"),
+    ("programme_name", "code"),
+    ("att_total", "int16"),
+    ("attendance_rate", "float64"),
+    ("submission_rate", "float64"),
+    ("avg_grade", "float64"),
+    ("wellbeing_weeks", "int16"),
+    ("mean_stress", "float64"),
+    ("mean_sleep", "float64"),
+    ("high_weeks", "int16"),
+)
+
+
+def get_student_features(
+    programme_id: Optional[str] = None,
+    week_start: Optional[int] = None,
+    week_end: Optional[int] = None,
+    stress_threshold: Optional[float] = None,
+    sleep_threshold: Optional[float] = None,
+) -> Optional[ColumnarRows]:
+    """
+    One feature vector per student with records in the week range, as a
+    ColumnarRows laid out as FEATURE_COLUMNS, ordered by student_id:
+      - att_total / attendance_rate → sessions of enrolled modules in range
+      - submission_rate / avg_grade → all submissions (they have no week)
+      - wellbeing_weeks / mean_stress / mean_sleep → check-ins in range
+      - high_weeks → check-ins with stress >= stress_threshold and sleep
+                     < sleep_threshold (0 when no thresholds are given)
+    Rates are NaN without data. Returns None while the features are not built.
+    """
+    conn = get_analytics_conn(row_factory=None)
+    try:
+        if not features_built(conn.cursor()):
+            return None
+
+        where = ""
+        params: List = []
+        if programme_id is not None:
+            where += " AND s.programme_id = ?"
+            params.append(programme_id)
+        if week_start is not None:
+            where += " AND f.week >= ?"
+            params.append(week_start)
+        if week_end is not None:
+            where += " AND f.week <= ?"
+            params.append(week_end)
+
+        if stress_threshold is None or sleep_threshold is None:
+            high = "0"
+            high_params: List = []
+        else:
+            high = """SUM(CASE WHEN f.stress_level >= ? AND f.hours_slept < ?
+                               THEN 1 ELSE 0 END)"""
+            high_params = [stress_threshold, sleep_threshold]
+
+        sql = f"""
+            SELECT
+                f.student_id,
+                s.name,
+                p.programme_name,
+                SUM(f.att_total),
+                1.0 * SUM(f.att_present) / NULLIF(SUM(f.att_total), 0),
+                1.0 * t.sub_submitted / NULLIF(t.sub_total, 0),
+                t.grade_sum / NULLIF(t.grade_cnt, 0),
+                SUM(f.has_wellbeing),
+                AVG(f.stress_level),
+                AVG(f.hours_slept),
+                {high}
+            FROM student_features AS f
+            JOIN student AS s
+              ON f.student_id = s.student_id
+            LEFT JOIN programme AS p
+              ON s.programme_id = p.programme_id
+            LEFT JOIN student_feature_totals AS t
+              ON f.student_id = t.student_id
+            WHERE 1 = 1 {where}
+            GROUP BY f.student_id
+            ORDER BY f.student_id
+        """
+        rows = conn.execute(sql, high_params + params).fetchall()
+    finally:
+        conn.close()
+    return ColumnarRows.from_rows(FEATURE_COLUMNS, rows)
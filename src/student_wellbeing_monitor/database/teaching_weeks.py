@@ -0,0 +1,140 @@
+# teaching_weeks.py
+"""
+Integer day numbers for submission dates, and the teaching week they fall in.
+
+submission.due_date / submit_date are YYYY-MM-DD text. Two integer columns
+hold the same dates as days since 1970-01-01:
+
+  due_day     → due_date, indexed
+  submit_day  → submit_date (NULL while not submitted)
+
+Triggers fill them on every insert and on any update of the text columns, so
+CSV upserts, edits and the mock seeding need no changes. A database created
+before the columns existed is migrated by init_db_schema (ALTER TABLE + one
+backfill UPDATE); until then readers compute the day numbers with julianday().
+
+Teaching weeks are numbered like the dashboard week selector: week 1 is the
+seven days from the term start, WELLBEING_TERM_START (YYYY-MM-DD). Wellbeing
+and attendance rows only carry week numbers, never dates, so the term start
+cannot be derived from the data and has to be configured. Without it a week
+range does not filter submissions at all (a warning is printed once) rather
+than guessing a calendar that may not match the selector. Weeks are derived
+at query time: a week range becomes a due_day range, so changing the term
+start needs no rewrite of the stored rows.
+"""
+
+import os
+from datetime import date
+from typing import Optional, Tuple
+
+EPOCH = date(1970, 1, 1)
+TERM_START = os.environ.get("WELLBEING_TERM_START") or None
+_warned_no_term_start = False
+
+# julianday() of a date is at noon of the previous day: x.5 → exact integers
+_DAY_SQL = "CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+DAY_COLUMNS = {"due_day": "due_date", "submit_day": "submit_date"}
+
+_TRIGGER_SET = ", ".join(
+    f"{day} = {_DAY_SQL.format(column='new.' + text)}"
+    for day, text in DAY_COLUMNS.items()
+)
+
+_SUBMISSION_DAYS_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS submission_days_insert
+    AFTER INSERT ON submission BEGIN
+        UPDATE submission SET {_TRIGGER_SET} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS submission_days_update
+    AFTER UPDATE OF due_date, submit_date ON submission BEGIN
+        UPDATE submission SET {_TRIGGER_SET} WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_submission_due_day
+        ON submission (due_day, student_id)
+    """,
+)
+
+
+def day_number(value: Optional[str]) -> Optional[int]:
+    """Days since 1970-01-01 of a YYYY-MM-DD string; None for empty input."""
+    if not value:
+        return None
+    return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+
+
+def has_day_columns(cur) -> bool:
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(submission)")}
+    return all(day in columns for day in DAY_COLUMNS)
+
+
+def due_day_sql(alias: str = "sub", cur=None) -> str:
+    """
+    SQL expression for the due day of submission ``alias``: the indexed
+    column, or julianday() on a database that has not been migrated yet.
+    """
+    if cur is None or has_day_columns(cur):
+        return f"{alias}.due_day"
+    return _DAY_SQL.format(column=f"{alias}.due_date")
+
+
+def create_submission_day_columns(cur) -> None:
+    """
+    Add due_day / submit_day to an older submission table and backfill them,
+    then create the triggers and the index.
+    """
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(submission)")}
+    missing = [day for day in DAY_COLUMNS if day not in columns]
+    for day in missing:
+        cur.execute(f"ALTER TABLE submission ADD COLUMN {day} INTEGER")
+    if missing:
+        backfill = ", ".join(
+            f"{day} = {_DAY_SQL.format(column=text)}"
+            for day, text in DAY_COLUMNS.items()
+        )
+        cur.execute(f"UPDATE submission SET {backfill}")
+        print(f"🗓️ Backfilled {', '.join(missing)} for {cur.rowcount} submissions.")
+    for ddl in _SUBMISSION_DAYS_DDL:
+        cur.execute(ddl)
+
+
+# ================== Teaching weeks ==================
+def term_start_day() -> Optional[int]:
+    """Day number of the first day of week 1, or None while TERM_START is unset."""
+    return day_number(TERM_START)
+
+
+def teaching_week(day: Optional[int], start_day: Optional[int]) -> Optional[int]:
+    """Teaching week of a day number (days before the term give week 0 or less)."""
+    if day is None or start_day is None:
+        return None
+    return (day - start_day) // 7 + 1
+
+
+def week_day_range(
+    week_start: Optional[int] = None, week_end: Optional[int] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (first_day, last_day) covered by teaching weeks week_start..week_end, for
+    a ``due_day BETWEEN`` filter; an open end is None, and so are both while
+    the term start is not configured.
+    """
+    global _warned_no_term_start
+    if week_start is None and week_end is None:
+        return None, None
+    start_day = term_start_day()
+    if start_day is None:
+        if not _warned_no_term_start:
+            _warned_no_term_start = True
+            print(
+                "⚠️ WELLBEING_TERM_START is not set: "
+                "submissions are not filtered by teaching week."
+            )
+        return None, None
+    first = start_day + 7 * (week_start - 1) if week_start is not None else None
+    last = start_day + 7 * week_end - 1 if week_end is not None else None
+    return first, last
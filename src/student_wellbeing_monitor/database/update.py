@@ -1,11 +1,24 @@
 # update.py
-from student_wellbeing_monitor.database.db_core import get_conn
+from student_wellbeing_monitor.database.db_core import bump_data_version
+from student_wellbeing_monitor.database.risk_state import refresh_risk_state
+from student_wellbeing_monitor.database.student_features import (
+    refresh_student_features,
+)
+from student_wellbeing_monitor.database.writer import write_op
 
 
-def update_wellbeing(record_id: int, new_stress: int, new_sleep: float):
+def _refresh_owner(cur, table: str, record_id: int) -> None:
+    """Refresh the features of the student owning ``table`` row ``record_id``."""
+    owner = cur.execute(
+        f"SELECT student_id FROM {table} WHERE id = ?", (record_id,)
+    ).fetchone()
+    if owner is not None:
+        refresh_student_features(cur, [owner[0]])
+
+
+@write_op
+def update_wellbeing(cur, record_id: int, new_stress: int, new_sleep: float):
     """Update stress_level and hours_slept using primary key id."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         """
         UPDATE wellbeing
@@ -14,16 +27,19 @@ def update_wellbeing(record_id: int, new_stress: int, new_sleep: float):
         """,
         (new_stress, new_sleep, record_id),
     )
-    conn.commit()
-    conn.close()
+    owner = cur.execute(
+        "SELECT student_id FROM wellbeing WHERE id = ?", (record_id,)
+    ).fetchone()
+    if owner is not None:
+        refresh_risk_state(cur, [owner[0]])
+        refresh_student_features(cur, [owner[0]])
+    bump_data_version(cur, "wellbeing", rewrite=True)
 
     print(f"Updated wellbeing id={record_id}: stress={new_stress}, sleep={new_sleep}")
 
 
-def update_attendance(record_id: int, status: int, week: int = None):
-    conn = get_conn()
-    cur = conn.cursor()
-
+@write_op
+def update_attendance(cur, record_id: int, status: int, week: int = None):
     if week is None:
         cur.execute(
             "UPDATE attendance SET status = ? WHERE id = ?", (status, record_id)
@@ -33,17 +49,14 @@ def update_attendance(record_id: int, status: int, week: int = None):
             "UPDATE attendance SET status = ?, week = ? WHERE id = ?",
             (status, week, record_id),
         )
-
-    conn.commit()
-    conn.close()
+    _refresh_owner(cur, "attendance", record_id)
+    bump_data_version(cur, "attendance", rewrite=True)
 
 
+@write_op
 def update_submission(
-    record_id: int, submitted: int, grade: float, due_date, submit_date
+    cur, record_id: int, submitted: int, grade: float, due_date, submit_date
 ):
-    conn = get_conn()
-    cur = conn.cursor()
-
     cur.execute(
         """
         UPDATE submission
@@ -52,18 +65,14 @@ def update_submission(
         """,
         (submitted, grade, due_date, submit_date, record_id),
     )
-
-    conn.commit()
-    conn.close()
+    _refresh_owner(cur, "submission", record_id)
+    bump_data_version(cur, "submission", rewrite=True)
 
 
-def update_final_grade(student_id: str, new_grade: float):
+@write_op
+def update_final_grade(cur, student_id: str, new_grade: float):
     """Update final grade for a student."""
-    conn = get_conn()
-    cur = conn.cursor()
     cur.execute(
         "UPDATE grades SET final_grade = ? WHERE student_id = ?",
         (new_grade, student_id),
     )
-    conn.commit()
-    conn.close()
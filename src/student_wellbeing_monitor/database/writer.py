@@ -0,0 +1,228 @@
+# writer.py
+"""
+Single writer for all database mutations.
+
+One daemon thread owns the only write connection of the process. The
+create / update / delete helpers do not open connections of their own; they
+are written as operations ``op(cur, *args)`` and decorated with ``@write_op``,
+which queues them for the writer:
+
+    insert_wellbeing("S1", 3, 4, 6.5)               # blocks, returns the id
+    fut = insert_wellbeing.submit("S1", 3, 4, 6.5)  # returns a Future
+
+Group commit: the writer takes every operation that is waiting in the queue
+(up to MAX_BATCH) and runs them in one BEGIN IMMEDIATE ... COMMIT. Each
+operation runs inside its own SAVEPOINT, so a failing one (e.g. an
+IntegrityError) is rolled back alone and only its Future gets the exception.
+Futures are resolved after the COMMIT, so a caller never sees a result that
+is not yet durable. If the batch itself breaks (a SAVEPOINT or ROLLBACK TO
+fails), it is rolled back and every Future in it gets the exception; the
+thread carries on with the next batch.
+
+The writer is per process: writes in one process never compete with each
+other for the SQLite lock, so threaded servers no longer see "database is
+locked" between concurrent imports and edits. Other processes (each gunicorn
+worker of wellbeing-serve, command-line tools) have writers of their own and
+still take turns on the file lock; the database is in WAL mode, so those
+commits wait only for each other, never for readers, and the busy timeout
+covers the wait.
+
+Schema creation (schema.py) and cohort administration (cohort.py) keep their
+own connections: they run before serving or against files the app is not
+writing to.
+"""
+
+import functools
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from student_wellbeing_monitor.database import db_core
+
+MAX_BATCH = 256  # operations per shared transaction
+BUSY_TIMEOUT_MS = 5000  # waits for writers in other processes
+
+_Job = Tuple[Future, Callable[..., Any], tuple, dict]
+
+
+# =========================================================
+# Class: DatabaseWriter
+# =========================================================
+class DatabaseWriter:
+    """Writer thread + queue; use the module-level ``db_writer``."""
+
+    def __init__(self, max_batch: int = MAX_BATCH):
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[str] = None
+        self._cur: Optional[sqlite3.Cursor] = None  # cursor of the running op
+
+    # ---------- public API ----------
+    def submit(self, op: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue ``op(cur, *args, **kwargs)``; the Future holds its result."""
+        if threading.current_thread() is self._thread:
+            # an operation calling another write helper: same transaction
+            return self._run_inline(op, args, kwargs)
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((future, op, args, kwargs))
+        return future
+
+    def execute(self, op: Callable[..., Any], *args, **kwargs) -> Any:
+        """submit() and wait for the result (re-raises the op's exception)."""
+        return self.submit(op, *args, **kwargs).result()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish the queued operations, then stop the thread."""
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    # ---------- writer thread ----------
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked (e.g. a gunicorn worker): the parent's thread and
+                # connection did not come along
+                self._queue = queue.Queue()
+                self._thread = None
+                self._conn = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        # tests and cohort activation repoint DB_PATH at runtime
+        path = str(db_core.DB_PATH)
+        if self._conn is None or self._conn_path != path:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = db_core.get_conn()
+            self._conn.isolation_level = None  # explicit BEGIN / COMMIT
+            self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            # files from before init_db_schema switched to WAL (see schema.py)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn_path = path
+        return self._conn
+
+    def _next_batch(self) -> List[Optional[_Job]]:
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            jobs = [job for job in batch if job is not None]
+            if jobs:
+                self._commit_batch(jobs)
+            if batch[-1] is None:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                return
+
+    def _commit_batch(self, jobs: List[_Job]) -> None:
+        jobs = [job for job in jobs if job[0].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        try:
+            self._run_batch(jobs)
+        except BaseException as e:
+            # e.g. SAVEPOINT or ROLLBACK TO failed: nothing of the batch was
+            # committed, and no caller may be left waiting on its Future
+            self._abort()
+            for future, *_ in jobs:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _run_batch(self, jobs: List[_Job]) -> None:
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            for future, *_ in jobs:
+                future.set_exception(e)
+            return
+
+        done = []
+        for future, op, args, kwargs in jobs:
+            conn.execute("SAVEPOINT write_op")
+            try:
+                self._cur = conn.cursor()
+                result = op(self._cur, *args, **kwargs)
+                conn.execute("RELEASE write_op")
+                done.append((future, result))
+            except Exception as e:  # handed to the caller
+                conn.execute("ROLLBACK TO write_op")
+                conn.execute("RELEASE write_op")
+                future.set_exception(e)
+            finally:
+                self._cur = None
+
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _result in done:
+                future.set_exception(e)
+            return
+        for future, result in done:
+            future.set_result(result)
+
+    def _abort(self) -> None:
+        """Roll back a broken batch; drop the connection if even that fails."""
+        conn, self._cur = self._conn, None
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            conn.close()
+            self._conn = None
+
+    def _run_inline(self, op, args, kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(op(self._cur.connection.cursor(), *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+db_writer = DatabaseWriter()
+
+
+def write_op(op: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Turn ``op(cur, *args)`` into a helper ``f(*args)`` that runs it on the
+    writer and returns its result; ``f.submit(*args)`` returns the Future.
+    """
+
+    @functools.wraps(op)
+    def call(*args, **kwargs):
+        return db_writer.execute(op, *args, **kwargs)
+
+    call.submit = functools.partial(db_writer.submit, op)
+    return call
@@ -0,0 +1,163 @@
+# src/student_wellbeing_monitor/services/analytics_snapshot.py
+"""
+Read-only analytics replica of the live database.
+
+In snapshot mode (db_core.ANALYTICS_SNAPSHOT) the analytic queries of read.py
+run against student.analytics.db instead of student.db, so long aggregations
+never hold a read transaction open on the file the write path uses.
+
+The replica is copied with SQLite's online backup API a few pages per step,
+sleeping between steps, so the live database is only locked for one short
+step at a time. A write that lands during the copy makes SQLite restart it;
+the finished copy is therefore always a consistent image. It is written to a
+temporary file and swapped in with os.replace, so readers see either the old
+or the new replica, never a half-copied one.
+
+The replica's mtime is set to the moment the copy started. Readers use it only
+while it is younger than db_core.ANALYTICS_MAX_STALENESS seconds; after that
+they fall back to the live database until the next refresh.
+"""
+
+import argparse
+import os
+import signal
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from student_wellbeing_monitor.database import db_core
+
+BACKUP_PAGES = 256  # pages copied per step (1 MiB at the default page size)
+BACKUP_SLEEP = 0.005  # seconds between steps, leaves the writer room
+
+
+def refresh_snapshot(pages: int = BACKUP_PAGES, sleep: float = BACKUP_SLEEP) -> float:
+    """
+    Copy the live database into the analytics replica. Returns the time the
+    copy started, which is also the replica's new mtime.
+    """
+    replica = db_core.analytics_db_path()
+    tmp = replica.with_name(f"{replica.name}.{os.getpid()}.tmp")
+    started = time.time()
+
+    src = db_core.get_conn(row_factory=None)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+        # read-only opens of a WAL file need a writable -shm next to it
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+    os.replace(tmp, replica)
+    os.utime(replica, (started, started))
+    return started
+
+
+def configure(enabled: bool = True, max_staleness: Optional[float] = None) -> None:
+    """Switch snapshot mode for this process (and the workers it forks)."""
+    db_core.ANALYTICS_SNAPSHOT = enabled
+    if max_staleness is not None:
+        db_core.ANALYTICS_MAX_STALENESS = float(max_staleness)
+
+
+def snapshot_status() -> Dict[str, Any]:
+    """
+    Freshness of the analytic data, for the dashboard:
+    {
+      "enabled": True,
+      "source": "snapshot",           # or "live"
+      "refreshedAt": "14:03:21",      # None when reading live
+      "ageSeconds": 12,
+      "maxStaleness": 60,
+    }
+    """
+    copied_at = db_core.snapshot_time()
+    return {
+        "enabled": db_core.ANALYTICS_SNAPSHOT,
+        "source": "live" if copied_at is None else "snapshot",
+        "refreshedAt": (
+            None
+            if copied_at is None
+            else datetime.fromtimestamp(copied_at).strftime("%H:%M:%S")
+        ),
+        "ageSeconds": None if copied_at is None else int(time.time() - copied_at),
+        "maxStaleness": int(db_core.ANALYTICS_MAX_STALENESS),
+    }
+
+
+# =========================================================
+# Class: SnapshotRefresher
+# =========================================================
+class SnapshotRefresher:
+    """
+    Daemon thread that refreshes the replica every half staleness bound, so a
+    copy that takes up to that long still lands before readers give up on the
+    previous one. A failed refresh is logged and retried on the next tick.
+    """
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="analytics-snapshot", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        """Refresh until stop(); the thread's body, or a process's main loop."""
+        while not self._stop.is_set():
+            try:
+                started = refresh_snapshot()
+                print(
+                    f"📸 Analytics snapshot refreshed in "
+                    f"{time.time() - started:.2f}s"
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Analytics snapshot refresh failed: {e}")
+            self._stop.wait(max(1.0, db_core.ANALYTICS_MAX_STALENESS / 2))
+
+
+snapshot_refresher = SnapshotRefresher()
+
+
+def main():
+    """
+    Keep the replica of --db fresh until SIGTERM; started by wellbeing-serve
+    as the one refresher process next to the gunicorn workers.
+    """
+    parser = argparse.ArgumentParser(description="Refresh the analytics replica.")
+    parser.add_argument("--db", type=str, default=str(db_core.DB_PATH))
+    parser.add_argument(
+        "--max-staleness", type=float, default=db_core.ANALYTICS_MAX_STALENESS
+    )
+    args = parser.parse_args()
+
+    db_core.DB_PATH = args.db
+    configure(enabled=True, max_staleness=args.max_staleness)
+    # SIGTERM ends the loop after the copy in progress; ^C goes to gunicorn
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: snapshot_refresher.stop())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    snapshot_refresher.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,11 @@ import csv
 import os
 from collections import defaultdict
 
-from student_wellbeing_monitor.database.delete import (
-    delete_all_attendance,
-    delete_all_student_modules,
-    delete_all_students,
-    delete_all_submissions,
-    delete_all_wellbeing,
-)
+from student_wellbeing_monitor.database.delete import purge_student_data
 from student_wellbeing_monitor.database.read import (
-    count_attendance,
-    count_submission,
-    get_attendance_page,
-    get_submission_page,
-    get_wellbeing_records,
+    iter_attendance_records,
+    iter_submission_records,
+    iter_wellbeing_records,
 )
 
 
@@ -46,8 +38,8 @@ def export_wellbeing_summary(output_dir: str) -> None:
 
     No student-level rows are exported.
     """
-    # get_wellbeing_records(start_week, end_week, programme_id=None, student_id=None)
-    rows = get_wellbeing_records(1, 99, programme_id=None, student_id=None)
+    # streamed: only the per-(programme, week) sums are held in memory
+    rows = iter_wellbeing_records(1, 99, programme_id=None, student_id=None)
 
     # rows: (student_id, week, stress_level, hours_slept, programme_id)
     grouped = defaultdict(
@@ -110,20 +102,15 @@ def export_attendance_summary(output_dir: str) -> None:
     """
     Export an anonymised attendance summary.
 
-    Assumes get_attendance_page returns:
-      (id, student_id, module_id, week, status)
+    Streams the rows of iter_attendance_records:
+      (id, student_id, name, module_id, module_code, module_name, week, status)
     Aggregation:
       - Group by (module_id, week)
       - For each group: attendance_rate, present_count, total_count
 
     No student-level rows are exported.
     """
-    total = count_attendance()
-    if total == 0:
-        print("ℹ No attendance data to export.")
-        return
-
-    rows = get_attendance_page(limit=total, offset=0)
+    rows = iter_attendance_records()
 
     # Use dict-based access, NOT unpacking
     grouped = defaultdict(lambda: {"present": 0, "total": 0})
@@ -142,6 +129,10 @@ def export_attendance_summary(output_dir: str) -> None:
         except (KeyError, ValueError, TypeError):
             pass
 
+    if not grouped:
+        print("ℹ No attendance data to export.")
+        return
+
     out_rows = []
     for (module_id, week), agg in grouped.items():
         total_count = agg["total"]
@@ -176,12 +167,7 @@ def export_submission_summary(output_dir: str) -> None:
       - submitted_count
       - avg_grade_submitted
     """
-    total = count_submission()
-    if total == 0:
-        print("ℹ No submission data to export.")
-        return
-
-    rows = get_submission_page(limit=total, offset=0)
+    rows = iter_submission_records()
 
     # key: (module_id, due_date)  -> aggregated stats
     grouped = defaultdict(
@@ -223,6 +209,10 @@ def export_submission_summary(output_dir: str) -> None:
             #  If "submitted" is not 0/1, it is treated as unsubmitted and skipped
             pass
 
+    if not grouped:
+        print("ℹ No submission data to export.")
+        return
+
     out_rows = []
     for (module_id, due_date), agg in grouped.items():
         total = agg["total"]
@@ -260,22 +250,22 @@ def export_submission_summary(output_dir: str) -> None:
 # -----------------------------
 
 
-def delete_all_data():
-    """
-    Delete all student-related records in the correct order:
-    1. Child tables (wellbeing, attendance, submission, student_module)
-    2. Parent table (student)
+def delete_all_data(chunk_size: int = 500) -> dict:
     """
-    # 1) Delete child tables that reference student_id
-    delete_all_wellbeing()
-    delete_all_attendance()
-    delete_all_submissions()
-    delete_all_student_modules()  # delete relationship first
+    Delete all student-related records and reclaim the freed disk space.
 
-    # 2) Finally delete from student
-    delete_all_students()
+    Students are purged in chunks; every chunk removes the students together
+    with their wellbeing, attendance, submission and student_module rows in
+    one transaction, so the web app is never locked out for long and an
+    interrupted run leaves no half-deleted students behind (re-run to finish).
+    """
+    result = purge_student_data(chunk_size=chunk_size, reclaim=True)
 
+    for table, count in result["deleted"].items():
+        print(f"  - {table}: {count} rows deleted")
+    print(f"  - {result['freed_pages']} pages returned to the file system")
     print("✓ All student-related records have been deleted.")
+    return result
 
 
 # -----------------------------
@@ -283,7 +273,7 @@ def delete_all_data():
 # -----------------------------
 
 
-def run_archive(output_dir: str, delete_confirm: bool) -> None:
+def run_archive(output_dir: str, delete_confirm: bool, chunk_size: int = 500) -> None:
     print("=== Exporting anonymised aggregated summaries ===")
 
     export_wellbeing_summary(output_dir)
@@ -301,7 +291,7 @@ def run_archive(output_dir: str, delete_confirm: bool) -> None:
     confirm = input("Type 'DELETE' to proceed: ")
 
     if confirm == "DELETE":
-        delete_all_data()
+        delete_all_data(chunk_size=chunk_size)
         print("✔ Archive complete — all individual data removed.")
     else:
         print("✗ Operation cancelled. No data deleted.")
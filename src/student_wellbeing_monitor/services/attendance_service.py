@@ -1,12 +1,32 @@
 # attendance_service.py
 
 from collections import defaultdict
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from student_wellbeing_monitor.database.read import (
-    attendance_detail_for_students,
-    attendance_for_course,
+    attendance_weekly_by_module,
+    iter_attendance_detail_for_students,
 )
+from student_wellbeing_monitor.services.dimension_cache import dimension_cache
+
+
+def _weekly_points(
+    present_by_week: Dict[int, int], total_by_week: Dict[int, int]
+) -> List[Dict[str, Any]]:
+    points: List[Dict[str, Any]] = []
+    for week in sorted(total_by_week.keys()):
+        total = total_by_week[week]
+        present = present_by_week.get(week, 0)
+        rate = present / total if total > 0 else 0.0
+        points.append(
+            {
+                "week": week,
+                "attendanceRate": round(rate, 2),
+                "presentCount": int(present),
+                "totalCount": int(total),
+            }
+        )
+    return points
 
 
 # =========================================================
@@ -18,6 +38,7 @@ class AttendanceService:
 
     contain the method in APIdocuemnt.md:
       1️⃣ get_attendance_trends
+      2️⃣ get_module_attendance_trends
       3️⃣ get_low_attendance_students
     """
 
@@ -49,51 +70,96 @@ class AttendanceService:
           ]
         }
         """
-        rows = attendance_for_course(
+        trends = self.get_module_attendance_trends(
             programme_id=programme_id,
-            module_id=course_id,
+            course_ids=[course_id] if course_id else None,
             week_start=week_start,
             week_end=week_end,
         )
-        # rows: (module_id, module_name, student_id, student_name, week, status)
-        if not rows:
+        modules = trends["modules"]
+        if not modules:
             return {
                 "courseId": course_id,
                 "courseName": None,
                 "points": [],
             }
 
-        course_name = rows[0][1]
+        return {
+            "courseId": course_id,
+            "courseName": modules[0]["courseName"],
+            "points": trends["programme"]["points"],
+        }
 
+    # -------------------------------------------------
+    # 2️⃣ attendance trends of several modules at once
+    # -------------------------------------------------
+    def get_module_attendance_trends(
+        self,
+        programme_id: Optional[str] = None,
+        course_ids: Optional[Sequence[str]] = None,
+        week_start: Optional[int] = None,
+        week_end: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Weekly attendance of every selected module (course_ids=None → all
+        modules the programme's students attend), from one grouped query.
+
+        return:
+        {
+          "programmeId": "...",
+          "weeks": [1, 2, 3],
+          "modules": [
+            {
+              "courseId": "...",
+              "courseCode": "...",
+              "courseName": "...",
+              "points": [{"week": 1, "attendanceRate": 0.8,
+                          "presentCount": 12, "totalCount": 15}, ...]
+            },
+            ...
+          ],
+          "programme": {"points": [...]}   # all selected modules summed per week
+        }
+        """
+        rows = attendance_weekly_by_module(
+            programme_id=programme_id,
+            module_ids=course_ids,
+            week_start=week_start,
+            week_end=week_end,
+        )
+        # rows: (module_id, week, present, total), ordered by module_id, week
+
+        module_info = {r["module_id"]: r for r in dimension_cache.modules()}
+
+        present_by_module: Dict[str, Dict[int, int]] = defaultdict(dict)
+        total_by_module: Dict[str, Dict[int, int]] = defaultdict(dict)
         present_by_week: Dict[int, int] = defaultdict(int)
         total_by_week: Dict[int, int] = defaultdict(int)
 
-        for _mid, _mname, _sid, _sname, week, status in rows:
-            if week is None:
-                continue
+        for module_id, week, present, total in rows:
             w = int(week)
-            total_by_week[w] += 1
-            # status 为 0 / 1（0 缺勤，1 出勤）
-            if status is not None and int(status) == 1:
-                present_by_week[w] += 1
+            present_by_module[module_id][w] = present
+            total_by_module[module_id][w] = total
+            present_by_week[w] += present
+            total_by_week[w] += total
 
-        points: List[Dict[str, Any]] = []
-        for week in sorted(total_by_week.keys()):
-            total = total_by_week[week]
-            present = present_by_week.get(week, 0)
-            rate = present / total if total > 0 else 0.0
-            points.append(
+        modules: List[Dict[str, Any]] = []
+        for module_id, totals in total_by_module.items():
+            info = module_info.get(module_id)
+            modules.append(
                 {
-                    "week": week,
-                    "attendanceRate": round(rate, 2),
-                    "presentCount": int(present),
-                    "totalCount": int(total),
+                    "courseId": module_id,
+                    "courseCode": info["module_code"] if info else module_id,
+                    "courseName": info["module_name"] if info else None,
+                    "points": _weekly_points(present_by_module[module_id], totals),
                 }
             )
+
         return {
-            "courseId": course_id,
-            "courseName": course_name,
-            "points": points,
+            "programmeId": programme_id,
+            "weeks": sorted(total_by_week.keys()),
+            "modules": modules,
+            "programme": {"points": _weekly_points(present_by_week, total_by_week)},
         }
 
     # -------------------------------------------------
@@ -134,7 +200,7 @@ class AttendanceService:
           ]
         }
         """
-        rows = attendance_detail_for_students(
+        rows = iter_attendance_detail_for_students(
             module_id=course_id,
             programme_id=programme_id,
             week_start=week_start,
@@ -142,18 +208,11 @@ class AttendanceService:
         )
         # rows: (module_id, module_name, student_id, student_name, email, week, status)
 
-        if not rows:
-            return {
-                "courseId": course_id,
-                "courseName": None,
-                "students": [],
-            }
-
-        course_name = rows[0][1]
-
-        # statistics per student's attendance
+        # statistics per student's attendance, streamed from the cursor
+        course_name = None
         stats: Dict[str, Dict[str, Any]] = {}
-        for _mid, _mname, sid, sname, email, _week, status in rows:
+        for _mid, mname, sid, sname, email, _week, status in rows:
+            course_name = mname
             if sid not in stats:
                 stats[sid] = {
                     "name": sname,
@@ -169,6 +228,13 @@ class AttendanceService:
             else:
                 stats[sid]["absent"] += 1
 
+        if not stats:
+            return {
+                "courseId": course_id,
+                "courseName": None,
+                "students": [],
+            }
+
         students: List[Dict[str, Any]] = []
         for sid, info in stats.items():
             total = info["total"]
@@ -0,0 +1,134 @@
+# chart_reduction.py
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SCATTER_MODES = ("auto", "points", "sample", "bin")
+
+# upper bounds on what a chart payload may contain
+MAX_POINTS = 1500
+GRID_BINS = 20  # 20 × 20 cells → at most 400 entries
+
+
+def _robust_z(values: np.ndarray) -> np.ndarray:
+    """|value - median| in units of the (scaled) median absolute deviation."""
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) * 1.4826
+    if mad == 0:
+        # more than half the values are identical: anything else stands out
+        return np.where(values == median, 0.0, np.inf)
+    return np.abs(values - median) / mad
+
+
+def sample_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int = MAX_POINTS,
+    outlier_share: float = 0.2,
+    z_threshold: float = 3.0,
+) -> np.ndarray:
+    """
+    Indices of at most ``max_points`` points, in ascending order.
+
+    Outliers (robust z-score above ``z_threshold`` on either axis) are kept
+    first, most extreme first, up to ``outlier_share`` of the budget. The
+    rest is a uniform random sample with a fixed seed, so the same data
+    always yields the same payload (and the same ETag).
+    """
+    n = x.shape[0]
+    if n <= max_points:
+        return np.arange(n)
+
+    score = np.maximum(_robust_z(x), _robust_z(y))
+    by_score = np.argsort(-score, kind="stable")
+    n_outliers = int(min((score > z_threshold).sum(), max_points * outlier_share))
+    outliers = by_score[:n_outliers]
+
+    rest = np.setdiff1d(np.arange(n), outliers, assume_unique=True)
+    rng = np.random.default_rng(0)
+    sampled = rng.choice(rest, size=max_points - n_outliers, replace=False)
+    return np.sort(np.concatenate([outliers, sampled]))
+
+
+def bin_counts(
+    x: np.ndarray,
+    y: np.ndarray,
+    bins: int = GRID_BINS,
+    x_range: tuple = (0.0, 100.0),
+    y_range: tuple = (0.0, 100.0),
+) -> Dict[str, List]:
+    """
+    2-D histogram over a fixed grid, returned sparsely as columns:
+    {"x": [cell centre], "y": [cell centre], "count": [points in cell]}
+    Only non-empty cells are listed.
+    """
+    counts, x_edges, y_edges = np.histogram2d(
+        x, y, bins=bins, range=[list(x_range), list(y_range)]
+    )
+    xi, yi = np.nonzero(counts)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    return {
+        "x": np.round(x_centres[xi], 2).tolist(),
+        "y": np.round(y_centres[yi], 2).tolist(),
+        "count": counts[xi, yi].astype(int).tolist(),
+    }
+
+
+def reduce_scatter(
+    points: List[Dict[str, Any]],
+    x_key: str,
+    y_key: str,
+    label_key: str,
+    mode: str = "auto",
+    x_scale: float = 1.0,
+    max_points: int = MAX_POINTS,
+    bins: int = GRID_BINS,
+) -> Dict[str, Any]:
+    """
+    Turn a list of point dicts into a bounded, column-oriented chart payload.
+
+    mode:
+      - "points" → every point (only for small cohorts; capped by sampling)
+      - "sample" → at most max_points, outliers preserved
+      - "bin"    → bins × bins grid counts, for density views
+      - "auto"   → "points" when it fits in max_points, else "sample"
+
+    Points with a missing x or y are dropped. x values are multiplied by
+    ``x_scale`` (e.g. 100 for rates shown as percentages).
+
+    return:
+    {
+      "mode": "sample",
+      "total": 25000,          # plottable points before reduction
+      "x": [...], "y": [...],
+      "label": [...]           # points / sample modes
+      "count": [...]           # bin mode
+    }
+    """
+    if mode not in SCATTER_MODES:
+        raise ValueError(f"Unknown scatter mode: {mode}")
+
+    kept = [p for p in points if p.get(x_key) is not None and p.get(y_key) is not None]
+    total = len(kept)
+    x = np.array([p[x_key] for p in kept], dtype=np.float64) * x_scale
+    y = np.array([p[y_key] for p in kept], dtype=np.float64)
+
+    if mode == "auto":
+        mode = "points" if total <= max_points else "sample"
+
+    if mode == "bin":
+        return {"mode": "bin", "total": total, **bin_counts(x, y, bins=bins)}
+
+    idx = sample_indices(x, y, max_points=max_points)
+    labels: List[Optional[str]] = [
+        kept[i].get(label_key) or kept[i].get("studentId") for i in idx
+    ]
+    return {
+        "mode": "sample" if idx.shape[0] < total else "points",
+        "total": total,
+        "x": np.round(x[idx], 2).tolist(),
+        "y": np.round(y[idx], 2).tolist(),
+        "label": labels,
+    }
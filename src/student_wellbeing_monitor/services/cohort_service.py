@@ -0,0 +1,91 @@
+# cohort_service.py
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from student_wellbeing_monitor.database.db_core import (
+    MAX_ATTACHED_COHORTS,
+    get_cohorts,
+)
+from student_wellbeing_monitor.database.read import cohort_weekly_comparison
+
+
+# =========================================================
+# Class: CohortService
+# =========================================================
+class CohortService:
+    """
+    Comparisons across academic years (one database per cohort).
+
+      1️⃣ list_cohorts
+      2️⃣ compare_cohorts
+    """
+
+    # -------------------------------------------------
+    # 1️⃣ registered cohorts
+    # -------------------------------------------------
+    def list_cohorts(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "cohortId": row["cohort_id"],
+                "status": row["status"],
+                "dbFile": row["db_file"],
+            }
+            for row in get_cohorts().values()
+        ]
+
+    # -------------------------------------------------
+    # 2️⃣ weekly wellbeing / attendance per cohort
+    # -------------------------------------------------
+    def compare_cohorts(
+        self, cohort_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        cohort_ids: None → the most recent MAX_ATTACHED_COHORTS cohorts.
+
+        return:
+        {
+          "cohorts": [
+            {
+              "cohortId": "2024-25",
+              "weeks": [1, 2, ...],
+              "avgStress": [3.1, ...],
+              "avgSleep": [6.8, ...],
+              "responses": [120, ...],
+              "attendanceRate": [0.82, ...]   # None for weeks without attendance
+            },
+            ...
+          ]
+        }
+        """
+        if cohort_ids is None:
+            cohort_ids = list(get_cohorts())[-MAX_ATTACHED_COHORTS:]
+
+        by_cohort: Dict[str, Dict[str, Any]] = {}
+        for cohort_id, week, stress, sleep, responses, rate in cohort_weekly_comparison(
+            cohort_ids
+        ):
+            entry = by_cohort.setdefault(
+                cohort_id,
+                {
+                    "cohortId": cohort_id,
+                    "weeks": [],
+                    "avgStress": [],
+                    "avgSleep": [],
+                    "responses": [],
+                    "attendanceRate": [],
+                },
+            )
+            entry["weeks"].append(week)
+            entry["avgStress"].append(round(stress, 2) if stress is not None else None)
+            entry["avgSleep"].append(round(sleep, 2) if sleep is not None else None)
+            entry["responses"].append(responses)
+            entry["attendanceRate"].append(round(rate, 2) if rate is not None else None)
+
+        return {
+            "cohorts": [
+                by_cohort[c] for c in dict.fromkeys(cohort_ids) if c in by_cohort
+            ]
+        }
+
+
+cohort_service = CohortService()
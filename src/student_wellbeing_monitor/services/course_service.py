@@ -2,18 +2,32 @@
 
 import json
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 from google import genai
 
+from student_wellbeing_monitor.database.columns import NULL_INT
 from student_wellbeing_monitor.database.read import (
     attendance_and_grades,
-    get_attendance_filtered,
-    get_submissions_filtered,
+    attendance_totals_filtered,
+    first_module_name,
     programme_wellbeing_engagement,
+    submission_totals_filtered,
     submissions_for_course,
     unsubmissions_for_repeated_issues,
 )
+from student_wellbeing_monitor.database.student_features import get_student_features
+
+
+def _ratio(total, count) -> Optional[float]:
+    """total / count rounded to 2 places, or None when count is 0."""
+    return round(float(total) / int(count), 2) if count > 0 else None
+
+
+def _rounded(value) -> Optional[float]:
+    """A feature value rounded to 2 places, or None for NaN."""
+    return None if np.isnan(value) else round(float(value), 2)
 
 
 # =========================================================
@@ -30,8 +44,18 @@ class CourseService:
       6️⃣ get_programme_wellbeing_engagement
       7️⃣ get_high_stress_sleep_engagement_analysis
       8️⃣ further analyze with AI (Gemini)
+
+    With use_features, the scatter (without a module filter) reads one
+    precomputed vector per student from student_features instead of
+    aggregating the raw rows; until the features are built it falls back to
+    the raw rows. The high-stress comparison always reads the raw rows: its
+    figures are weighted by the module / week / submission join, which the
+    per-student vectors cannot reproduce.
     """
 
+    def __init__(self, use_features: bool = False):
+        self.use_features = use_features
+
     def get_course_leader_summary(
         self,
         programme_id: Optional[str],
@@ -49,43 +73,29 @@ class CourseService:
         # -------------------------------
         # 1) Attendance
         # -------------------------------
-        attendance_rows = get_attendance_filtered(
+        present, total_att_records = attendance_totals_filtered(
             programme_id=programme_id,
             module_id=module_id,
             week_start=week_start,
             week_end=week_end,
         )
-        # rows: (student_id, module_code, week, status)
-        present = sum(1 for r in attendance_rows if r["status"] == 1)
-        absent = sum(1 for r in attendance_rows if r["status"] == 0)
-        total_att_records = present + absent
-
         avg_attendance_rate = (
             present / total_att_records if total_att_records > 0 else None
         )
 
         # -------------------------------
-        # 2) Submissions
+        # 2) Submissions + 3) Grade
         # -------------------------------
-        submission_rows = get_submissions_filtered(
+        submit_count, total_sub_records, avg_grade = submission_totals_filtered(
             programme_id=programme_id,
             module_id=module_id,
+            week_start=week_start,
+            week_end=week_end,
         )
-        # rows: (student_id, module_code, submitted, grade)
-
-        submit_count = sum(1 for r in submission_rows if r["submitted"] == 1)
-        total_sub_records = len(submission_rows)
-
         avg_submission_rate = (
             submit_count / total_sub_records if total_sub_records > 0 else None
         )
 
-        # -------------------------------
-        # 3) Grade
-        # -------------------------------
-        grades = [r["grade"] for r in submission_rows if r["grade"] is not None]
-        avg_grade = sum(grades) / len(grades) if grades else None
-
         return {
             "avg_attendance_rate": avg_attendance_rate,
             "avg_submission_rate": avg_submission_rate,
@@ -166,6 +176,7 @@ class CourseService:
     ) -> Dict[str, Any]:
         """
         get the students with repeated missing submissions across multiple courses.
+        start_week / end_week keep the assignments due in those teaching weeks.
 
         return:
         {
@@ -189,22 +200,17 @@ class CourseService:
           ]
         }
         """
+        # only unsubmitted rows of students that already qualify come back
         rows = unsubmissions_for_repeated_issues(
             module_id=course_id,
             programme_id=programme_id,
             week_start=start_week,
             week_end=end_week,
+            min_offending_modules=min_offending_modules,
         )
         # rows: (module_id, module_name, assignment_no, student_id, student_name, email, submitted)
-        problem_records: List[Tuple[str, str, int, str, str, str]] = []
-        for module_id, module_name, assignment_no, sid, sname, email, submitted in rows:
-            if not submitted:
-                problem_records.append(
-                    (module_id, module_name, assignment_no, sid, sname, email)
-                )
-
         by_student: Dict[str, Dict[str, Any]] = {}
-        for module_id, module_name, assignment_no, sid, sname, email in problem_records:
+        for module_id, module_name, assignment_no, sid, sname, email, _sub in rows:
             if sid not in by_student:
                 by_student[sid] = {
                     "studentId": sid,
@@ -223,19 +229,16 @@ class CourseService:
                 }
             )
 
-        result_students: List[Dict[str, Any]] = []
-        for info in by_student.values():
-            module_count = len(info["modules"])
-            if module_count >= min_offending_modules:
-                result_students.append(
-                    {
-                        "studentId": info["studentId"],
-                        "name": info["name"],
-                        "email": info["email"],
-                        "offendingModuleCount": module_count,
-                        "details": info["details"],
-                    }
-                )
+        result_students: List[Dict[str, Any]] = [
+            {
+                "studentId": info["studentId"],
+                "name": info["name"],
+                "email": info["email"],
+                "offendingModuleCount": len(info["modules"]),
+                "details": info["details"],
+            }
+            for info in by_student.values()
+        ]
 
         return {"students": result_students}
 
@@ -267,14 +270,23 @@ class CourseService:
           ]
         }
         """
+        if self.use_features and not course_id:
+            features = get_student_features(
+                programme_id=programme_id, week_start=week_start, week_end=week_end
+            )
+            if features is not None:
+                return self._attendance_vs_grades_from_features(
+                    features, week_start, week_end
+                )
+
         rows = attendance_and_grades(
             module_id=course_id,
             programme_id=programme_id,
             week_start=week_start,
             week_end=week_end,
         )
-        print("DEBUG rows len =", len(rows))
-        # rows: (module_id, module_name, student_id, student_name, week, status, grade)
+        # one row per student, aggregated in SQL:
+        # (module_name, student_id, student_name, present, total, avg_grade)
 
         if not rows:
             return {
@@ -283,40 +295,15 @@ class CourseService:
                 "points": [],
             }
 
-        course_name = rows[0][1]
-
-        tmp: Dict[str, Dict[str, Any]] = {}
-        for _mid, _mname, sid, sname, _week, status, grade in rows:
-            if sid not in tmp:
-                tmp[sid] = {
-                    "name": sname,
-                    "present": 0,
-                    "total": 0,
-                    "grade_sum": 0.0,
-                    "grade_cnt": 0,
-                }
-            tmp[sid]["total"] += 1
-            # attendance.status : 0 = absent, 1 = present
-            if status is not None and int(status) == 1:
-                tmp[sid]["present"] += 1
-            if grade is not None:
-                tmp[sid]["grade_sum"] += float(grade)
-                tmp[sid]["grade_cnt"] += 1
+        course_name = rows[0][0]
 
         points: List[Dict[str, Any]] = []
-
-        for sid, info in tmp.items():
-            total = info["total"]
-            present = info["present"]
-            grade_cnt = info["grade_cnt"]
-
+        for _mname, sid, sname, present, total, avg_grade in rows:
             att_rate = present / total if total > 0 else 0.0
-            avg_grade = info["grade_sum"] / grade_cnt if grade_cnt > 0 else None
-
             points.append(
                 {
                     "studentId": sid,
-                    "name": info["name"],
+                    "name": sname,
                     "attendanceRate": round(att_rate, 2),
                     "avgGrade": round(avg_grade, 2) if avg_grade is not None else None,
                 }
@@ -328,6 +315,30 @@ class CourseService:
             "points": points,
         }
 
+    def _attendance_vs_grades_from_features(
+        self, features, week_start, week_end
+    ) -> Dict[str, Any]:
+        """get_attendance_vs_grades of a whole programme, from feature vectors."""
+        rate = features["attendance_rate"]
+        grade = features["avg_grade"]
+        points = [
+            {
+                "studentId": features.value_at("student_id", i),
+                "name": features.value_at("name", i),
+                "attendanceRate": round(float(rate[i]), 2),
+                "avgGrade": _rounded(grade[i]),
+            }
+            # students appear if they have attendance in the range
+            for i in np.flatnonzero(features["att_total"] > 0)
+        ]
+        # like the SQL path: the first attended module of the first student
+        course_name = (
+            first_module_name(points[0]["studentId"], week_start, week_end, True)
+            if points
+            else None
+        )
+        return {"courseId": None, "courseName": course_name, "points": points}
+
     # -------------------------------------------------
     # 6️⃣ summary of wellbeing + engagement by programme
     # -------------------------------------------------
@@ -360,115 +371,67 @@ class CourseService:
           ]
         }
         """
-        rows = programme_wellbeing_engagement(
+        cols = programme_wellbeing_engagement(
             programme_id=programme_id,
             week_start=week_start,
             week_end=week_end,
+            as_columns=True,
         )
-        # rows: (module_id, module_name,
-        #        student_id,
-        #        programme_id, programme_name,
-        #        week,
-        #        stress_level,
-        #        hours_slept,
-        #        attendance_status,
-        #        submission_status,
-        #        grade)
+        # cols: ColumnarRows laid out as read.ENGAGEMENT_COLUMNS
 
-        if not rows:
+        if not len(cols):
             return {
                 "programmeId": programme_id,
                 "programmes": [],
             }
 
-        agg: Dict[str, Dict[str, Any]] = {}
-
-        for (
-            _mid,
-            _mname,
-            student_id,
-            prog_id_row,
-            prog_name,
-            _week,
-            stress_level,
-            _hours_slept,
-            attendance_status,
-            submission_status,
-            grade,
-        ) in rows:
-            if prog_id_row not in agg:
-                agg[prog_id_row] = {
-                    "programmeId": prog_id_row,
-                    "programmeName": prog_name,
-                    "students": set(),  # unique students count
-                    "stress_sum": 0.0,
-                    "stress_cnt": 0,
-                    "att_present": 0,
-                    "att_total": 0,
-                    "sub_submit": 0,
-                    "sub_total": 0,
-                    "grade_sum": 0.0,
-                    "grade_cnt": 0,
-                }
+        # programme codes follow first appearance, like the old dict order
+        prog = cols["programme_id"]
+        n_prog = len(cols.values("programme_id"))
+        student = cols["student_id"]
+        n_student = len(cols.values("student_id"))
 
-            info = agg[prog_id_row]
-            info["students"].add(student_id)
+        # unique students count per programme
+        pairs = np.unique(prog.astype(np.int64) * n_student + student)
+        student_cnt = np.bincount(pairs // n_student, minlength=n_prog)
 
-            if stress_level is not None:
-                info["stress_sum"] += float(stress_level)
-                info["stress_cnt"] += 1
-
-            if attendance_status is not None:
-                info["att_total"] += 1
-                # 0 = absent, 1 = present
-                if int(attendance_status) == 1:
-                    info["att_present"] += 1
-
-            if submission_status in ("submit", "unsubmit"):
-                info["sub_total"] += 1
-                if submission_status == "submit":
-                    info["sub_submit"] += 1
+        stress = cols["stress_level"]
+        has_stress = stress != NULL_INT
+        stress_sum = np.bincount(
+            prog[has_stress], weights=stress[has_stress], minlength=n_prog
+        )
+        stress_cnt = np.bincount(prog[has_stress], minlength=n_prog)
+
+        # 0 = absent, 1 = present
+        attendance = cols["attendance_status"]
+        att_total = np.bincount(prog[attendance != NULL_INT], minlength=n_prog)
+        att_present = np.bincount(prog[attendance == 1], minlength=n_prog)
+
+        submitted = cols.equals("submission_status", "submit")
+        unsubmitted = cols.equals("submission_status", "unsubmit")
+        sub_total = np.bincount(prog[submitted | unsubmitted], minlength=n_prog)
+        sub_submit = np.bincount(prog[submitted], minlength=n_prog)
+
+        grade = cols["grade"]
+        has_grade = ~np.isnan(grade)
+        grade_sum = np.bincount(
+            prog[has_grade], weights=grade[has_grade], minlength=n_prog
+        )
+        grade_cnt = np.bincount(prog[has_grade], minlength=n_prog)
 
-            if grade is not None:
-                info["grade_sum"] += float(grade)
-                info["grade_cnt"] += 1
+        first_row = np.unique(prog, return_index=True)[1]
 
         programmes: List[Dict[str, Any]] = []
-        for info in agg.values():
-            stress_avg = (
-                info["stress_sum"] / info["stress_cnt"]
-                if info["stress_cnt"] > 0
-                else None
-            )
-            att_rate = (
-                info["att_present"] / info["att_total"]
-                if info["att_total"] > 0
-                else None
-            )
-            sub_rate = (
-                info["sub_submit"] / info["sub_total"]
-                if info["sub_total"] > 0
-                else None
-            )
-            avg_grade = (
-                info["grade_sum"] / info["grade_cnt"] if info["grade_cnt"] > 0 else None
-            )
-
+        for code, prog_id_row in enumerate(cols.values("programme_id")):
             programmes.append(
                 {
-                    "programmeId": info["programmeId"],
-                    "programmeName": info["programmeName"],
-                    "studentCount": len(info["students"]),
-                    "avgStress": (
-                        round(stress_avg, 2) if stress_avg is not None else None
-                    ),
-                    "attendanceRate": (
-                        round(att_rate, 2) if att_rate is not None else None
-                    ),
-                    "submissionRate": (
-                        round(sub_rate, 2) if sub_rate is not None else None
-                    ),
-                    "avgGrade": round(avg_grade, 2) if avg_grade is not None else None,
+                    "programmeId": prog_id_row,
+                    "programmeName": cols.value_at("programme_name", first_row[code]),
+                    "studentCount": int(student_cnt[code]),
+                    "avgStress": _ratio(stress_sum[code], stress_cnt[code]),
+                    "attendanceRate": _ratio(att_present[code], att_total[code]),
+                    "submissionRate": _ratio(sub_submit[code], sub_total[code]),
+                    "avgGrade": _ratio(grade_sum[code], grade_cnt[code]),
                 }
             )
 
@@ -498,22 +461,15 @@ class CourseService:
             * submission rate ( lower? )
             * average grade ( worse?)
         """
-        rows = programme_wellbeing_engagement(
+        cols = programme_wellbeing_engagement(
             programme_id=programme_id,
             week_start=week_start,
             week_end=week_end,
+            as_columns=True,
         )
-        # rows: (module_id, module_name,
-        #        student_id,
-        #        programme_id, programme_name,
-        #        week,
-        #        stress_level,
-        #        hours_slept,
-        #        attendance_status,
-        #        submission_status,
-        #        grade)
+        # cols: ColumnarRows laid out as read.ENGAGEMENT_COLUMNS
 
-        if not rows:
+        if not len(cols):
             return {
                 "programme_id": programme_id,
                 "courseName": None,
@@ -541,116 +497,55 @@ class CourseService:
                 "students": {"highStressLowSleep": [], "others": []},
             }
 
-        course_name = rows[0][1]
+        # per-student totals; student codes follow first appearance
+        student = cols["student_id"]
+        n_student = len(cols.values("student_id"))
 
-        # grouping by student
-        per_student: Dict[str, Dict[str, Any]] = {}
-
-        for (
-            _mid,
-            _mname,
-            student_id,
-            _programme_id,
-            _programme_name,
-            week,
-            stress_level,
-            hours_slept,
-            attendance_status,
-            submission_status,
-            grade,
-        ) in rows:
-            sid = str(student_id)
-            if sid not in per_student:
-                per_student[sid] = {
-                    "weeks": [],
-                    "stresses": [],
-                    "sleeps": [],
-                    "att_present": 0,
-                    "att_total": 0,
-                    "sub_submit": 0,
-                    "sub_total": 0,
-                    "grade_sum": 0.0,
-                    "grade_cnt": 0,
-                }
-            info = per_student[sid]
-
-            # wellbeing
-            if week is not None and stress_level is not None:
-                try:
-                    info["weeks"].append(int(week))
-                    info["stresses"].append(float(stress_level))
-                    if hours_slept is not None:
-                        info["sleeps"].append(float(hours_slept))
-                    else:
-                        info["sleeps"].append(None)
-                except (TypeError, ValueError):
-                    # skip invalid data
-                    pass
-
-            # attendance
-            if attendance_status is not None:
-                info["att_total"] += 1
-                try:
-                    if int(attendance_status) == 1:
-                        info["att_present"] += 1
-                except (TypeError, ValueError):
-                    pass
-
-            # submission
-            if submission_status in ("submit", "unsubmit"):
-                info["sub_total"] += 1
-                if submission_status == "submit":
-                    info["sub_submit"] += 1
-
-            # grade
-            if grade is not None:
-                try:
-                    info["grade_sum"] += float(grade)
-                    info["grade_cnt"] += 1
-                except (TypeError, ValueError):
-                    pass
+        # the first module (by name) of the first student
+        course_name = min(
+            cols.value_at("module_name", i) for i in np.flatnonzero(student == 0)
+        )
+
+        # how many weeks: “stress >= stress_threshold AND sleep < sleep_threshold”
+        week = cols["week"]
+        stress = cols["stress_level"]
+        sleep = cols["hours_slept"]
+        high = (week != NULL_INT) & (stress != NULL_INT) & ~np.isnan(sleep)
+        high &= (stress >= stress_threshold) & (sleep < sleep_threshold)
+        high_weeks = np.bincount(student[high], minlength=n_student)
+
+        # attendance
+        attendance = cols["attendance_status"]
+        att_total = np.bincount(student[attendance != NULL_INT], minlength=n_student)
+        att_present = np.bincount(student[attendance == 1], minlength=n_student)
+
+        # submission
+        submitted = cols.equals("submission_status", "submit")
+        unsubmitted = cols.equals("submission_status", "unsubmit")
+        sub_total = np.bincount(student[submitted | unsubmitted], minlength=n_student)
+        sub_submit = np.bincount(student[submitted], minlength=n_student)
+
+        # grade
+        grade = cols["grade"]
+        has_grade = ~np.isnan(grade)
+        grade_sum = np.bincount(
+            student[has_grade], weights=grade[has_grade], minlength=n_student
+        )
+        grade_cnt = np.bincount(student[has_grade], minlength=n_student)
 
         # divide students into two groups
         high_group: List[Dict[str, Any]] = []
         other_group: List[Dict[str, Any]] = []
 
-        for sid, info in per_student.items():
-            stresses: List[float] = info["stresses"]
-            sleeps: List[Optional[float]] = info["sleeps"]
-
-            # how many weeks: “stress >= stress_threshold AND sleep < sleep_threshold”
-            high_weeks = 0
-            for s, sl in zip(stresses, sleeps):
-                if s is None or sl is None:
-                    continue
-                if s >= stress_threshold and sl < sleep_threshold:
-                    high_weeks += 1
-
-            is_high = high_weeks >= min_weeks
-
-            # the indicators per student
-            att_rate = (
-                info["att_present"] / info["att_total"]
-                if info["att_total"] > 0
-                else None
-            )
-            sub_rate = (
-                info["sub_submit"] / info["sub_total"]
-                if info["sub_total"] > 0
-                else None
-            )
-            avg_grade = (
-                info["grade_sum"] / info["grade_cnt"] if info["grade_cnt"] > 0 else None
-            )
-
+        for code, sid in enumerate(cols.values("student_id")):
             record = {
-                "studentId": sid,
-                "attendanceRate": round(att_rate, 2) if att_rate is not None else None,
-                "submissionRate": round(sub_rate, 2) if sub_rate is not None else None,
-                "avgGrade": round(avg_grade, 2) if avg_grade is not None else None,
+                "studentId": str(sid),
+                "attendanceRate": _ratio(att_present[code], att_total[code]),
+                "submissionRate": _ratio(sub_submit[code], sub_total[code]),
+                "avgGrade": _ratio(grade_sum[code], grade_cnt[code]),
             }
 
-            if is_high:
+            if high_weeks[code] >= min_weeks:
                 high_group.append(record)
             else:
                 other_group.append(record)
@@ -861,4 +756,4 @@ class CourseService:
     #     }
 
 
-course_service = CourseService()
+course_service = CourseService(use_features=True)
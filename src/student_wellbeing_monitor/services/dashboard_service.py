@@ -1,10 +1,11 @@
-from student_wellbeing_monitor.database.read import (
+from student_wellbeing_monitor.services.attendance_service import attendance_service
+from student_wellbeing_monitor.services.chart_reduction import reduce_scatter
+from student_wellbeing_monitor.services.course_service import course_service
+from student_wellbeing_monitor.services.dimension_cache import (
     get_all_modules,
     get_all_weeks,
     get_programmes,
 )
-from student_wellbeing_monitor.services.attendance_service import attendance_service
-from student_wellbeing_monitor.services.course_service import course_service
 from student_wellbeing_monitor.services.wellbeing_service import wellbeing_service
 
 
@@ -107,6 +108,7 @@ def build_charts_for_wellbeing(start_week, end_week, current_programme):
         "avg_stress": avg_stress,
         "avg_sleep": avg_sleep,
         "attendance_trend": [],
+        "attendance_series": [],
         "grade_trend": [],
         "programme_stats": {
             "labels": programme_labels,
@@ -115,25 +117,43 @@ def build_charts_for_wellbeing(start_week, end_week, current_programme):
             "submissionRate": programme_submission_rate,
             "avgGrade": programme_avg_grade,
         },
-        "scatter_points": [],
+        "scatter": reduce_scatter([], "attendanceRate", "avgGrade", "name"),
     }
 
 
 def build_charts_for_course_leader(
-    start_week, end_week, current_programme, current_module, modules_by_programme
+    start_week,
+    end_week,
+    current_programme,
+    current_module,
+    modules_by_programme,
+    scatter_mode="auto",
 ):
-    trend = attendance_service.get_attendance_trends(
-        course_id=current_module,
+    # one grouped query: a series per module plus the programme aggregate
+    trends = attendance_service.get_module_attendance_trends(
         programme_id=current_programme,
+        course_ids=[current_module] if current_module else None,
         week_start=start_week,
         week_end=end_week,
     )
-    points = trend.get("points", [])
+    points = trends.get("programme", {}).get("points", [])
 
     weeks_for_chart = [p["week"] for p in points]
     attendance_trend = [p["attendanceRate"] for p in points]
     grade_trend = [p.get("avgGrade") for p in points]
 
+    # per-module lines aligned to weeks_for_chart (None where a module has no data)
+    attendance_series = []
+    if not current_module:
+        for m in trends.get("modules", []):
+            by_week = {p["week"]: p["attendanceRate"] for p in m["points"]}
+            attendance_series.append(
+                {
+                    "label": m.get("courseCode") or m["courseId"],
+                    "data": [by_week.get(w) for w in weeks_for_chart],
+                }
+            )
+
     scatter = {}
     scatter_points = []
 
@@ -165,11 +185,22 @@ def build_charts_for_course_leader(
             submission_submitted.append(ss.get("submit", 0))
             submission_unsubmitted.append(ss.get("unsubmit", 0))
 
+    # one entry per student: reduce to a bounded, column-oriented payload
+    scatter_payload = reduce_scatter(
+        scatter_points,
+        x_key="attendanceRate",
+        y_key="avgGrade",
+        label_key="name",
+        mode=scatter_mode,
+        x_scale=100,  # 0.85 → 85%
+    )
+
     return {
         "weeks_for_chart": weeks_for_chart,
         "avg_stress": [],
         "avg_sleep": [],
         "attendance_trend": attendance_trend,
+        "attendance_series": attendance_series,
         "submission_labels": submission_labels,
         "submission_submitted": submission_submitted,
         "submission_unsubmitted": submission_unsubmitted,
@@ -181,17 +212,28 @@ def build_charts_for_course_leader(
             "submissionRate": [],
             "avgGrade": [],
         },
-        "scatter_points": scatter_points,
+        "scatter": scatter_payload,
     }
 
 
 def build_charts(
-    role, start_week, end_week, current_programme, current_module, modules_by_programme
+    role,
+    start_week,
+    end_week,
+    current_programme,
+    current_module,
+    modules_by_programme,
+    scatter_mode="auto",
 ):
     if role == "wellbeing":
         return build_charts_for_wellbeing(start_week, end_week, current_programme)
     return build_charts_for_course_leader(
-        start_week, end_week, current_programme, current_module, modules_by_programme
+        start_week,
+        end_week,
+        current_programme,
+        current_module,
+        modules_by_programme,
+        scatter_mode,
     )
 
 
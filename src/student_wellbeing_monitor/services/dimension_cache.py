@@ -0,0 +1,145 @@
+# dimension_cache.py
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from student_wellbeing_monitor.database import db_core, read
+
+
+# =========================================================
+# Class: DimensionCache
+# =========================================================
+class DimensionCache:
+    """
+    In-process cache of the small tables every page needs:
+      - programmes        (programme table)
+      - modules           (module table)
+      - students          (student table, with per-programme counts)
+      - weeks             (SELECT DISTINCT week over wellbeing)
+
+    Each entry is stamped with the DB path and the data_version of the table
+    it was built from (see db_core.bump_data_version). A lookup reads the
+    version table once and only re-runs the query when the stamp moved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple, Any]] = {}
+
+    def _get(self, key: str, table: str, build: Callable[[], Any]) -> Any:
+        version = db_core.get_data_versions().get(table, (0, 0, 0.0))
+        stamp = (str(db_core.DB_PATH), version[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        value = build()
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # -------------------------------------------------
+    # programmes
+    # -------------------------------------------------
+    def _build_programmes(self) -> Dict[str, Any]:
+        rows = tuple(read.get_programmes())
+        return {
+            "rows": rows,
+            "labels": {
+                r["programme_id"]: f"{r['programme_code']} – {r['programme_name']}"
+                for r in rows
+            },
+        }
+
+    def programmes(self) -> Tuple:
+        """Programme rows ordered by programme_code."""
+        return self._get("programme", "programme", self._build_programmes)["rows"]
+
+    def programme_labels(self) -> Dict[str, str]:
+        """{programme_id: "CODE – NAME"}"""
+        return self._get("programme", "programme", self._build_programmes)["labels"]
+
+    # -------------------------------------------------
+    # modules
+    # -------------------------------------------------
+    def modules(self) -> Tuple:
+        """Module rows ordered by programme_id, module_code."""
+        return self._get("module", "module", lambda: tuple(read.get_all_modules()))
+
+    # -------------------------------------------------
+    # students
+    # -------------------------------------------------
+    def _build_students(self) -> Dict[str, Any]:
+        names: Dict[str, str] = {}
+        emails: Dict[str, Optional[str]] = {}
+        programmes: Dict[str, Optional[str]] = {}
+        counts: Dict[Optional[str], int] = {}
+        for sid, name, email, pid in read.get_all_students():
+            if sid is None:
+                continue
+            names[str(sid)] = name
+            emails[str(sid)] = email
+            programmes[str(sid)] = pid
+            counts[pid] = counts.get(pid, 0) + 1
+        return {
+            "names": names,
+            "emails": emails,
+            "programmes": programmes,
+            "counts": counts,
+        }
+
+    def _students(self) -> Dict[str, Any]:
+        return self._get("student", "student", self._build_students)
+
+    def student_names(self) -> Dict[str, str]:
+        """{student_id: name}; shared by all callers, do not mutate."""
+        return self._students()["names"]
+
+    def student_emails(self) -> Dict[str, Optional[str]]:
+        """{student_id: email}; shared by all callers, do not mutate."""
+        return self._students()["emails"]
+
+    def student_programmes(self) -> Dict[str, Optional[str]]:
+        """{student_id: programme_id}; shared by all callers, do not mutate."""
+        return self._students()["programmes"]
+
+    def student_count(self, programme_id: Optional[str] = None) -> int:
+        students = self._students()
+        if programme_id is None:
+            return len(students["names"])
+        return students["counts"].get(programme_id, 0)
+
+    # -------------------------------------------------
+    # weeks
+    # -------------------------------------------------
+    def weeks(self) -> Tuple[int, ...]:
+        """Distinct wellbeing weeks in ascending order."""
+        return self._get("weeks", "wellbeing", lambda: tuple(read.get_all_weeks()))
+
+
+dimension_cache = DimensionCache()
+
+
+# ===== Drop-in replacements for the read.py functions =====
+# Same return shapes, served from dimension_cache. Callers get a fresh list
+# so mutating it cannot corrupt the cache.
+
+
+def get_programmes() -> List:
+    return list(dimension_cache.programmes())
+
+
+def get_programme_map() -> Dict[str, str]:
+    return dict(dimension_cache.programme_labels())
+
+
+def get_all_modules() -> List:
+    return list(dimension_cache.modules())
+
+
+def get_all_weeks() -> List[int]:
+    return list(dimension_cache.weeks())
@@ -0,0 +1,87 @@
+# export_service.py
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from student_wellbeing_monitor.database.read import EXPORT_QUERIES, iter_export_rows
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def _csv_chunks(rows: Iterator[tuple], batch_rows: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(rows))  # header
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(rows: Iterator[tuple], batch_rows: int) -> Iterator[str]:
+    columns = next(rows)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(lines) >= batch_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 → gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(
+    data_type: str,
+    fmt: str = "csv",
+    student_id: Optional[str] = None,
+    sort_week: Optional[str] = None,
+    gzip: bool = False,
+    batch_rows: int = 500,
+) -> Iterator[bytes]:
+    """
+    Encoded download of one data table, produced lazily.
+
+    - data_type: students / wellbeing / attendance / submissions
+    - fmt: "csv" (header row first) or "jsonl" (one JSON object per row)
+    - gzip: compress the stream on the fly
+
+    Each yielded chunk covers about ``batch_rows`` rows; rows come straight
+    from read.iter_export_rows, so memory stays flat however large the table.
+    Closing the returned generator closes the database connection.
+    """
+    if data_type not in EXPORT_QUERIES:
+        raise ValueError(f"Unknown data type: {data_type}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    rows = iter_export_rows(data_type, student_id=student_id, sort_week=sort_week)
+    encode = _csv_chunks if fmt == "csv" else _jsonl_chunks
+    chunks = (text.encode("utf-8") for text in encode(rows, batch_rows))
+    if gzip:
+        chunks = _gzip(chunks)
+
+    try:
+        yield from chunks
+    finally:
+        rows.close()
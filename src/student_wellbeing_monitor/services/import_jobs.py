@@ -0,0 +1,388 @@
+# src/student_wellbeing_monitor/services/import_jobs.py
+"""
+Background CSV import jobs.
+
+An upload request only spools the file to disk and queues a job; it returns
+as soon as the bytes are saved. A job thread in the same process then
+
+  1. reads the spooled CSV in chunks of CHUNK_ROWS rows,
+  2. parses the chunks in a process pool (upload_service row parsers),
+  3. hands the whole parsed file to the single writer as one bulk upsert.
+
+A file is imported atomically, as with a synchronous upload: all of its rows
+or none. Rows that fail to parse, or that the database refuses (unknown
+student, value out of range), are reported as rejects with their line
+number, and then nothing of the file is written. Fix those lines and upload
+the file again.
+
+Each job lives in SPOOL_DIR/<job_id>/ (upload.csv + status.json). The status
+file is replaced atomically after every chunk, so any web worker can answer
+the status endpoint, not only the one running the job. The upload is deleted
+as soon as the job has finished (it holds raw student data); job directories
+whose status is older than STATUS_TTL seconds are removed on the next submit.
+
+A job only runs in the memory of the worker that received it. Its status
+records that worker's pid, so when the worker dies (a gunicorn restart, a
+crash) the job is marked failed instead of staying queued for good: at server
+startup (recover_orphans) and whenever its status is read.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.database.create import IMPORT_MODES
+from student_wellbeing_monitor.database.writer import db_writer
+from student_wellbeing_monitor.services.upload_service import IMPORTERS
+
+SPOOL_DIR = db_core.PROJECT_ROOT / "spool" / "imports"
+CHUNK_ROWS = 2000
+IMPORT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MAX_LISTED_REJECTS = 100  # rejects kept in status.json; all are counted
+STATUS_TTL = 24 * 3600  # seconds a finished job's status.json is kept
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+_ORPHANED = "The worker running this import stopped; upload the file again."
+
+
+def parse_chunk(
+    data_type: str, rows: List[dict], first_line: int
+) -> Tuple[List[Tuple[int, tuple]], List[Dict[str, Any]]]:
+    """
+    Worker-process side: parse raw CSV rows. Returns
+    ([(line, parsed row), ...], [{"line": n, "error": "..."}, ...]).
+    """
+    parse, _upsert = IMPORTERS[data_type]
+    parsed, rejects = [], []
+    for line, row in enumerate(rows, start=first_line):
+        try:
+            parsed.append((line, parse(row)))
+        except (KeyError, TypeError, ValueError) as e:
+            rejects.append({"line": line, "error": f"{type(e).__name__}: {e}"})
+    return parsed, rejects
+
+
+def _refused_rows(cur, upsert_op, parsed, mode: str) -> List[Dict[str, Any]]:
+    """
+    Writer-thread side, after a file's upsert failed: try each row in its own
+    savepoint to find the lines the database refuses, then undo all of it.
+    """
+    rejects = []
+    cur.execute("SAVEPOINT import_probe")
+    try:
+        for line, row in parsed:
+            cur.execute("SAVEPOINT import_row")
+            try:
+                upsert_op(cur, [row], mode=mode)
+            except sqlite3.Error as e:
+                rejects.append({"line": line, "error": f"{type(e).__name__}: {e}"})
+                cur.execute("ROLLBACK TO import_row")
+            cur.execute("RELEASE import_row")
+    finally:
+        cur.execute("ROLLBACK TO import_probe")
+        cur.execute("RELEASE import_probe")
+    return rejects
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """Whether the worker process ``pid`` still exists."""
+    if pid is None or pid == os.getpid():
+        return True  # jobs from before owners were recorded: left to expire
+    if os.name == "nt":
+        # os.kill would terminate it; the Windows server is a single process
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _count_rows(path: Path) -> int:
+    """Data rows in a spooled CSV (newlines minus the header)."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1  # no trailing newline
+    return max(0, lines - 1)
+
+
+# =========================================================
+# Class: ImportJobs
+# =========================================================
+class ImportJobs:
+    """Job queue, runner thread and process pool; use ``import_jobs``."""
+
+    def __init__(self, spool_dir: Optional[Path] = None, workers: int = IMPORT_WORKERS):
+        self.spool_dir = Path(spool_dir or SPOOL_DIR)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # ---------- public API ----------
+    def submit(self, data_type: str, file_storage, mode: str = "upsert") -> str:
+        """Spool an uploaded file and queue its import; returns the job id."""
+        if data_type not in IMPORTERS:
+            raise ValueError(f"Unsupported data_type: {data_type}")
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unknown import mode: {mode}")
+
+        self._expire_old_jobs()
+        job_id = uuid.uuid4().hex
+        job_dir = self.spool_dir / job_id
+        job_dir.mkdir(parents=True)
+        upload = job_dir / "upload.csv"
+        file_storage.save(str(upload))
+
+        self._write_status(
+            job_id,
+            {
+                "jobId": job_id,
+                "dataType": data_type,
+                "mode": mode,
+                "state": "queued",
+                "totalRows": _count_rows(upload),
+                "processed": 0,
+                "inserted": 0,
+                "updated": 0,
+                "unchanged": 0,
+                "rejected": 0,
+                "rejects": [],
+                "queuedAt": time.time(),
+                "startedAt": None,
+                "finishedAt": None,
+                "etaSeconds": None,
+                "error": None,
+                "workerPid": os.getpid(),
+            },
+        )
+        self._ensure_started()
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Last written status of ``job_id``, or None for an unknown job."""
+        if not _JOB_ID.fullmatch(job_id or ""):
+            return None
+        status = self._read_status(job_id)
+        if status is not None:
+            self._fail_if_orphaned(status)
+        return status
+
+    def wait(self, job_id: str, timeout: float = 60.0) -> Dict[str, Any]:
+        """Block until the job has finished (for tools and tests)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.status(job_id)
+            if status is None:
+                raise KeyError(f"Unknown or expired import job: {job_id}")
+            if status["state"] in ("done", "failed"):
+                return status
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Import job {job_id} still {status['state']}")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Finish the queued jobs, then stop the thread and the pool."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+        with self._lock:
+            self._thread = None
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def recover_orphans(self) -> int:
+        """
+        Mark queued/running jobs whose worker process is gone as failed.
+        Run at server startup; returns the number of jobs failed.
+        """
+        if not self.spool_dir.is_dir():
+            return 0
+        failed = 0
+        for job_dir in self.spool_dir.iterdir():
+            if _JOB_ID.fullmatch(job_dir.name):
+                status = self._read_status(job_dir.name)
+                failed += status is not None and self._fail_if_orphaned(status)
+        return failed
+
+    # ---------- runner ----------
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="import-jobs", daemon=True
+                )
+                self._thread.start()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a threaded web worker is not safe
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _run(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            status = self.status(job_id)
+            try:
+                self._process(status)
+                status["state"] = "done"
+            except Exception as e:  # reported through the status endpoint
+                print(f"⚠️ Import job {job_id} failed: {e}")
+                status["state"] = "failed"
+                status["error"] = str(e)
+                if isinstance(e, BrokenProcessPool):
+                    # a parser process died; the next job gets a fresh pool
+                    with self._lock:
+                        self._pool.shutdown(wait=False)
+                        self._pool = self._new_pool()
+            status["finishedAt"] = time.time()
+            status["etaSeconds"] = 0 if status["state"] == "done" else None
+            self._write_status(job_id, status)
+            # the raw rows are not needed any more; only the status stays
+            (self.spool_dir / job_id / "upload.csv").unlink(missing_ok=True)
+
+    def _expire_old_jobs(self) -> None:
+        """Remove job directories whose status has not changed for STATUS_TTL."""
+        cutoff = time.time() - STATUS_TTL
+        if not self.spool_dir.is_dir():
+            return
+        for job_dir in self.spool_dir.iterdir():
+            if not _JOB_ID.fullmatch(job_dir.name):
+                continue
+            try:
+                expired = (job_dir / "status.json").stat().st_mtime < cutoff
+            except FileNotFoundError:
+                expired = job_dir.stat().st_mtime < cutoff
+            if expired:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _fail_if_orphaned(self, status: Dict[str, Any]) -> bool:
+        if status["state"] not in ("queued", "running"):
+            return False
+        if _process_alive(status.get("workerPid")):
+            return False
+        status["state"] = "failed"
+        status["error"] = _ORPHANED
+        status["finishedAt"] = time.time()
+        status["etaSeconds"] = None
+        self._write_status(status["jobId"], status)
+        (self.spool_dir / status["jobId"] / "upload.csv").unlink(missing_ok=True)
+        return True
+
+    def _process(self, status: Dict[str, Any]) -> None:
+        job_id, data_type = status["jobId"], status["dataType"]
+        status["state"] = "running"
+        status["startedAt"] = time.time()
+        self._write_status(job_id, status)
+
+        # 1) parse every chunk in the pool; nothing is written yet
+        parsed: List[Tuple[int, tuple]] = []
+        rejects: List[Dict[str, Any]] = []
+        in_flight = deque()
+        with open(
+            self.spool_dir / job_id / "upload.csv", newline="", encoding="utf-8"
+        ) as f:
+            reader = csv.DictReader(f)
+            line = 2  # first data line, after the header
+            chunk: List[dict] = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) < CHUNK_ROWS:
+                    continue
+                in_flight.append(self._pool.submit(parse_chunk, data_type, chunk, line))
+                line += len(chunk)
+                chunk = []
+                # keep the pool busy without reading the whole file ahead
+                while len(in_flight) > 2 * self.workers:
+                    self._collect(status, in_flight.popleft().result(), parsed, rejects)
+            if chunk:
+                in_flight.append(self._pool.submit(parse_chunk, data_type, chunk, line))
+        while in_flight:
+            self._collect(status, in_flight.popleft().result(), parsed, rejects)
+
+        # 2) the whole file in one writer operation: all rows or none
+        _parse, upsert = IMPORTERS[data_type]
+        if not rejects:
+            try:
+                counts = upsert([row for _line, row in parsed], mode=status["mode"])
+            except sqlite3.Error:
+                rejects = db_writer.execute(
+                    _refused_rows, upsert.__wrapped__, parsed, status["mode"]
+                )
+                if not rejects:
+                    raise
+            else:
+                for key, n in counts.items():
+                    status[key] += n
+                return
+
+        status["rejected"] = len(rejects)
+        status["rejects"] = rejects[:MAX_LISTED_REJECTS]
+        raise ValueError(
+            f"{len(rejects)} row(s) rejected; nothing was imported. "
+            "Fix the listed lines and upload the file again."
+        )
+
+    def _collect(self, status: Dict[str, Any], parsed_chunk, parsed, rejects) -> None:
+        chunk_rows, chunk_rejects = parsed_chunk
+        parsed.extend(chunk_rows)
+        rejects.extend(chunk_rejects)
+        status["processed"] += len(chunk_rows) + len(chunk_rejects)
+        status["rejected"] = len(rejects)
+        room = MAX_LISTED_REJECTS - len(status["rejects"])
+        status["rejects"].extend(chunk_rejects[: max(0, room)])
+
+        elapsed = time.time() - status["startedAt"]
+        remaining = max(0, status["totalRows"] - status["processed"])
+        rate = status["processed"] / elapsed if elapsed > 0 else 0
+        status["etaSeconds"] = round(remaining / rate, 1) if rate else None
+        self._write_status(status["jobId"], status)
+
+    def _read_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.spool_dir / job_id / "status.json", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_status(self, job_id: str, status: Dict[str, Any]) -> None:
+        path = self.spool_dir / job_id / "status.json"
+        tmp = path.with_name(f"status.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp, path)
+
+
+import_jobs = ImportJobs()
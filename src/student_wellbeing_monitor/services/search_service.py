@@ -0,0 +1,66 @@
+# src/student_wellbeing_monitor/services/search_service.py
+"""
+Search for the data-table pages and the /search endpoint.
+
+Wraps database.search with page arithmetic and turns the snippet markers into
+HTML: the text is escaped first, then each hit is wrapped in <mark>.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+from markupsafe import Markup, escape
+
+from student_wellbeing_monitor.database import search
+
+SEARCHABLE = {
+    "students": search.search_students,
+    "wellbeing": search.search_wellbeing,
+}
+
+
+def highlight(snippet: Optional[str]) -> Markup:
+    """Escaped snippet with the FTS hits wrapped in <mark>."""
+    text = str(escape(snippet or ""))
+    return Markup(
+        text.replace(search.MARK_START, "<mark>").replace(search.MARK_END, "</mark>")
+    )
+
+
+def search_page(
+    data_type: str,
+    query: str,
+    page: int = 1,
+    per_page: int = 10,
+    student_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of ranked matches:
+    {
+      "total": 23,
+      "page": 2,          # clamped to the last page
+      "totalPages": 3,
+      "rows": [Row(..., snippet), ...],
+    }
+    """
+    if data_type not in SEARCHABLE:
+        raise ValueError(f"Search is not supported for {data_type}")
+    page = max(1, page)
+
+    kwargs = {"student_id": student_id} if data_type == "wellbeing" else {}
+    result = SEARCHABLE[data_type](
+        query, limit=per_page, offset=(page - 1) * per_page, **kwargs
+    )
+    total_pages = max(1, math.ceil(result["total"] / per_page))
+    if page > total_pages:
+        # past the end (e.g. the index shrank): show the last page instead
+        page = total_pages
+        result = SEARCHABLE[data_type](
+            query, limit=per_page, offset=(page - 1) * per_page, **kwargs
+        )
+    return {
+        "total": result["total"],
+        "page": page,
+        "totalPages": total_pages,
+        "rows": result["rows"],
+    }
@@ -0,0 +1,277 @@
+# src/student_wellbeing_monitor/services/snapshot_service.py
+"""
+Columnar (Parquet) snapshots of the database for offline analysis.
+
+Analysts load a snapshot with ``load_snapshot`` instead of querying the live
+student.db, so heavy analysis no longer competes with dashboard traffic.
+
+Layout of a snapshot directory:
+
+    <snapshot>/
+      manifest.json
+      programme.parquet, student.parquet, module.parquet, student_module.parquet
+      submission.parquet
+      wellbeing/week=1/part-0.parquet, wellbeing/week=2/part-0.parquet, ...
+      attendance/week=1/part-0.parquet, ...
+
+pyarrow is an optional dependency: it is only imported when a snapshot is
+written or read.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from student_wellbeing_monitor.database.read import (
+    fetch_table_chunks,
+    get_table_weeks,
+)
+
+# column types:
+#   "id"   → dictionary-encoded string (student / module / programme ids)
+#   "str"  → plain string
+#   "date" → YYYY-MM-DD text stored as date32
+#   other  → the pyarrow type of the same name
+SNAPSHOT_TABLES: Dict[str, Dict[str, Any]] = {
+    "programme": {
+        "columns": [
+            ("programme_id", "id"),
+            ("programme_name", "str"),
+            ("programme_code", "str"),
+        ],
+        "weekly": False,
+    },
+    "student": {
+        "columns": [
+            ("student_id", "id"),
+            ("name", "str"),
+            ("email", "str"),
+            ("programme_id", "id"),
+        ],
+        "weekly": False,
+    },
+    "module": {
+        "columns": [
+            ("module_id", "id"),
+            ("module_code", "str"),
+            ("module_name", "str"),
+            ("programme_id", "id"),
+        ],
+        "weekly": False,
+    },
+    "student_module": {
+        "columns": [("student_id", "id"), ("module_id", "id")],
+        "weekly": False,
+    },
+    "wellbeing": {
+        "columns": [
+            ("id", "int64"),
+            ("student_id", "id"),
+            ("stress_level", "int8"),
+            ("hours_slept", "float32"),
+            ("comment", "str"),
+        ],
+        "weekly": True,
+    },
+    "attendance": {
+        "columns": [
+            ("id", "int64"),
+            ("student_id", "id"),
+            ("module_id", "id"),
+            ("session_number", "int16"),
+            ("status", "int8"),
+        ],
+        "weekly": True,
+    },
+    "submission": {
+        "columns": [
+            ("id", "int64"),
+            ("student_id", "id"),
+            ("module_id", "id"),
+            ("assignment_no", "int16"),
+            ("submitted", "int8"),
+            ("grade", "float32"),
+            ("due_date", "date"),
+            ("submit_date", "date"),
+        ],
+        "weekly": False,
+    },
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            "Columnar snapshots need pyarrow. Install the snapshot extra: "
+            "poetry install --extras snapshot (or pip install '.[snapshot]')"
+        ) from e
+    return pa, pq
+
+
+def _parse_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _build_batch(pa, columns, rows):
+    """Turn a chunk of SQLite tuples into an Arrow record batch."""
+    arrays = []
+    fields = []
+    for idx, (name, kind) in enumerate(columns):
+        values = [row[idx] for row in rows]
+        if kind == "id":
+            arr = pa.array(
+                [None if v is None else str(v) for v in values], type=pa.string()
+            ).dictionary_encode()
+        elif kind == "str":
+            arr = pa.array(values, type=pa.string())
+        elif kind == "date":
+            arr = pa.array([_parse_date(v) for v in values], type=pa.date32())
+        else:
+            arr = pa.array(values, type=getattr(pa, kind)())
+        arrays.append(arr)
+        fields.append(pa.field(name, arr.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def _write_parquet(pa, pq, path, columns, chunks, compression) -> int:
+    """Stream chunks of rows into one Parquet file, one row group per chunk."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = None
+    total = 0
+    try:
+        for rows in chunks:
+            batch = _build_batch(pa, columns, rows)
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression=compression)
+            writer.write_batch(batch)
+            total += batch.num_rows
+        if writer is None:
+            # empty table: still write the schema so the file can be loaded
+            pq.write_table(
+                pa.Table.from_batches([_build_batch(pa, columns, [])]),
+                path,
+                compression=compression,
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def export_snapshot(
+    output_dir: str,
+    chunk_size: int = 10000,
+    compression: str = "zstd",
+) -> Dict[str, Any]:
+    """
+    Write every fact and dimension table to compressed Parquet files.
+
+    Rows are streamed from SQLite ``chunk_size`` at a time; the weekly fact
+    tables (wellbeing, attendance) are partitioned by week. Returns the
+    manifest that is also written to ``<output_dir>/manifest.json``.
+    """
+    pa, pq = _require_pyarrow()
+
+    if os.path.isdir(output_dir) and os.listdir(output_dir):
+        raise FileExistsError(f"Snapshot directory is not empty: {output_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest: Dict[str, Any] = {
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        "compression": compression,
+        "tables": {},
+    }
+
+    for table, spec in SNAPSHOT_TABLES.items():
+        columns = spec["columns"]
+        names = [name for name, _kind in columns]
+
+        if not spec["weekly"]:
+            path = os.path.join(output_dir, f"{table}.parquet")
+            rows = _write_parquet(
+                pa,
+                pq,
+                path,
+                columns,
+                fetch_table_chunks(table, names, chunk_size=chunk_size),
+                compression,
+            )
+            manifest["tables"][table] = {"rows": rows, "weeks": None}
+            print(f"✓ {table}: {rows} rows → {path}")
+            continue
+
+        weeks: List[int] = []
+        total = 0
+        for week in get_table_weeks(table):
+            path = os.path.join(output_dir, table, f"week={week}", "part-0.parquet")
+            total += _write_parquet(
+                pa,
+                pq,
+                path,
+                columns,
+                fetch_table_chunks(table, names, week=week, chunk_size=chunk_size),
+                compression,
+            )
+            weeks.append(week)
+        manifest["tables"][table] = {"rows": total, "weeks": weeks}
+        print(f"✓ {table}: {total} rows in {len(weeks)} weekly partitions")
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_snapshot(
+    snapshot_dir: str,
+    table: str,
+    weeks: Optional[List[int]] = None,
+):
+    """
+    Load one table of a snapshot into a pandas DataFrame.
+
+    Files are memory-mapped rather than read into Python buffers, ids come back
+    as pandas categoricals and nullable integer columns keep an integer dtype.
+    For the weekly tables, ``weeks`` selects partitions without touching the
+    others.
+    """
+    if table not in SNAPSHOT_TABLES:
+        raise ValueError(f"Unknown snapshot table: {table}")
+    pa, pq = _require_pyarrow()
+    import pandas as pd
+
+    if SNAPSHOT_TABLES[table]["weekly"]:
+        import pyarrow.dataset as ds
+        from pyarrow.fs import LocalFileSystem
+
+        dataset = ds.dataset(
+            os.path.join(snapshot_dir, table),
+            format="parquet",
+            filesystem=LocalFileSystem(use_mmap=True),
+            partitioning=ds.partitioning(
+                pa.schema([("week", pa.int16())]), flavor="hive"
+            ),
+        )
+        flt = ds.field("week").isin(weeks) if weeks is not None else None
+        arrow_table = dataset.to_table(filter=flt)
+    else:
+        arrow_table = pq.read_table(
+            os.path.join(snapshot_dir, f"{table}.parquet"), memory_map=True
+        )
+
+    int_types = {
+        pa.int8(): pd.Int8Dtype(),
+        pa.int16(): pd.Int16Dtype(),
+        pa.int32(): pd.Int32Dtype(),
+        pa.int64(): pd.Int64Dtype(),
+    }
+    return arrow_table.to_pandas(types_mapper=int_types.get, date_as_object=False)
@@ -22,60 +22,90 @@ def read_csv(file_storage) -> list[dict]:
     return list(reader)
 
 
-def import_wellbeing_csv(file_storage):
+# ---------- row parsers: CSV dict → tuple in the upsert's column order ----------
+def parse_wellbeing_row(row: dict) -> tuple:
+    # Hypothetical field：student_id, week, stress_level, hours_slept, comment
+    return (
+        int(row["student_id"]),
+        int(row["week"]),
+        int(row["stress_level"]),
+        float(row["hours_slept"]),
+        row.get("comment") or None,
+    )
+
+
+def parse_attendance_row(row: dict) -> tuple:
+    # Hypothetical field：student_id, module_id, week, attendance_status, session_number
+    return (
+        int(row["student_id"]),
+        row["module_id"],
+        int(row["week"]),
+        int(row.get("session_number") or 1),
+        int(row["attendance_status"]),  # 0/1
+    )
+
+
+def parse_submission_row(row: dict) -> tuple:
+    # Hypothetical field： student_id,module_id,due_date,submit_date,assignment_no
+    return (
+        int(row["student_id"]),
+        row["module_id"],
+        int(row.get("assignment_no") or 1),
+        int(row["submitted"]),
+        row["grade"] or None,
+        row.get("due_date"),
+        row.get("submit_date") or None,
+    )
+
+
+# data_type → (row parser, bulk upsert helper)
+IMPORTERS = {
+    "wellbeing": (parse_wellbeing_row, create.upsert_wellbeing),
+    "attendance": (parse_attendance_row, create.upsert_attendance),
+    "submissions": (parse_submission_row, create.upsert_submissions),
+}
+
+
+# Each file is written by one bulk upsert on the single writer: all of its
+# rows or none, and re-uploading a corrected file only touches changed rows.
+# Every import returns {"inserted": n, "updated": n, "unchanged": n}.
+def import_wellbeing_csv(file_storage, mode: str = "upsert") -> dict:
     """
-    Import wellbeing data from CSV and insert into the wellbeing table.
+    Import wellbeing data from CSV and upsert it into the wellbeing table.
     """
     rows = read_csv(file_storage)
-    for row in rows:
-        # Hypothetical field：student_id, week, stress_level, hours_slept
-        create.insert_wellbeing(
-            int(row["student_id"]),
-            int(row["week"]),
-            int(row["stress_level"]),
-            int(row["hours_slept"]),
-        )
+    return create.upsert_wellbeing(
+        [parse_wellbeing_row(row) for row in rows], mode=mode
+    )
 
 
-def import_attendance_csv(file_storage):
+def import_attendance_csv(file_storage, mode: str = "upsert") -> dict:
     """
-    Import attendance data from CSV and insert into the attendance table.
+    Import attendance data from CSV and upsert it into the attendance table.
     """
     rows = read_csv(file_storage)
-    for row in rows:
-        # Hypothetical field：student_id, module_id, week, status, session_number=1
-        create.insert_attendance(
-            student_id=int(row["student_id"]),
-            module_id=row["module_id"],
-            week=int(row["week"]),
-            status=int(row["attendance_status"]),  # 0/1
-        )
+    return create.upsert_attendance(
+        [parse_attendance_row(row) for row in rows], mode=mode
+    )
 
 
-def import_submissions_csv(file_storage):
+def import_submissions_csv(file_storage, mode: str = "upsert") -> dict:
     """
-    Import submission data from CSV and insert into the attendance table.
+    Import submission data from CSV and upsert it into the submission table.
     """
     rows = read_csv(file_storage)
-    for row in rows:
-        # Hypothetical field： student_id,module_id,due_date,submit_date,
-        create.insert_submission(
-            student_id=int(row["student_id"]),
-            module_id=row["module_id"],
-            submitted=int(row["submitted"]),
-            grade=row["grade"] or None,
-            due_date=row.get("due_date"),
-            submit_date=row.get("submit_date"),
-        )
-
-
-def import_csv_by_type(data_type: str, file_storage):
+    return create.upsert_submissions(
+        [parse_submission_row(row) for row in rows], mode=mode
+    )
+
+
+def import_csv_by_type(data_type: str, file_storage, mode: str = "upsert") -> dict:
     """check data types and call corresponding import function"""
     if data_type == "wellbeing":
-        import_wellbeing_csv(file_storage)
+        return import_wellbeing_csv(file_storage, mode=mode)
     elif data_type == "attendance":
-        import_attendance_csv(file_storage)
+        return import_attendance_csv(file_storage, mode=mode)
     elif data_type == "submissions":
-        import_submissions_csv(file_storage)
+        return import_submissions_csv(file_storage, mode=mode)
     else:
         raise ValueError(f"Unsupported data_type: {data_type}")
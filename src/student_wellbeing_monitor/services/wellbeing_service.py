@@ -4,8 +4,17 @@ from typing import Any, Dict, List, Optional, Tuple
 from student_wellbeing_monitor.database.read import (
     get_all_students,
     get_students_by_programme,
-    get_wellbeing_records,
+    iter_wellbeing_records,
 )
+from student_wellbeing_monitor.database.risk_state import (
+    get_at_risk_states,
+    risk_state_covers,
+)
+from student_wellbeing_monitor.services.dimension_cache import (
+    DimensionCache,
+    dimension_cache,
+)
+from student_wellbeing_monitor.services.wellbeing_store import WellbeingStore
 
 
 # =========================================================
@@ -18,10 +27,25 @@ class WellbeingService:
     - get_dashboard_summary
     - get_stress_sleep_trend
     - get_risk_students
+
+    With a WellbeingStore the three methods are answered from its in-memory
+    arrays; without one they stream the rows from SQLite through
+    iter_wellbeing_records.
+    With a DimensionCache, student counts, names and emails are dict lookups
+    instead of a student-table read per call.
+    With use_risk_state, get_risk_students over the whole week range reads
+    the at-risk students from the student_risk_state table instead.
     """
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        store: Optional[WellbeingStore] = None,
+        dimensions: Optional[DimensionCache] = None,
+        use_risk_state: bool = False,
+    ):
+        self.store = store
+        self.dimensions = dimensions
+        self.use_risk_state = use_risk_state
 
     # --------------------------------------------------------
     # count student
@@ -32,6 +56,8 @@ class WellbeingService:
         - programme_id = None  → all students
         - programme_id = not None → students in the specified programme
         """
+        if self.dimensions is not None:
+            return self.dimensions.student_count(programme_id)
         if programme_id is None:
             rows = get_all_students()
             return len(rows)
@@ -39,6 +65,39 @@ class WellbeingService:
             rows = get_students_by_programme(programme_id)
             return len(rows)
 
+    def _summary_from_rows(
+        self, start_week: int, end_week: int, programme_id: Optional[str]
+    ) -> Tuple[float, int, float, int, int]:
+        """(stress_sum, stress_cnt, sleep_sum, sleep_cnt, responded) via SQLite."""
+        # 1) search wellbeing origin data
+        rows = iter_wellbeing_records(start_week, end_week, programme_id)
+        # rows: (student_id, week, stress_level, hours_slept,programme_id)
+
+        total_stress = 0.0
+        total_sleep = 0.0
+        n_stress = 0
+        n_sleep = 0
+        responded_students = set()
+
+        for student_id, week, stress_level, hours_slept, programme_id_record in rows:
+            if stress_level is not None:
+                try:
+                    total_stress += float(stress_level)
+                    n_stress += 1
+                except (TypeError, ValueError):
+                    pass
+
+            if hours_slept is not None:
+                try:
+                    total_sleep += float(hours_slept)
+                    n_sleep += 1
+                except (TypeError, ValueError):
+                    pass
+
+            responded_students.add(student_id)
+
+        return total_stress, n_stress, total_sleep, n_sleep, len(responded_students)
+
     # -------------------------------------------------
     # 9️⃣ get_dashboard_summary
     # -------------------------------------------------
@@ -69,39 +128,25 @@ class WellbeingService:
         if end_week < start_week:
             raise ValueError("end_week must be >= start_week")
 
-        # 1) search wellbeing origin data
-        rows = get_wellbeing_records(start_week, end_week, programme_id)
-        # rows: (student_id, week, stress_level, hours_slept,programme_id)
-
-        total_stress = 0.0
-        total_sleep = 0.0
-        n_stress = 0
-        n_sleep = 0
-        responded_students = set()
-
-        for student_id, week, stress_level, hours_slept, programme_id_record in rows:
-            if stress_level is not None:
-                try:
-                    total_stress += float(stress_level)
-                    n_stress += 1
-                except (TypeError, ValueError):
-                    pass
-
-            if hours_slept is not None:
-                try:
-                    total_sleep += float(hours_slept)
-                    n_sleep += 1
-                except (TypeError, ValueError):
-                    pass
-
-            responded_students.add(student_id)
+        if self.store is not None:
+            agg = self.store.summary(start_week, end_week, programme_id)
+            total_stress, n_stress = agg["stress_sum"], agg["stress_cnt"]
+            total_sleep, n_sleep = agg["sleep_sum"], agg["sleep_cnt"]
+            responded_count = agg["responded"]
+        else:
+            (
+                total_stress,
+                n_stress,
+                total_sleep,
+                n_sleep,
+                responded_count,
+            ) = self._summary_from_rows(start_week, end_week, programme_id)
 
         avg_stress = round(total_stress / n_stress, 2) if n_stress > 0 else 0.0
         avg_sleep = round(total_sleep / n_sleep, 2) if n_sleep > 0 else 0.0
 
         # 2) Count the responser & Response rate
         total_students = self._get_student_count(programme_id)
-        responded_count = len(responded_students)
         response_rate = (
             (responded_count / total_students) if total_students > 0 else 0.0
         )
@@ -136,14 +181,23 @@ class WellbeingService:
         if end_week < start_week:
             raise ValueError("end_week must be >= start_week")
 
-        rows = get_wellbeing_records(start_week, end_week, programme_id)
-        # rows: (programme_id, student_id, week, stress, sleep)
-
         stress_sum = defaultdict(float)
         stress_cnt = defaultdict(int)
         sleep_sum = defaultdict(float)
         sleep_cnt = defaultdict(int)
 
+        if self.store is not None:
+            rows = []
+            weekly = self.store.weekly(start_week, end_week, programme_id)
+            for w, (s_sum, s_cnt, sl_sum, sl_cnt) in weekly.items():
+                if s_cnt:
+                    stress_sum[w], stress_cnt[w] = s_sum, s_cnt
+                if sl_cnt:
+                    sleep_sum[w], sleep_cnt[w] = sl_sum, sl_cnt
+        else:
+            rows = iter_wellbeing_records(start_week, end_week, programme_id)
+            # rows: (programme_id, student_id, week, stress, sleep)
+
         for student_id, week, stress_level, hours_slept, programme_id in rows:
             if week is None:
                 continue
@@ -237,40 +291,70 @@ class WellbeingService:
         if end_week < start_week:
             raise ValueError("end_week must be >= start_week")
 
-        rows = get_wellbeing_records(start_week, end_week, programme_id)
-        # rows: (student_id, week, stress_level, hours_slept,programme_id)
+        # 0) whole history + default thresholds: indexed lookup of the
+        #    at-risk students kept up to date at write time
+        if (
+            self.use_risk_state
+            and student_id is None
+            and risk_state_covers(start_week, end_week, threshold, sleep_threshold)
+        ):
+            return self._risk_students_from_state(
+                programme_id, threshold, sleep_threshold
+            )
 
         # 1) get student name mapping
-        if programme_id is None:
-            student_rows = get_all_students()
+        if self.dimensions is not None:
+            # cached maps over every student: O(1) lookups, nothing to build
+            student_name_map = self.dimensions.student_names()
+            student_email_map = self.dimensions.student_emails()
         else:
-            student_rows = get_students_by_programme(programme_id)
-            # student_rows: student_id, name, email, programme_id
+            if programme_id is None:
+                student_rows = get_all_students()
+            else:
+                student_rows = get_students_by_programme(programme_id)
+                # student_rows: student_id, name, email, programme_id
 
-        student_name_map: Dict[str, str] = {
-            str(row[0]): row[1]  # 0 = student_id, 1 = name
-            for row in student_rows
-            if row[0] is not None
-        }
-        student_email_map: Dict[str, str] = {
-            str(row[0]): row[2]  # 0 = student_id, 1 = name
-            for row in student_rows
-            if row[0] is not None
-        }
+            student_name_map: Dict[str, str] = {
+                str(row[0]): row[1]  # 0 = student_id, 1 = name
+                for row in student_rows
+                if row[0] is not None
+            }
+            student_email_map: Dict[str, str] = {
+                str(row[0]): row[2]  # 0 = student_id, 1 = name
+                for row in student_rows
+                if row[0] is not None
+            }
 
-        # if specific student_id is given, ensure it exists in the name map
-        if student_id is not None:
-            student_id_str = str(student_id)
-            if student_id_str not in student_name_map:
-                # check in all students
-                all_student_rows = get_all_students()
-                for sid, name, email, pid in all_student_rows:
-                    if sid is not None and str(sid) == student_id_str:
-                        student_name_map[student_id_str] = name
-                        break
+            # if specific student_id is given, ensure it exists in the name map
+            if student_id is not None:
+                student_id_str = str(student_id)
+                if student_id_str not in student_name_map:
+                    # check in all students
+                    all_student_rows = get_all_students()
+                    for sid, name, email, pid in all_student_rows:
+                        if sid is not None and str(sid) == student_id_str:
+                            student_name_map[student_id_str] = name
+                            break
 
         # 2) group wellbeing data by student
         per_student: Dict[str, List[Tuple[int, float, float, str]]] = defaultdict(list)
+        if self.store is not None:
+            # only students with a qualifying week (or the requested student)
+            rows = []
+            per_student.update(
+                self.store.risk_candidates(
+                    start_week,
+                    end_week,
+                    programme_id,
+                    threshold=threshold,
+                    sleep_threshold=sleep_threshold,
+                    student_id=student_id,
+                )
+            )
+        else:
+            rows = iter_wellbeing_records(start_week, end_week, programme_id)
+            # rows: (student_id, week, stress_level, hours_slept,programme_id)
+
         for row_student_id, week, stress, sleep, programme_id in rows:
             if row_student_id is None or week is None or stress is None:
                 continue
@@ -379,12 +463,18 @@ class WellbeingService:
 
             if high_risk:
                 risk_type = "high_risk"
-                reason = f"Stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h for 3 consecutive weeks"
-                details = f"Weeks {high_weeks[0]}–{high_weeks[-1]}: stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h"
+                reason, details = _high_risk_text(
+                    threshold, sleep_threshold, high_weeks[0], high_weeks[-1]
+                )
             else:
                 risk_type = "potential_risk"
-                reason = f"Stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h"
-                details = f"Week {weeks[potential_week_idx]}: stress = {stresses[potential_week_idx]:.1f}, sleep = {sleeps[potential_week_idx]:.1f}h"
+                reason, details = _potential_risk_text(
+                    threshold,
+                    sleep_threshold,
+                    weeks[potential_week_idx],
+                    stresses[potential_week_idx],
+                    sleeps[potential_week_idx],
+                )
 
             items.append(
                 {
@@ -400,5 +490,67 @@ class WellbeingService:
 
         return {"items": items}
 
+    def _risk_students_from_state(
+        self,
+        programme_id: Optional[str],
+        threshold: float,
+        sleep_threshold: float,
+    ) -> Dict[str, Any]:
+        """get_risk_students items built from student_risk_state rows."""
+        if self.dimensions is not None:
+            student_name_map = self.dimensions.student_names()
+            student_email_map = self.dimensions.student_emails()
+        else:
+            student_name_map = {}
+            student_email_map = {}
+            for sid, name, email, _pid in get_all_students():
+                student_name_map[str(sid)] = name
+                student_email_map[str(sid)] = email
+
+        items: List[Dict[str, Any]] = []
+        for row in get_at_risk_states(programme_id):
+            if row["risk_type"] == "high_risk":
+                reason, details = _high_risk_text(
+                    threshold,
+                    sleep_threshold,
+                    row["high_start_week"],
+                    row["high_end_week"],
+                )
+            else:
+                reason, details = _potential_risk_text(
+                    threshold,
+                    sleep_threshold,
+                    row["first_hit_week"],
+                    row["first_hit_stress"],
+                    row["first_hit_sleep"],
+                )
+            sid = row["student_id"]
+            items.append(
+                {
+                    "studentId": sid,
+                    "name": student_name_map.get(sid),
+                    "email": student_email_map.get(sid),
+                    "riskType": row["risk_type"],
+                    "reason": reason,
+                    "details": details,
+                    "modules": [row["programme_id"]] if row["programme_id"] else [],
+                }
+            )
+        return {"items": items}
+
+
+def _high_risk_text(threshold, sleep_threshold, first_week, last_week):
+    reason = f"Stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h for 3 consecutive weeks"
+    details = f"Weeks {first_week}–{last_week}: stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h"
+    return reason, details
+
 
-wellbeing_service = WellbeingService()
+def _potential_risk_text(threshold, sleep_threshold, week, stress, sleep):
+    reason = f"Stress ≥ {threshold:.1f} and sleep < {sleep_threshold:.1f}h"
+    details = f"Week {week}: stress = {stress:.1f}, sleep = {sleep:.1f}h"
+    return reason, details
+
+
+wellbeing_service = WellbeingService(
+    store=WellbeingStore(), dimensions=dimension_cache, use_risk_state=True
+)
@@ -0,0 +1,275 @@
+# wellbeing_store.py
+
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.database.read import get_wellbeing_facts
+
+
+class _Columns(NamedTuple):
+    """A consistent set of column arrays, safe to read without the lock."""
+
+    student_idx: np.ndarray
+    week: np.ndarray
+    stress: np.ndarray
+    sleep: np.ndarray
+    programme: np.ndarray
+    student_ids: List[str]
+    programme_ids: List[Optional[str]]
+    student_codes: Dict[str, int]
+    programme_codes: Dict[Optional[str], int]
+
+
+# =========================================================
+# Class: WellbeingStore
+# =========================================================
+class WellbeingStore:
+    """
+    In-process, column-oriented copy of the wellbeing facts.
+
+    Every row is held as one slot in five NumPy arrays (13 bytes per row):
+      - student_idx  int32   → index into self.student_ids
+      - week         int16
+      - stress       int8    (0 = missing; valid levels are 1–5)
+      - sleep        float32 (NaN = missing)
+      - programme    int16   → index into self.programme_ids
+
+    The store checks db_core.get_data_versions() before every query:
+      - new wellbeing inserts → only rows with id > last loaded id are appended
+      - wellbeing edits/deletes or any student change → full reload
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple] = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self.student_ids: List[str] = []
+        self.programme_ids: List[Optional[str]] = []
+        self._student_codes: Dict[str, int] = {}
+        self._programme_codes: Dict[Optional[str], int] = {}
+        self._max_id = 0
+        self.student_idx = np.empty(0, dtype=np.int32)
+        self.week = np.empty(0, dtype=np.int16)
+        self.stress = np.empty(0, dtype=np.int8)
+        self.sleep = np.empty(0, dtype=np.float32)
+        self.programme = np.empty(0, dtype=np.int16)
+
+    # -------------------------------------------------
+    # loading
+    # -------------------------------------------------
+    def _code(self, codes: Dict, values: List, key) -> int:
+        idx = codes.get(key)
+        if idx is None:
+            idx = len(values)
+            codes[key] = idx
+            values.append(key)
+        return idx
+
+    def _append(self, rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        n = len(rows)
+        student_idx = np.empty(n, dtype=np.int32)
+        week = np.empty(n, dtype=np.int16)
+        stress = np.zeros(n, dtype=np.int8)
+        sleep = np.full(n, np.nan, dtype=np.float32)
+        programme = np.empty(n, dtype=np.int16)
+
+        for i, (_rid, sid, wk, st, sl, pid) in enumerate(rows):
+            student_idx[i] = self._code(self._student_codes, self.student_ids, str(sid))
+            week[i] = wk
+            if st is not None:
+                stress[i] = st
+            if sl is not None:
+                sleep[i] = sl
+            programme[i] = self._code(
+                self._programme_codes,
+                self.programme_ids,
+                str(pid) if pid is not None else None,
+            )
+
+        self.student_idx = np.concatenate([self.student_idx, student_idx])
+        self.week = np.concatenate([self.week, week])
+        self.stress = np.concatenate([self.stress, stress])
+        self.sleep = np.concatenate([self.sleep, sleep])
+        self.programme = np.concatenate([self.programme, programme])
+        self._max_id = max(self._max_id, rows[-1][0])
+
+    def refresh(self) -> _Columns:
+        """
+        Bring the arrays up to date with the database (one primary-key read
+        when nothing changed) and return a consistent view of them.
+        """
+        versions = db_core.get_data_versions()
+        wellbeing_v = versions.get("wellbeing", (0, 0, 0.0))
+        student_v = versions.get("student", (0, 0, 0.0))
+        stamp = (str(db_core.DB_PATH), wellbeing_v[0], wellbeing_v[1], student_v[0])
+
+        with self._lock:
+            if stamp != self._stamp:
+                self._reload(stamp)
+            return _Columns(
+                self.student_idx,
+                self.week,
+                self.stress,
+                self.sleep,
+                self.programme,
+                self.student_ids,
+                self.programme_ids,
+                self._student_codes,
+                self._programme_codes,
+            )
+
+    def _reload(self, stamp: Tuple) -> None:
+        previous = self._stamp
+        append_only = (
+            previous is not None
+            and previous[0] == stamp[0]
+            and previous[2] == stamp[2]  # no wellbeing rewrites
+            and previous[3] == stamp[3]  # no student changes
+        )
+        if not append_only:
+            self._clear()
+        self._append(get_wellbeing_facts(after_id=self._max_id))
+        self._stamp = stamp
+
+    def __len__(self) -> int:
+        return int(self.week.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (
+                self.student_idx,
+                self.week,
+                self.stress,
+                self.sleep,
+                self.programme,
+            )
+        )
+
+    # -------------------------------------------------
+    # vectorised queries
+    # -------------------------------------------------
+    @staticmethod
+    def _mask(
+        cols: _Columns, start_week: int, end_week: int, programme_id: Optional[str]
+    ) -> np.ndarray:
+        mask = (cols.week >= start_week) & (cols.week <= end_week)
+        if programme_id is not None:
+            code = cols.programme_codes.get(str(programme_id))
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= cols.programme == code
+        return mask
+
+    def summary(
+        self, start_week: int, end_week: int, programme_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Sums and counts behind WellbeingService.get_dashboard_summary."""
+        cols = self.refresh()
+        mask = self._mask(cols, start_week, end_week, programme_id)
+        stress = cols.stress[mask]
+        sleep = cols.sleep[mask]
+        has_stress = stress > 0
+        has_sleep = ~np.isnan(sleep)
+        responded = np.bincount(cols.student_idx[mask], minlength=len(cols.student_ids))
+        return {
+            "stress_sum": float(stress[has_stress].sum(dtype=np.float64)),
+            "stress_cnt": int(has_stress.sum()),
+            "sleep_sum": float(sleep[has_sleep].sum(dtype=np.float64)),
+            "sleep_cnt": int(has_sleep.sum()),
+            "responded": int(np.count_nonzero(responded)),
+        }
+
+    def weekly(
+        self, start_week: int, end_week: int, programme_id: Optional[str] = None
+    ) -> Dict[int, Tuple[float, int, float, int]]:
+        """
+        {week: (stress_sum, stress_cnt, sleep_sum, sleep_cnt)} for weeks that
+        have at least one stress or sleep value.
+        """
+        cols = self.refresh()
+        mask = self._mask(cols, start_week, end_week, programme_id)
+        week = cols.week[mask].astype(np.int64)
+        if week.size == 0:
+            return {}
+        offset = int(week.min())
+        bins = week - offset
+        stress = cols.stress[mask]
+        sleep = cols.sleep[mask]
+        has_stress = stress > 0
+        has_sleep = ~np.isnan(sleep)
+
+        stress_sum = np.bincount(bins[has_stress], weights=stress[has_stress])
+        stress_cnt = np.bincount(bins[has_stress])
+        sleep_sum = np.bincount(bins[has_sleep], weights=sleep[has_sleep])
+        sleep_cnt = np.bincount(bins[has_sleep])
+
+        result: Dict[int, Tuple[float, int, float, int]] = {}
+        for b in np.unique(bins[has_stress | has_sleep]):
+            b = int(b)
+            result[b + offset] = (
+                float(stress_sum[b]) if b < stress_sum.size else 0.0,
+                int(stress_cnt[b]) if b < stress_cnt.size else 0,
+                float(sleep_sum[b]) if b < sleep_sum.size else 0.0,
+                int(sleep_cnt[b]) if b < sleep_cnt.size else 0,
+            )
+        return result
+
+    def risk_candidates(
+        self,
+        start_week: int,
+        end_week: int,
+        programme_id: Optional[str] = None,
+        threshold: float = 4.5,
+        sleep_threshold: float = 6.0,
+        student_id: Optional[str] = None,
+    ) -> Dict[str, List[Tuple[int, float, Optional[float], str]]]:
+        """
+        Per-student records for WellbeingService.get_risk_students, sorted by
+        week: {student_id: [(week, stress, sleep, programme_id), ...]}.
+
+        Without student_id only students with at least one week where
+        stress >= threshold and sleep < sleep_threshold are returned; everyone
+        else can never be reported, so they are filtered out in bulk here.
+        """
+        cols = self.refresh()
+        mask = self._mask(cols, start_week, end_week, programme_id) & (cols.stress > 0)
+
+        if student_id is not None:
+            code = cols.student_codes.get(str(student_id))
+            if code is None:
+                return {}
+            mask &= cols.student_idx == code
+        else:
+            flagged = mask & (cols.stress >= threshold)
+            flagged &= cols.sleep < np.float32(sleep_threshold)
+            hit = np.zeros(len(cols.student_ids), dtype=bool)
+            hit[cols.student_idx[flagged]] = True
+            mask &= hit[cols.student_idx]
+
+        idx = np.nonzero(mask)[0]
+        idx = idx[np.lexsort((cols.week[idx], cols.student_idx[idx]))]
+
+        result: Dict[str, List[Tuple[int, float, Optional[float], str]]] = {}
+        for i in idx:
+            sid = cols.student_ids[cols.student_idx[i]]
+            sl = cols.sleep[i]
+            pid = cols.programme_ids[cols.programme[i]]
+            result.setdefault(sid, []).append(
+                (
+                    int(cols.week[i]),
+                    float(cols.stress[i]),
+                    None if np.isnan(sl) else round(float(sl), 6),
+                    pid if pid is not None else "",
+                )
+            )
+        # same student order as the SQL path (ORDER BY student_id)
+        return dict(sorted(result.items()))
@@ -22,9 +22,20 @@ def main():
         help="Actually delete data. Without this flag, the CLI runs in dry-run mode.",
     )
 
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        help="Number of students deleted per transaction (default: 500).",
+    )
+
     args = parser.parse_args()
 
-    run_archive(output_dir=args.output, delete_confirm=args.confirm)
+    run_archive(
+        output_dir=args.output,
+        delete_confirm=args.confirm,
+        chunk_size=args.chunk_size,
+    )
 
 
 if __name__ == "__main__":
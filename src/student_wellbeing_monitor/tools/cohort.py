@@ -0,0 +1,104 @@
+# src/student_wellbeing_monitor/tools/cohort.py
+
+import argparse
+
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.database.cohort import (
+    activate_cohort,
+    close_cohort,
+    create_cohort,
+    reopen_cohort,
+)
+from student_wellbeing_monitor.services.cohort_service import cohort_service
+
+
+def _list(_args):
+    cohorts = cohort_service.list_cohorts()
+    if not cohorts:
+        print(f"No cohorts registered; using {db_core.DB_PATH}")
+        return
+    for c in cohorts:
+        marker = "*" if c["status"] == "active" else " "
+        print(f"{marker} {c['cohortId']:<12} {c['status']:<7} {c['dbFile']}")
+
+
+def _create(args):
+    path = create_cohort(args.cohort_id, source=args.source, activate=args.activate)
+    print(f"✅ Cohort {args.cohort_id} created: {path}")
+
+
+def _activate(args):
+    activate_cohort(args.cohort_id)
+    print(f"✅ Cohort {args.cohort_id} is now the live database (restart servers)")
+
+
+def _close(args):
+    close_cohort(args.cohort_id, index=not args.no_index, compact=not args.no_compact)
+    print(f"🔒 Cohort {args.cohort_id} closed (read-only)")
+
+
+def _reopen(args):
+    reopen_cohort(args.cohort_id)
+    print(f"🔓 Cohort {args.cohort_id} reopened")
+
+
+def _compare(args):
+    result = cohort_service.compare_cohorts(args.cohort_ids or None)
+    for c in result["cohorts"]:
+        print(f"\n{c['cohortId']}")
+        print(f"  {'week':>4} {'stress':>7} {'sleep':>6} {'n':>5} {'attend':>7}")
+        for i, week in enumerate(c["weeks"]):
+            rate = c["attendanceRate"][i]
+            print(
+                f"  {week:>4} {c['avgStress'][i]:>7} {c['avgSleep'][i]:>6} "
+                f"{c['responses'][i]:>5} {'-' if rate is None else rate:>7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Manage the per-academic-year (cohort) databases."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List registered cohorts.").set_defaults(func=_list)
+
+    p = sub.add_parser("create", help="Create a cohort database.")
+    p.add_argument("cohort_id", help="Academic year, e.g. 2025-26.")
+    p.add_argument(
+        "--source",
+        type=str,
+        default=None,
+        help="Copy an existing database (e.g. database/student.db) instead of starting empty.",
+    )
+    p.add_argument("--activate", action="store_true", help="Make it the live database.")
+    p.set_defaults(func=_create)
+
+    p = sub.add_parser("activate", help="Make a cohort the live database.")
+    p.add_argument("cohort_id")
+    p.set_defaults(func=_activate)
+
+    p = sub.add_parser(
+        "close", help="Index, compact and mark a finished year read-only."
+    )
+    p.add_argument("cohort_id")
+    p.add_argument(
+        "--no-index", action="store_true", help="Skip the read-side indexes."
+    )
+    p.add_argument("--no-compact", action="store_true", help="Skip VACUUM.")
+    p.set_defaults(func=_close)
+
+    p = sub.add_parser("reopen", help="Make a closed cohort writable again.")
+    p.add_argument("cohort_id")
+    p.set_defaults(func=_reopen)
+
+    p = sub.add_parser("compare", help="Weekly wellbeing and attendance per cohort.")
+    p.add_argument("cohort_ids", nargs="*", help="Cohorts to compare (default: all).")
+    p.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
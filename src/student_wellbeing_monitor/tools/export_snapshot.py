@@ -0,0 +1,53 @@
+# src/student_wellbeing_monitor/tools/export_snapshot.py
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from student_wellbeing_monitor.services.snapshot_service import export_snapshot
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a columnar (Parquet) snapshot of the database."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(
+            PROJECT_ROOT / "snapshots" / datetime.now().strftime("%Y%m%d-%H%M%S")
+        ),
+        help="Directory to write the snapshot to (must be empty or missing).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10000,
+        help="Rows read from SQLite per batch (default: 10000).",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default="zstd",
+        help="Parquet compression codec (default: zstd).",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        export_snapshot(
+            output_dir=args.output,
+            chunk_size=args.chunk_size,
+            compression=args.compression,
+        )
+    except ImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"🎉 Snapshot ready: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
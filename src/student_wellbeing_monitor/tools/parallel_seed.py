@@ -0,0 +1,190 @@
+# src/student_wellbeing_monitor/tools/parallel_seed.py
+"""
+Parallel seeding of the weekly mock CSV files (used by setup_demo).
+
+Worker processes each take one file, convert its rows to tuples and put them
+on a bounded queue in batches of ``batch_rows`` (SEED_BATCH_ROWS by default).
+The main process drains the queue and writes every batch with
+create.insert_many, i.e. through the single writer connection. The bound
+keeps memory flat: when the writer falls behind, workers block on put()
+instead of parsing further ahead.
+
+Batches from different files interleave, so the same students show up in many
+of them. Their risk state and features are therefore not refreshed per batch
+but once, after the last batch (create.refresh_students).
+
+Kept separate from setup_demo so that spawned workers do not re-run that
+module's top-level code.
+"""
+
+import csv
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from student_wellbeing_monitor.database import create
+
+SEED_BATCH_ROWS = 2000
+SEED_QUEUE_BATCHES = 16  # batches waiting for the writer, at most
+
+
+# ---------- row converters: CSV dict → tuple in create's column order ----------
+def _wellbeing_row(row: dict) -> tuple:
+    return (
+        row["student_id"],
+        int(row["week"]),
+        int(row["stress_level"]),
+        float(row["hours_slept"]),
+        row["comment"],
+    )
+
+
+def _attendance_row(row: dict) -> tuple:
+    return (
+        row["student_id"],
+        int(row["module_id"]),
+        int(row["week"]),
+        1,  # session_number
+        int(row["attendance_status"]),
+    )
+
+
+def _submission_row(row: dict) -> tuple:
+    # grade may = ""
+    grade_str = row.get("grade", "").strip()
+    return (
+        row["student_id"],
+        int(row["module_id"]),
+        1,  # assignment_no
+        int(row["submitted"]),
+        float(grade_str) if grade_str != "" else None,
+        row["due_date"],
+        row["submit_date"],
+    )
+
+
+# table → (file pattern, converter, filtered by max_week)
+SEED_SOURCES = {
+    "wellbeing": ("wellbeing_week*.csv", _wellbeing_row, True),
+    "attendance": ("attendance_week*.csv", _attendance_row, True),
+    "submission": ("submissions_*.csv", _submission_row, False),
+}
+
+
+# ---------- worker side ----------
+_batches = None
+
+
+def _init_worker(batches) -> None:
+    global _batches
+    _batches = batches
+
+
+def _parse_file(table: str, path: str, max_week: Optional[int], batch_rows: int) -> int:
+    """Convert one CSV file and queue its rows; a (table, None) marks the end."""
+    _pattern, convert, by_week = SEED_SOURCES[table]
+    batch = []
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if by_week and max_week is not None and int(row["week"]) > max_week:
+                continue
+            batch.append(convert(row))
+            if len(batch) >= batch_rows:
+                _batches.put((table, batch))
+                count += len(batch)
+                batch = []
+    if batch:
+        _batches.put((table, batch))
+        count += len(batch)
+    _batches.put((table, None))
+    return count
+
+
+# ---------- main process ----------
+def seed_parallel(
+    mock_dir: Path,
+    max_week: Optional[int] = None,
+    workers: Optional[int] = None,
+    batch_rows: int = SEED_BATCH_ROWS,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Seed wellbeing / attendance / submission from every matching file in
+    ``mock_dir``. Prints and returns per-table throughput:
+    {"wellbeing": {"files": 12, "batches": 12, "rows": 360, "seconds": 0.05}, ...}
+    (``seconds`` is time spent writing that table). ``batch_rows`` is passed
+    to the workers as an argument: they are spawned, so a changed module
+    constant would not reach them.
+    """
+    workers = workers or os.cpu_count() or 1
+    files = [
+        (table, path)
+        for table, (pattern, _convert, _by_week) in SEED_SOURCES.items()
+        for path in sorted(Path(mock_dir).glob(pattern))
+    ]
+    stats = {
+        table: {"files": 0, "batches": 0, "rows": 0, "seconds": 0.0}
+        for table in SEED_SOURCES
+    }
+    for table, _path in files:
+        stats[table]["files"] += 1
+    if not files:
+        print("⚠️ No weekly CSV files found, skip seeding.")
+        return stats
+
+    print(f"🌱 Seeding {len(files)} files with {workers} parser processes ...")
+    start = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    batches = ctx.Queue(maxsize=SEED_QUEUE_BATCHES)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(batches,),
+    ) as pool:
+        futures = [
+            pool.submit(_parse_file, table, str(path), max_week, batch_rows)
+            for table, path in files
+        ]
+        touched = {table: set() for table in SEED_SOURCES}
+        finished = 0
+        while finished < len(files):
+            try:
+                table, batch = batches.get(timeout=0.5)
+            except queue.Empty:
+                for future in futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+                continue
+            if batch is None:
+                finished += 1
+                continue
+            t0 = time.perf_counter()
+            stats[table]["batches"] += 1
+            stats[table]["rows"] += create.insert_many(table, batch, refresh=False)
+            touched[table].update(row[0] for row in batch)
+            stats[table]["seconds"] += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    students = set().union(*touched.values())
+    create.refresh_students(students, touched["wellbeing"])
+    print(
+        f"🔁 Refreshed risk state and features of {len(students)} students "
+        f"in {time.perf_counter() - t0:.2f}s"
+    )
+
+    elapsed = time.perf_counter() - start
+    print(f"{'table':<12} {'files':>6} {'rows':>10} {'write s':>9} {'rows/s':>10}")
+    for table, s in stats.items():
+        rate = s["rows"] / s["seconds"] if s["seconds"] else 0
+        print(
+            f"{table:<12} {s['files']:>6} {s['rows']:>10} "
+            f"{s['seconds']:>9.2f} {rate:>10.0f}"
+        )
+    total = sum(s["rows"] for s in stats.values())
+    print(f"✅ {total} rows seeded in {elapsed:.2f}s ({total / elapsed:.0f} rows/s)")
+    return stats
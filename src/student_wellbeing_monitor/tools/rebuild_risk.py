@@ -0,0 +1,39 @@
+# src/student_wellbeing_monitor/tools/rebuild_risk.py
+
+import argparse
+
+from student_wellbeing_monitor.database.risk_state import rebuild_risk_state
+from student_wellbeing_monitor.database.student_features import (
+    rebuild_student_features,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute the per-student risk state and feature vectors from all records."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Stress level counted as high (default: keep the current value, 4.5).",
+    )
+    parser.add_argument(
+        "--sleep-threshold",
+        type=float,
+        default=None,
+        help="Hours of sleep counted as too little (default: keep the current value, 6.0).",
+    )
+
+    args = parser.parse_args()
+
+    count = rebuild_risk_state(
+        threshold=args.threshold, sleep_threshold=args.sleep_threshold
+    )
+    print(f"✅ Risk state rebuilt for {count} students")
+    count = rebuild_student_features()
+    print(f"✅ Student features rebuilt for {count} students")
+
+
+if __name__ == "__main__":
+    main()
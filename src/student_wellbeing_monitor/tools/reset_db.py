@@ -1,12 +1,13 @@
 import os
 
-from student_wellbeing_monitor.database.db_core import DB_PATH
+from student_wellbeing_monitor.database import db_core
 from student_wellbeing_monitor.database.schema import init_db_schema
 
 
 def reset_database():
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    # the active cohort's file when cohorts are in use
+    if os.path.exists(db_core.DB_PATH):
+        os.remove(db_core.DB_PATH)
         print("🗑 Old database removed.")
 
     init_db_schema()
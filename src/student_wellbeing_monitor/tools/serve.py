@@ -0,0 +1,221 @@
+# src/student_wellbeing_monitor/tools/serve.py
+
+import argparse
+import gc
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.services.analytics_snapshot import (
+    configure,
+    refresh_snapshot,
+    snapshot_refresher,
+)
+from student_wellbeing_monitor.services.dimension_cache import dimension_cache
+from student_wellbeing_monitor.services.import_jobs import import_jobs
+from student_wellbeing_monitor.services.wellbeing_service import wellbeing_service
+from student_wellbeing_monitor.ui.app import app
+
+
+def preload():
+    """
+    Warm everything a request would otherwise load on first use:
+      - dimension cache (programmes, modules, students, weeks)
+      - wellbeing columnar store
+      - every Jinja template, compiled into the environment's cache
+      - in snapshot mode, the analytics replica
+    and fails the import jobs left queued by workers of a previous run.
+
+    Called once in the master process before workers are forked, so the
+    workers start warm and share these pages copy-on-write. gc.freeze()
+    keeps the collector from touching (and thereby copying) them later.
+    No threads are started here: the master forks again whenever a worker is
+    replaced, so the replica is kept fresh by the server (_serve_threaded /
+    _start_refresher) instead.
+    """
+    dimension_cache.programmes()
+    dimension_cache.modules()
+    dimension_cache.student_names()
+    dimension_cache.weeks()
+    if wellbeing_service.store is not None:
+        wellbeing_service.store.refresh()
+    if db_core.ANALYTICS_SNAPSHOT:
+        refresh_snapshot()
+
+    orphaned = import_jobs.recover_orphans()
+    if orphaned:
+        print(f"⚠️ Marked {orphaned} interrupted import job(s) as failed")
+
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+    gc.collect()
+    gc.freeze()
+    print(f"✓ Preloaded dimension data and {len(app.jinja_env.cache)} templates")
+    return app
+
+
+def _start_refresher(server) -> None:
+    """
+    gunicorn when_ready hook: refresh the replica from one process of its own.
+    A thread in the master would be copied into every fork mid-refresh, and
+    one per worker would copy the database 2 × CPUs + 1 times over.
+    """
+    server.snapshot_process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "student_wellbeing_monitor.services.analytics_snapshot",
+            "--db",
+            str(db_core.DB_PATH),
+            "--max-staleness",
+            str(db_core.ANALYTICS_MAX_STALENESS),
+        ]
+    )
+
+
+def _stop_refresher(server) -> None:
+    """gunicorn on_exit hook: let the refresher finish its current copy."""
+    process = getattr(server, "snapshot_process", None)
+    if process is not None:
+        process.terminate()
+        process.wait(60)
+
+
+def _serve_gunicorn(args) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class WellbeingServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # with preload_app this runs once, in the master, before forking
+            return preload()
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "preload_app": True,
+        # SIGTERM: stop accepting, let in-flight requests finish for this long
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        "accesslog": "-",
+    }
+    if db_core.ANALYTICS_SNAPSHOT:
+        options["when_ready"] = _start_refresher
+        options["on_exit"] = _stop_refresher
+    print(
+        f"🌐 Serving on http://{args.host}:{args.port} "
+        f"({args.workers} workers × {args.threads} threads, gunicorn)"
+    )
+    WellbeingServer(options).run()
+
+
+def _serve_threaded(args) -> None:
+    """Single-process, thread-per-request fallback (e.g. on Windows)."""
+    from werkzeug.serving import make_server
+
+    server = make_server(args.host, args.port, preload(), threaded=True)
+    if db_core.ANALYTICS_SNAPSHOT:
+        # a single process: the refresher can be a thread next to the server
+        snapshot_refresher.start()
+    # join request threads on close instead of killing them
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def _drain(signum, _frame):
+        print(f"⏳ Signal {signum}: finishing in-flight requests ...")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, _drain)
+    signal.signal(signal.SIGTERM, _drain)
+
+    print(f"🌐 Serving on http://{args.host}:{args.port} (threaded)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    print("✅ Server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the wellbeing dashboard with a production WSGI server."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1)),
+        help="Worker processes (default: $WEB_CONCURRENCY or 2 × CPUs + 1).",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=4,
+        help="Threads per worker (default: 4).",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="Seconds to let in-flight requests finish on shutdown (default: 30).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=60,
+        help="Seconds before a silent worker is restarted (default: 60).",
+    )
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="Use the single-process threaded server instead of gunicorn.",
+    )
+    parser.add_argument(
+        "--analytics-snapshot",
+        action="store_true",
+        help="Serve analytic charts from a replica refreshed in the background.",
+    )
+    parser.add_argument(
+        "--max-staleness",
+        type=float,
+        default=db_core.ANALYTICS_MAX_STALENESS,
+        help="Seconds the analytics replica may lag before reads go live "
+        "(default: $WELLBEING_ANALYTICS_STALENESS or 60).",
+    )
+
+    args = parser.parse_args()
+    if args.analytics_snapshot or db_core.ANALYTICS_SNAPSHOT:
+        configure(enabled=True, max_staleness=args.max_staleness)
+
+    if not args.threaded:
+        try:
+            import gunicorn.app.base  # noqa: F401
+        except ImportError:
+            print(
+                "⚠️ gunicorn is not installed (poetry install --extras serve); "
+                "falling back to the threaded server."
+            )
+            args.threaded = True
+
+    if args.threaded:
+        _serve_threaded(args)
+    else:
+        _serve_gunicorn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ from pathlib import Path
 
 from student_wellbeing_monitor.database import create
 from student_wellbeing_monitor.database.schema import init_db_schema
+from student_wellbeing_monitor.tools.parallel_seed import seed_parallel
 from student_wellbeing_monitor.tools.reset_db import reset_database
 
 BASE_DIR = Path(__file__).resolve().parents[3]
@@ -46,6 +47,17 @@ def parse_args():
         default=30,
         help="Number of students (default: 50).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parser processes for the weekly CSVs (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help="Seed the weekly CSVs one row at a time instead of in parallel.",
+    )
     return parser.parse_args()
 
 
@@ -260,9 +272,12 @@ def setup_demo():
     if args.with_mock:
         run_generate_mock()
         print(" Importing mock wellbeing / attendance / submission.")
-        seed_wellbeing(max_week=args.weeks)
-        seed_attendance(max_week=args.weeks)
-        seed_submission()
+        if args.serial:
+            seed_wellbeing(max_week=args.weeks)
+            seed_attendance(max_week=args.weeks)
+            seed_submission()
+        else:
+            seed_parallel(MOCK_DIR, max_week=args.weeks, workers=args.workers)
         print("🎉 Mock dynamic data inserted.")
 
     print("🎉 Demo database ready!")
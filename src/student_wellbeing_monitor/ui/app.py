@@ -1,11 +1,29 @@
 """src/wellbeing_system/ui/app.py"""
 
+import functools
+import hashlib
+import json
 import math
 import os
+from datetime import datetime, timezone
 
 from dotenv import load_dotenv
-from flask import Flask, flash, redirect, render_template, request, url_for
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
 
+from student_wellbeing_monitor.database import db_core
+from student_wellbeing_monitor.database.db_core import get_data_versions, snapshot_time
 from student_wellbeing_monitor.database.read import (
     count_attendance,
     count_students,
@@ -14,7 +32,6 @@ from student_wellbeing_monitor.database.read import (
     get_all_students,
     get_attendance_by_id,
     get_attendance_page,
-    get_programmes,
     get_student_by_id,
     get_submission_by_id,
     get_submission_page,
@@ -26,6 +43,11 @@ from student_wellbeing_monitor.database.update import (
     update_submission,
     update_wellbeing,
 )
+from student_wellbeing_monitor.services.analytics_snapshot import (
+    snapshot_refresher,
+    snapshot_status,
+)
+from student_wellbeing_monitor.services.chart_reduction import SCATTER_MODES
 from student_wellbeing_monitor.services.dashboard_service import (
     build_charts,
     build_risks,
@@ -34,7 +56,17 @@ from student_wellbeing_monitor.services.dashboard_service import (
     resolve_programme_and_module,
     resolve_week_range,
 )
-from student_wellbeing_monitor.services.upload_service import import_csv_by_type
+from student_wellbeing_monitor.services.dimension_cache import get_programme_map
+from student_wellbeing_monitor.services.export_service import (
+    EXPORT_FORMATS,
+    stream_export,
+)
+from student_wellbeing_monitor.services.import_jobs import import_jobs
+from student_wellbeing_monitor.services.search_service import (
+    SEARCHABLE,
+    highlight,
+    search_page,
+)
 
 load_dotenv()
 
@@ -45,6 +77,7 @@ app = Flask(
     static_folder="static",  #  ui/static
 )
 app.config["SECRET_KEY"] = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
+app.add_template_filter(highlight, "highlight")
 
 TABLE_FIELDS = {
     "students": [
@@ -81,6 +114,86 @@ TABLE_FIELDS = {
 }
 
 
+# -------- Conditional requests (ETag / Last-Modified) --------
+# The rendered HTML also depends on templates and this module, so their
+# modification times are part of every ETag.
+_TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+_ETAG_SALT = max(
+    [os.path.getmtime(__file__)]
+    + [
+        os.path.getmtime(os.path.join(_TEMPLATE_DIR, name))
+        for name in os.listdir(_TEMPLATE_DIR)
+    ]
+)
+
+
+def _data_etag():
+    """
+    (etag, last_modified) for the current request: the data_version of every
+    table plus the request path and filters. One small read, no queries.
+    In snapshot mode the analytic data comes from the replica, so its copy
+    time is part of the key as well.
+    """
+    versions = get_data_versions()
+    copied_at = snapshot_time()
+    key = json.dumps(
+        [
+            _ETAG_SALT,
+            sorted(versions.items()),
+            copied_at,
+            request.path,
+            sorted(request.args.items(multi=True)),
+        ]
+    )
+    etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    updated = max((v[2] for v in versions.values()), default=None)
+    if updated and copied_at:
+        updated = max(updated, copied_at)
+    last_modified = (
+        datetime.fromtimestamp(int(updated), tz=timezone.utc) if updated else None
+    )
+    return etag, last_modified
+
+
+def conditional(view):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before the view runs,
+    and stamp full responses with ETag / Last-Modified.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # pending flash messages must be rendered, never served from cache
+        if session.get("_flashes"):
+            return view(*args, **kwargs)
+
+        etag, last_modified = _data_etag()
+        not_modified = (
+            request.if_none_match.contains(etag)
+            if request.if_none_match
+            else bool(
+                last_modified
+                and request.if_modified_since
+                and request.if_modified_since >= last_modified
+            )
+        )
+        if not_modified:
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        # browsers keep the page but check back on every load
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
+
+
 # -------- 1. entrance: select role --------
 @app.route("/")
 def index():
@@ -92,6 +205,7 @@ def index():
 
 # -------- 2. Dashboard：based on roles --------
 @app.route("/dashboard/<role>")
+@conditional
 def dashboard(role):
 
     # ---------- 0. Validation ----------
@@ -115,6 +229,10 @@ def dashboard(role):
     # ---------- 3. chart ----------
     # wellbeing: stress/sleep line + programme bar
     # course: attendance/ line + submission vs module bar + attendance vs grade scatter
+    # scatter reduction: auto / points / sample / bin (see chart_reduction)
+    scatter_mode = request.args.get("scatter_mode", "auto", type=str)
+    if scatter_mode not in SCATTER_MODES:
+        scatter_mode = "auto"
     charts = build_charts(
         role,
         week_ctx["start_week"],
@@ -122,6 +240,7 @@ def dashboard(role):
         prog_ctx["current_programme"],
         prog_ctx["current_module"],
         modules_by_programme,
+        scatter_mode,
     )
 
     # ---------- 5. chart ----------
@@ -148,6 +267,8 @@ def dashboard(role):
         current_programme=prog_ctx["current_programme"],
         current_module=prog_ctx["current_module"],
         summary=summary,
+        scatter_mode=scatter_mode,
+        analytics=snapshot_status(),
         **charts,
         **risks,
     )
@@ -167,9 +288,11 @@ def upload_data(role):
             return redirect(url_for("upload_data", role=role))
 
         try:
-            import_csv_by_type(data_type, file)
-            flash(f"Successfully imported {data_type} data.", "success")
-            return redirect(url_for("view_data", role=role))
+            # spool + queue only; parsing and writing happen in the background
+            job_id = import_jobs.submit(
+                data_type, file, mode=request.form.get("import_mode", "upsert")
+            )
+            return redirect(url_for("upload_data", role=role, job=job_id))
         except Exception as e:
             # In real project can log, here keep it simple
             print("Upload error:", e)
@@ -179,6 +302,44 @@ def upload_data(role):
         "upload.html",
         role=role,
         active_page="upload",
+        job=import_jobs.status(request.args.get("job", "")),
+    )
+
+
+@app.route("/imports/<job_id>")
+def import_status(job_id):
+    """Progress of a background import: rows processed, rejects, ETA."""
+    status = import_jobs.status(job_id)
+    if status is None:
+        abort(404)
+    return jsonify(status)
+
+
+@app.route("/search/<data_type>")
+def search_records(data_type):
+    """
+    Ranked full-text matches as JSON: ?q=<words>&page=<n> (+ &student_id=
+    for wellbeing comments). Snippets are HTML with hits in <mark>.
+    """
+    if data_type not in SEARCHABLE:
+        abort(404)
+    result = search_page(
+        data_type,
+        request.args.get("q", "", type=str),
+        page=request.args.get("page", default=1, type=int),
+        student_id=request.args.get("student_id", "", type=str).strip() or None,
+    )
+    return jsonify(
+        {
+            "query": request.args.get("q", ""),
+            "total": result["total"],
+            "page": result["page"],
+            "totalPages": result["totalPages"],
+            "results": [
+                {**dict(row), "snippet": str(highlight(row["snippet"]))}
+                for row in result["rows"]
+            ],
+        }
     )
 
 
@@ -200,6 +361,8 @@ def enrich_student_programme(raw_rows, programme_map):
                 ),
                 # Optional: keep id
                 "programme_id": row["programme_id"],
+                # search results: the matching text
+                "snippet": row["snippet"] if "snippet" in row.keys() else None,
             }
         )
     return enriched
@@ -208,6 +371,7 @@ def enrich_student_programme(raw_rows, programme_map):
 # -------- 3. View data tables --------
 @app.route("/data/<role>", defaults={"data_type": "students"})
 @app.route("/data/<role>/<data_type>")
+@conditional
 def view_data(role, data_type):
     page = request.args.get("page", default=1, type=int)
     if page < 1:
@@ -216,16 +380,38 @@ def view_data(role, data_type):
     per_page = 10
     offset = (page - 1) * per_page
 
-    programme_rows = get_programmes()
-    programme_map = {
-        row["programme_id"]: f"{row['programme_code']} – {row['programme_name']}"
-        for row in programme_rows
-    }
+    programme_map = get_programme_map()
 
     fields = TABLE_FIELDS[data_type]
 
     student_id_filter = request.args.get("student_id", "", type=str).strip()
     sort_week = request.args.get("sort_week", "", type=str).strip()
+    query = request.args.get("q", "", type=str).strip()
+
+    # ========== full-text search (students / wellbeing comments) ==========
+    if query and data_type in SEARCHABLE:
+        result = search_page(
+            data_type,
+            query,
+            page=page,
+            per_page=per_page,
+            student_id=student_id_filter or None,
+        )
+        rows = result["rows"]
+        if data_type == "students":
+            rows = enrich_student_programme(rows, programme_map)
+        return render_template(
+            "data_table.html",
+            role=role,
+            data_type=data_type,
+            rows=rows,
+            page=result["page"],
+            fields=fields + [("snippet", "Match")],
+            total_pages=result["totalPages"],
+            total_matches=result["total"],
+            searchable=True,
+            active_page="data",
+        )
 
     # ========== students ==========
     if data_type == "students":
@@ -291,10 +477,42 @@ def view_data(role, data_type):
         page=page,
         fields=fields,
         total_pages=total_pages,
+        searchable=data_type in SEARCHABLE,
         active_page="data",
     )
 
 
+# -------- 4. Download data tables --------
+@app.route("/data/<role>/<data_type>/download")
+@conditional
+def download_data(role, data_type):
+    """
+    Full extract of a data table as CSV (default) or JSONL, optionally gzipped:
+      ?format=csv|jsonl&gzip=1&student_id=...&sort_week=asc|desc
+    The body is streamed; rows are read from the database as they are sent.
+    """
+    if data_type not in TABLE_FIELDS:
+        abort(404)
+    fmt = request.args.get("format", "csv", type=str)
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    use_gzip = request.args.get("gzip") == "1"
+
+    body = stream_export(
+        data_type,
+        fmt=fmt,
+        student_id=request.args.get("student_id", "", type=str).strip() or None,
+        sort_week=request.args.get("sort_week", "", type=str).strip() or None,
+        gzip=use_gzip,
+    )
+    filename = f"{data_type}.{fmt}" + (".gz" if use_gzip else "")
+    return Response(
+        body,
+        mimetype="application/gzip" if use_gzip else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # app.py
 @app.route("/data/<role>/<data_type>/<int:record_id>/edit", methods=["GET", "POST"])
 def edit_record(role, data_type, record_id):
@@ -427,6 +645,8 @@ def edit_record(role, data_type, record_id):
 
 def run_app():
     # The wellbeing-web script in pyproject.toml will call this
+    if db_core.ANALYTICS_SNAPSHOT:
+        snapshot_refresher.start()
     app.run(debug=True)
 
 
@@ -287,12 +287,30 @@ def test_build_charts_for_wellbeing(monkeypatch):
 def test_build_charts_for_course_leader_with_programme_and_module(monkeypatch):
     monkeypatch.setattr(
         dashboard_service.attendance_service,
-        "get_attendance_trends",
-        lambda course_id, programme_id, week_start, week_end: {
-            "points": [
-                {"week": 1, "attendanceRate": 0.9, "avgGrade": 70},
-                {"week": 2, "attendanceRate": 0.8, "avgGrade": 65},
-            ]
+        "get_module_attendance_trends",
+        lambda programme_id, course_ids, week_start, week_end: {
+            "weeks": [1, 2],
+            "modules": [
+                {
+                    "courseId": "M1",
+                    "courseCode": "CS101",
+                    "points": [{"week": 1, "attendanceRate": 1.0}],
+                },
+                {
+                    "courseId": "M2",
+                    "courseCode": "CS102",
+                    "points": [
+                        {"week": 1, "attendanceRate": 0.8},
+                        {"week": 2, "attendanceRate": 0.8},
+                    ],
+                },
+            ],
+            "programme": {
+                "points": [
+                    {"week": 1, "attendanceRate": 0.9, "avgGrade": 70},
+                    {"week": 2, "attendanceRate": 0.8, "avgGrade": 65},
+                ]
+            },
         },
     )
 
@@ -300,7 +318,7 @@ def test_build_charts_for_course_leader_with_programme_and_module(monkeypatch):
         dashboard_service.course_service,
         "get_attendance_vs_grades",
         lambda course_id, programme_id, week_start, week_end: {
-            "points": [{"studentId": "S1", "attendanceRate": 0.9, "grade": 70}]
+            "points": [{"studentId": "S1", "attendanceRate": 0.9, "avgGrade": 70}]
         },
     )
 
@@ -331,6 +349,11 @@ def test_build_charts_for_course_leader_with_programme_and_module(monkeypatch):
     assert charts["weeks_for_chart"] == [1, 2]
     assert charts["attendance_trend"] == [0.9, 0.8]
     assert charts["grade_trend"] == [70, 65]
+    # one overlay line per module, aligned to the chart weeks
+    assert charts["attendance_series"] == [
+        {"label": "CS101", "data": [1.0, None]},
+        {"label": "CS102", "data": [0.8, 0.8]},
+    ]
 
     # bar
     assert charts["submission_labels"] == ["CS101", "CS102"]
@@ -338,9 +361,13 @@ def test_build_charts_for_course_leader_with_programme_and_module(monkeypatch):
     assert charts["submission_unsubmitted"] == [5, 5]
 
     # scatter
-    assert charts["scatter_points"] == [
-        {"studentId": "S1", "attendanceRate": 0.9, "grade": 70}
-    ]
+    assert charts["scatter"] == {
+        "mode": "points",
+        "total": 1,
+        "x": [90.0],
+        "y": [70.0],
+        "label": ["S1"],
+    }
 
 
 def test_build_risks_for_wellbeing_without_ai(monkeypatch):
@@ -1,6 +1,8 @@
 # test_database.py
 import sqlite3
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Any, Dict
 
@@ -11,12 +13,16 @@ SRC_DIR = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(SRC_DIR))
 
 from student_wellbeing_monitor.database import (  # noqa: E402
+    cohort,
     create,
     db_core,
     delete,
     read,
     schema,
+    search,
+    teaching_weeks,
     update,
+    writer,
 )
 
 
@@ -230,6 +236,16 @@ def test_programmes_and_modules(sample_data):
     # Expected number of fields = documented count
     assert len(engagement[0]) == 11
 
+    # same rows in the columnar layout
+    cols = read.programme_wellbeing_engagement(
+        programme_id="P1", week_start=1, week_end=3, as_columns=True, chunk_size=2
+    )
+    assert len(cols) == len(engagement)
+    assert cols.names == tuple(name for name, _kind in read.ENGAGEMENT_COLUMNS)
+    assert [
+        tuple(cols.value_at(name, i) for name in cols.names) for i in range(len(cols))
+    ] == engagement
+
 
 # =========================================================
 #                        Wellbeing
@@ -273,13 +289,6 @@ def test_wellbeing_crud_and_analytics(sample_data):
     assert list(at_risk.keys()) == ["S1"]
     assert at_risk["S1"] == [1, 2, 3]
 
-    # Continuous high stress (>=3 weeks): S1 should have 3
-    cont = read.get_continuous_high_stress_students()
-    assert cont
-    s1_entry = next(e for e in cont if e["student_id"] == "S1")
-    assert s1_entry["weeks"] >= 3
-    assert "Week 1" in s1_entry["weeks_list"]
-
     # stress_vs_attendance / attendance_trend:
     sva = read.stress_vs_attendance()
     assert sva
@@ -324,6 +333,19 @@ def test_attendance_crud(sample_data):
     )
     # S1/S2 in P1, M1, weeks 1–2 → 4 rows
     assert len(filtered) == 4
+    present, total = read.attendance_totals_filtered(
+        programme_id="P1", module_id="M1", week_start=1, week_end=2
+    )
+    assert (present, total) == (sum(r["status"] == 1 for r in filtered), 4)
+
+    # Weekly counts per module, grouped in SQL
+    weekly = read.attendance_weekly_by_module(module_ids=["M1", "M2"], week_end=2)
+    assert [tuple(r) for r in weekly] == [
+        ("M1", 1, 1, 2),
+        ("M1", 2, 2, 2),
+        ("M2", 1, 1, 1),
+        ("M2", 2, 0, 1),
+    ]
 
     # Query by id
     row = read.get_attendance_by_id(a_ids["S1_w1"])
@@ -375,6 +397,11 @@ def test_submission_crud_and_queries(sample_data):
     filtered = read.get_submissions_filtered(programme_id="P1", module_id="M1")
     # In P1, module M1 submissions from S1 & S2
     assert {r["student_id"] for r in filtered} == {"S1", "S2"}
+    submitted, total, avg_grade = read.submission_totals_filtered(
+        programme_id="P1", module_id="M1"
+    )
+    assert (submitted, total) == (2, 3)
+    assert pytest.approx(avg_grade) == 77.5
 
     # submissions_for_course: M1, assignment 1 → S1 and S2
     subs_course = read.submissions_for_course("M1", assignment_no=1)
@@ -384,6 +411,10 @@ def test_submission_crud_and_queries(sample_data):
     # unsubmissions_for_repeated_issues: before updating, S1 has an unsubmitted record
     unsub = read.unsubmissions_for_repeated_issues(module_id="M1")
     assert any(r[3] == "S1" and r[6] == 0 for r in unsub)
+    # HAVING variant: S1 (M1) and S3 (M2) each miss work in one module
+    offenders = read.unsubmissions_for_repeated_issues(min_offending_modules=1)
+    assert [(r[0], r[2], r[3]) for r in offenders] == [("M1", 2, "S1"), ("M2", 1, "S3")]
+    assert read.unsubmissions_for_repeated_issues(min_offending_modules=2) == []
 
     # ---- Update test: make S1 assignment 2 submitted with grade ----
     update.update_submission(
@@ -400,8 +431,16 @@ def test_submission_crud_and_queries(sample_data):
     # attendance_and_grades: P1 + M1
     ag = read.attendance_and_grades(module_id="M1", programme_id="P1")
     assert ag
-    # Returned fields: module_id, module_name, student_id, student_name, week, status, grade
-    assert len(ag[0]) == 7
+    # One row per student:
+    # module_name, student_id, student_name, present, total, avg_grade
+    assert len(ag[0]) == 6
+    assert len({r[1] for r in ag}) == len(ag)
+    by_student = {r[1]: r for r in ag}
+    # S1: 2 of 3 weeks present, grades 85 and 65 (two assignments must not
+    # double the attendance weeks)
+    assert by_student["S1"][3:5] == (2, 3)
+    assert pytest.approx(by_student["S1"][5]) == 75.0
+    assert by_student["S1"][0] == "Intro to CS"
 
     # Delete all submissions
     delete.delete_all_submissions()
@@ -438,6 +477,28 @@ def test_delete_helpers(sample_data):
     conn.close()
 
 
+def test_purge_student_data_in_chunks(sample_data):
+    result = delete.purge_student_data(chunk_size=1)
+
+    assert result["deleted"]["student"] == 3
+    assert result["deleted"]["wellbeing"] == 6
+    assert result["deleted"]["attendance"] == 9
+    assert result["deleted"]["submission"] == 4
+    assert result["deleted"]["student_module"] == 3
+    assert result["freed_pages"] >= 0
+
+    assert read.count_students() == 0
+    assert read.count_wellbeing() == 0
+    assert read.count_attendance() == 0
+    assert read.count_submission() == 0
+
+    # new databases are created in incremental auto-vacuum mode
+    conn = db_core.get_conn()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    conn.close()
+
+
 # =========================================================
 #                           Users
 # =========================================================
@@ -451,3 +512,374 @@ def test_user_and_auth(sample_data):
     # Create another user
     create.create_user("leader", "pass456", "cd")
     assert read.get_user_role("leader") == "cd"
+
+
+# =========================================================
+#                  Cohort (academic year) databases
+# =========================================================
+def test_cohort_routing_and_comparison(sample_data, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_core, "COHORT_REGISTRY", tmp_path / "cohorts.db")
+    assert db_core.get_cohorts() == {}
+
+    # adopt the pre-cohort database as last year, start a new live year
+    cohort.create_cohort("2024-25", source=str(db_core.DB_PATH))
+    cohort.create_cohort("2025-26", activate=True)
+    assert db_core.get_active_cohort() == "2025-26"
+    assert db_core.DB_PATH == tmp_path / "student_2025-26.db"
+
+    # everyday writes go to the active year only
+    create.insert_programme("P9", "New Programme", "NP")
+    create.insert_student("S9", "Dan", "P9")
+    create.insert_wellbeing("S9", 1, 5, 4.0)
+    assert read.count_wellbeing() == 1
+
+    cohort.close_cohort("2024-25")
+    old = db_core.get_conn(cohort="2024-25")
+    try:
+        assert old.execute("SELECT COUNT(*) FROM wellbeing").fetchone()[0] == 6
+        with pytest.raises(sqlite3.OperationalError):
+            old.execute("DELETE FROM wellbeing")
+    finally:
+        old.close()
+    with pytest.raises(ValueError):
+        cohort.close_cohort("2025-26")  # still active
+
+    rows = read.cohort_weekly_comparison(["2024-25", "2025-26"])
+    assert [(r[0], r[1]) for r in rows] == [
+        ("2024-25", 1),
+        ("2024-25", 2),
+        ("2024-25", 3),
+        ("2025-26", 1),
+    ]
+    assert rows[-1][2:5] == (5.0, 4.0, 1)
+    assert rows[-1][5] is None  # no attendance yet this year
+
+    cohort.reopen_cohort("2024-25")  # restore write permission for tmp cleanup
+
+
+# =========================================================
+#                  Analytics snapshot (read replica)
+# =========================================================
+def test_analytics_snapshot_reads_and_staleness(sample_data, monkeypatch):
+    from student_wellbeing_monitor.services import analytics_snapshot
+
+    monkeypatch.setattr(db_core, "ANALYTICS_SNAPSHOT", True)
+    monkeypatch.setattr(db_core, "ANALYTICS_MAX_STALENESS", 60.0)
+    live = read.weekly_wellbeing_summary(1, 3)
+
+    # no replica yet → analytic reads go live
+    assert db_core.snapshot_time() is None
+    assert analytics_snapshot.snapshot_status()["source"] == "live"
+
+    analytics_snapshot.refresh_snapshot(pages=1, sleep=0)
+    assert db_core.analytics_db_path().exists()
+    assert analytics_snapshot.snapshot_status()["source"] == "snapshot"
+    assert read.weekly_wellbeing_summary(1, 3) == live
+
+    # a write shows up in the replica only after the next refresh
+    create.insert_wellbeing("S1", 4, 5, 3.0)
+    assert [r[0] for r in read.weekly_wellbeing_summary(1, 4)] == [1, 2, 3]
+    conn = db_core.get_analytics_conn()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM wellbeing")  # replica is read-only
+    finally:
+        conn.close()
+
+    # beyond the staleness bound readers fall back to the live database
+    monkeypatch.setattr(db_core, "ANALYTICS_MAX_STALENESS", -1.0)
+    assert [r[0] for r in read.weekly_wellbeing_summary(1, 4)] == [1, 2, 3, 4]
+
+    monkeypatch.setattr(db_core, "ANALYTICS_MAX_STALENESS", 60.0)
+    analytics_snapshot.refresh_snapshot()
+    assert [r[0] for r in read.weekly_wellbeing_summary(1, 4)] == [1, 2, 3, 4]
+
+
+# =========================================================
+#                  Single writer (group commit)
+# =========================================================
+def test_writer_group_commit_and_isolation(sample_data, monkeypatch):
+    batches = []
+    commit_batch = writer.db_writer._commit_batch
+
+    def recording_commit(jobs):
+        batches.append(len(jobs))
+        commit_batch(jobs)
+
+    monkeypatch.setattr(writer.db_writer, "_commit_batch", recording_commit)
+
+    # hold the writer on one operation so the next ones queue up behind it
+    started, gate = threading.Event(), threading.Event()
+    blocker = writer.db_writer.submit(lambda cur: started.set() or gate.wait(5))
+    assert started.wait(5)
+    futures = [create.insert_wellbeing.submit("S1", 10 + i, 2, 8.0) for i in range(5)]
+    duplicate = create.insert_programme.submit("P1", "Again", "CS")  # PK clash
+    gate.set()
+
+    ids = [f.result(timeout=5) for f in futures]
+    assert len(set(ids)) == 5
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    assert blocker.result(timeout=5) is True
+
+    # the queued inserts shared one transaction; the failed one did not undo them
+    assert batches[:2] == [1, 6]
+    assert read.count_wellbeing() == 6 + 5
+    assert {r[0]: r[2] for r in read.get_programmes()}["P1"] == "Computer Science"
+
+    # helpers called from threads all go through the one writer connection
+    threads = [
+        threading.Thread(target=create.insert_wellbeing, args=("S2", 20 + i, 3, 7.0))
+        for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert read.count_wellbeing() == 6 + 5 + 8
+
+
+def test_writer_survives_a_broken_batch(sample_data):
+    # an op that releases the savepoint itself makes RELEASE / ROLLBACK TO
+    # fail in the writer: every Future of the batch must still be resolved
+    started, gate = threading.Event(), threading.Event()
+    blocker = writer.db_writer.submit(lambda cur: started.set() or gate.wait(5))
+    assert started.wait(5)
+    before = create.insert_wellbeing.submit("S1", 30, 2, 8.0)
+    broken = writer.db_writer.submit(lambda cur: cur.execute("RELEASE write_op"))
+    gate.set()
+
+    with pytest.raises(sqlite3.OperationalError):
+        broken.result(timeout=5)
+    with pytest.raises(sqlite3.OperationalError):
+        before.result(timeout=5)  # same transaction, rolled back with it
+    assert blocker.result(timeout=5) is True
+
+    # nothing of the batch was committed, and the writer keeps going
+    assert read.count_wellbeing() == 6
+    create.insert_wellbeing("S1", 31, 2, 8.0)
+    assert read.count_wellbeing() == 7
+
+
+# =========================================================
+#                  Bulk upsert imports
+# =========================================================
+def test_upsert_imports_are_idempotent_and_atomic(sample_data):
+    week_file = [
+        ("S1", 3, 4, 5.5, None),  # identical (comment kept)
+        ("S2", 2, 2, 8.0, None),  # corrected
+        ("S3", 2, 5, 4.0, "new"),  # new row
+    ]
+    assert create.upsert_wellbeing(week_file) == {
+        "inserted": 1,
+        "updated": 1,
+        "unchanged": 1,
+    }
+    rows = {(r[0], r[1]): r for r in read.get_wellbeing_records(1, 3)}
+    assert rows[("S2", 2)][2:4] == (2, 8.0)
+    assert read.count_wellbeing() == 7
+
+    # re-uploading the same file changes nothing, not even the version stamp
+    version = db_core.get_data_versions()["wellbeing"]
+    assert create.upsert_wellbeing(week_file)["unchanged"] == 3
+    assert db_core.get_data_versions()["wellbeing"] == version
+
+    # insert_new keeps existing rows as they are
+    report = create.upsert_attendance(
+        [("S1", "M1", 3, 1, 1), ("S1", "M1", 4, 1, 1)], mode="insert_new"
+    )
+    assert report == {"inserted": 1, "updated": 0, "unchanged": 1}
+    assert read.attendance_totals_filtered("P1", "M1", 3, 4) == (2, 3)
+
+    report = create.upsert_submissions(
+        [("S1", "M1", 2, 1, 60.0, "2024-02-10", "2024-02-12")]
+    )
+    assert report == {"inserted": 0, "updated": 1, "unchanged": 0}
+
+    # one bad row rolls back the whole file
+    with pytest.raises(sqlite3.IntegrityError):
+        create.upsert_wellbeing([("S3", 3, 1, 9.0, None), ("S3", 4, 9, 9.0, None)])
+    assert read.count_wellbeing() == 7
+    with pytest.raises(ValueError):
+        create.upsert_attendance([], mode="replace")
+
+
+def test_full_text_search_kept_in_sync(sample_data):
+    # names / emails: every word is a required prefix term
+    found = search.search_students("ali exam")
+    assert found["total"] == 1
+    row = found["rows"][0]
+    assert row["student_id"] == "S1"
+    assert search.MARK_START + "alice" in row["snippet"]
+    assert search.search_students('("*')["total"] == 0  # no MATCH syntax errors
+
+    # comments: ranked, paginated, optionally per student
+    tired = search.search_wellbeing("tired")
+    assert tired["total"] == 2
+    assert {r["student_id"] for r in tired["rows"]} == {"S1"}
+    page_two = search.search_wellbeing("tired", limit=1, offset=1)
+    assert len(page_two["rows"]) == 1
+    assert (
+        page_two["rows"][0]["id"]
+        != search.search_wellbeing("tired", limit=1)["rows"][0]["id"]
+    )
+    assert search.search_wellbeing("ok", student_id="S3")["total"] == 0
+
+    # triggers: inserts, upserted comments and purges reach the index
+    create.insert_student("S4", "Dora Tired", "P2", email="dora@example.com")
+    assert search.search_students("dora")["rows"][0]["student_id"] == "S4"
+    create.upsert_wellbeing([("S2", 1, 3, 7.0, "exhausted before exams")])
+    assert search.search_wellbeing("exhaust")["rows"][0]["student_id"] == "S2"
+    assert search.search_wellbeing("ok")["total"] == 0
+    delete.purge_student_data(chunk_size=2, reclaim=False)
+    assert search.search_students("alice")["total"] == 0
+    assert search.search_wellbeing("tired")["total"] == 0
+
+    # a database created before the index existed falls back to LIKE scans
+    conn = db_core.get_conn()
+    for table in ("student", "wellbeing"):
+        for event in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER {table}_fts_{event}")
+        conn.execute(f"DROP TABLE {table}_fts")
+    conn.execute("DROP TABLE student_fts_map")
+    conn.commit()
+    conn.close()
+    create.insert_student("S5", "Eve", "P1", email="eve@example.com")
+    assert search.search_students("eve")["rows"][0]["student_id"] == "S5"
+
+    # ... until init_db_schema builds (and fills) the index
+    schema.init_db_schema()
+    eve = search.search_students("eve")["rows"][0]
+    assert search.MARK_START + "Eve" in eve["snippet"]
+
+
+def test_student_fts_triggers_delete_by_rowid():
+    # deleting a student must not scan student_fts: a purge stays linear
+    students = [
+        (f"S{i:05d}", f"Student {i}", f"s{i}@example.com", "P1") for i in range(6000)
+    ]
+    create.insert_programme("P1", "Computer Science", "CS")
+    conn = db_core.get_conn()
+    conn.executemany(
+        "INSERT INTO student (student_id, name, email, programme_id) VALUES (?, ?, ?, ?)",
+        students,
+    )
+    conn.execute(
+        "UPDATE student SET name = 'Zelda Renamed' WHERE student_id = 'S00007'"
+    )
+    conn.commit()
+    conn.close()
+    assert [r["student_id"] for r in search.search_students("zelda")["rows"]] == [
+        "S00007"
+    ]
+    old_name = search.search_students("student 7", limit=200)["rows"]
+    assert "S00007" not in {r["student_id"] for r in old_name}
+
+    started = time.perf_counter()
+    delete.purge_student_data(chunk_size=500, reclaim=False)
+    assert time.perf_counter() - started < 2.0  # a full scan per row takes ~5 s
+
+    conn = db_core.get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM student_fts").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM student_fts_map").fetchone()[0] == 0
+    conn.close()
+
+
+def test_submission_days_and_teaching_weeks(sample_data, monkeypatch):
+    conn = db_core.get_conn()
+    days = dict(
+        conn.execute(
+            "SELECT due_date, due_day FROM submission WHERE assignment_no = 1"
+        ).fetchall()
+    )
+    conn.close()
+    assert days["2024-01-10"] == teaching_weeks.day_number("2024-01-10") == 19732
+
+    # unsubmitted: S1 / M1 due 2024-02-10, S3 / M2 due 2024-01-15
+    def missing(**weeks):
+        rows = read.unsubmissions_for_repeated_issues(**weeks)
+        return {(r[3], r[0]) for r in rows if r[6] == 0}
+
+    # without a configured term start, weeks do not filter submissions
+    monkeypatch.setattr(teaching_weeks, "TERM_START", None)
+    assert teaching_weeks.term_start_day() is None
+    assert teaching_weeks.week_day_range(2, 2) == (None, None)
+    assert missing(week_start=1, week_end=1) == {("S1", "M1"), ("S3", "M2")}
+
+    # week 1 starts on 2024-01-08: S1 / M1 is due in week 5, S3 / M2 in week 2
+    monkeypatch.setattr(teaching_weeks, "TERM_START", "2024-01-08")
+    assert teaching_weeks.week_day_range(2, 2) == (19737, 19743)
+
+    assert missing(week_start=1, week_end=4) == {("S3", "M2")}
+    assert missing(week_start=5) == {("S1", "M1")}
+    assert missing(week_end=1) == set()
+    offenders = read.unsubmissions_for_repeated_issues(
+        week_start=2, week_end=2, min_offending_modules=1
+    )
+    assert [(r[3], r[0]) for r in offenders] == [("S3", "M2")]
+    # the course leader totals follow the same weeks
+    assert read.submission_totals_filtered(week_start=2, week_end=2)[:2] == (0, 1)
+
+    # the triggers follow updates; an explicit term start shifts the weeks
+    update.update_submission(
+        sample_data["submission_ids"]["S3_a1"], 0, None, "2024-02-05", None
+    )
+    assert missing(week_start=5, week_end=5) == {("S1", "M1"), ("S3", "M2")}
+    monkeypatch.setattr(teaching_weeks, "TERM_START", "2024-01-31")
+    assert missing(week_start=1, week_end=1) == {("S3", "M2")}
+
+    # an older table gains the columns by migration, backfilled
+    conn = db_core.get_conn()
+    conn.execute("DROP INDEX idx_submission_due_day")
+    conn.execute("ALTER TABLE submission DROP COLUMN due_day")
+    conn.execute("ALTER TABLE submission DROP COLUMN submit_day")
+    conn.commit()
+    assert not teaching_weeks.has_day_columns(conn)
+    assert missing(week_start=1, week_end=1) == {("S3", "M2")}  # julianday()
+    conn.close()
+    schema.init_db_schema()
+    conn = db_core.get_conn()
+    assert (
+        conn.execute(
+            "SELECT COUNT(*) FROM submission WHERE due_day IS NULL"
+        ).fetchone()[0]
+        == 0
+    )
+    assert (
+        conn.execute(
+            "SELECT submit_day FROM submission WHERE submit_date = '2024-01-09'"
+        ).fetchone()[0]
+        == 19731
+    )
+    conn.close()
+
+
+def test_iter_reads_stream_in_batches_and_close(sample_data):
+    # same rows as the list forms, whatever the batch size
+    assert list(read.iter_wellbeing_records(1, 3, batch_size=2)) == (
+        read.get_wellbeing_records(1, 3)
+    )
+    assert list(read.iter_attendance_for_course("P1", batch_size=1)) == (
+        read.attendance_for_course("P1")
+    )
+    assert len(list(read.iter_attendance_records(batch_size=4))) == 9
+    assert [r["student_id"] for r in read.iter_submission_records("S1")] == [
+        "S1",
+        "S1",
+    ]
+
+    # the connection opens on the first row and closes with the generator
+    opened = []
+
+    def connect(row_factory):
+        opened.append(db_core.get_conn(row_factory))
+        return opened[-1]
+
+    rows = read._iter_query(
+        "SELECT id FROM wellbeing ORDER BY id", [], 2, connect=connect
+    )
+    assert opened == []
+    next(rows)
+    rows.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
@@ -2,16 +2,31 @@
 import io
 import sys
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, List
 
 import pytest
 
+from student_wellbeing_monitor.database import (
+    create,
+    db_core,
+    risk_state,
+    schema,
+    student_features,
+    update,
+)
+from student_wellbeing_monitor.database.columns import ColumnarRows
+from student_wellbeing_monitor.database.read import ENGAGEMENT_COLUMNS
 from student_wellbeing_monitor.services import (
     archive_service,
     attendance_service,
+    chart_reduction,
     course_service,
+    dimension_cache,
+    export_service,
+    snapshot_service,
     upload_service,
     wellbeing_service,
+    wellbeing_store,
 )
 
 # ------------------------------------------------------------------------
@@ -35,6 +50,56 @@ class DummyFileStorage:
         self.stream = io.BytesIO(data)
 
 
+# =============================================================================
+# Utility: a small real database for end-to-end service tests
+# =============================================================================
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    """
+    Point every get_conn() at a temporary SQLite file and seed:
+      - programmes P1 / P2, students S1, S2 (P1) and S3 (P2)
+      - modules M1 (P1) / M2 (P2), three weeks of wellbeing and attendance
+      - S1 has stress >= 5 and sleep < 6 in weeks 1–3 (high risk)
+    """
+    monkeypatch.setattr(db_core, "DB_PATH", tmp_path / "student.db")
+    schema.init_db_schema()
+
+    create.insert_programme("P1", "Computer Science", "CS")
+    create.insert_programme("P2", "Data Science", "DS")
+    create.insert_student("S1", "Alice", "P1", email="alice@example.com")
+    create.insert_student("S2", "Bob", "P1", email="bob@example.com")
+    create.insert_student("S3", "Carol", "P2", email="carol@example.com")
+    create.insert_module("M1", "Intro to CS", "CS101", "P1")
+    create.insert_module("M2", "Data Analysis", "DS201", "P2")
+    for sid, mid in (("S1", "M1"), ("S2", "M1"), ("S3", "M2")):
+        create.insert_student_module(sid, mid)
+
+    wellbeing_rows = {
+        "S1": [(5, 5.0), (5, 4.5), (5, 5.5)],
+        "S2": [(3, 7.0), (5, 5.0), (2, 8.0)],
+        "S3": [(2, 7.5), (3, 7.0), (2, 8.0)],
+    }
+    for sid, weeks in wellbeing_rows.items():
+        for week, (stress, sleep) in enumerate(weeks, start=1):
+            create.insert_wellbeing(sid, week, stress, sleep, "comment")
+
+    attendance_rows = {
+        ("S1", "M1"): [1, 1, 0],
+        ("S2", "M1"): [0, 1, 1],
+        ("S3", "M2"): [1, 0, 0],
+    }
+    for (sid, mid), statuses in attendance_rows.items():
+        for week, status in enumerate(statuses, start=1):
+            create.insert_attendance(sid, mid, week, status)
+
+    create.insert_submission("S1", "M1", "2024-01-10", "2024-01-09", 85.0, 1, 1)
+    create.insert_submission("S1", "M1", "2024-02-10", None, None, 0, 2)
+    create.insert_submission("S2", "M1", "2024-01-10", "2024-01-11", 70.0, 1, 1)
+    create.insert_submission("S3", "M2", "2024-01-15", None, None, 0, 1)
+
+    return tmp_path / "student.db"
+
+
 # =============================================================================
 # upload_service tests
 # =============================================================================
@@ -53,38 +118,31 @@ def test_read_csv_basic():
     assert row["hours_slept"] == "4"
 
 
-def test_import_wellbeing_csv(monkeypatch):
-    csv_bytes = b"student_id,week,stress_level,hours_slept\n" b"1,1,3,7\n" b"2,1,4,6\n"
-    fs = DummyFileStorage(csv_bytes)
+def _fake_upsert(calls: List[Any]):
+    def fake(rows, mode="upsert"):
+        calls.append((list(rows), mode))
+        return {"inserted": len(rows), "updated": 0, "unchanged": 0}
 
-    calls: List[Dict[str, Any]] = []
+    return fake
 
-    def fake_insert_wellbeing(
-        student_id, week, stress_level, hours_slept, comment=None
-    ):
-        calls.append(
-            {
-                "student_id": student_id,
-                "week": week,
-                "stress_level": stress_level,
-                "hours_slept": hours_slept,
-                "comment": comment,
-            }
-        )
 
-    monkeypatch.setattr(
-        upload_service.create,
-        "insert_wellbeing",
-        fake_insert_wellbeing,
+def test_import_wellbeing_csv(monkeypatch):
+    csv_bytes = (
+        b"student_id,week,stress_level,hours_slept\n" b"1,1,3,7\n" b"2,1,4,6.5\n"
     )
+    fs = DummyFileStorage(csv_bytes)
 
-    upload_service.import_wellbeing_csv(fs)
+    calls: List[Any] = []
+    monkeypatch.setattr(upload_service.create, "upsert_wellbeing", _fake_upsert(calls))
 
-    assert len(calls) == 2
-    assert calls[0]["student_id"] == 1
-    assert calls[0]["week"] == 1
-    assert calls[0]["stress_level"] == 3
-    assert calls[0]["hours_slept"] == 7
+    report = upload_service.import_wellbeing_csv(fs)
+
+    # the whole file goes to the database in one call
+    assert len(calls) == 1
+    rows, mode = calls[0]
+    assert mode == "upsert"
+    assert rows == [(1, 1, 3, 7.0, None), (2, 1, 4, 6.5, None)]
+    assert report == {"inserted": 2, "updated": 0, "unchanged": 0}
 
 
 def test_import_attendance_csv(monkeypatch):
@@ -95,28 +153,15 @@ def test_import_attendance_csv(monkeypatch):
     )
     fs = DummyFileStorage(csv_bytes)
 
-    calls: List[Dict[str, Any]] = []
-
-    def fake_insert_attendance(student_id, module_id, week, status):
-        calls.append(
-            {
-                "student_id": student_id,
-                "module_id": module_id,
-                "week": week,
-                "status": status,
-            }
-        )
-
-    monkeypatch.setattr(
-        upload_service.create, "insert_attendance", fake_insert_attendance
-    )
+    calls: List[Any] = []
+    monkeypatch.setattr(upload_service.create, "upsert_attendance", _fake_upsert(calls))
 
-    upload_service.import_attendance_csv(fs)
+    upload_service.import_attendance_csv(fs, mode="insert_new")
 
-    assert len(calls) == 2
-    assert calls[0]["module_id"] == "CS101"
-    assert calls[0]["status"] == 1
-    assert calls[1]["status"] == 0
+    rows, mode = calls[0]
+    assert mode == "insert_new"
+    # (student_id, module_id, week, session_number, status)
+    assert rows == [(1, "CS101", 1, 1, 1), (2, "CS101", 1, 1, 0)]
 
 
 def test_import_submissions_csv(monkeypatch):
@@ -127,47 +172,30 @@ def test_import_submissions_csv(monkeypatch):
     )
     fs = DummyFileStorage(csv_bytes)
 
-    calls: List[Dict[str, Any]] = []
-
-    def fake_insert_submission(
-        student_id, module_id, submitted, grade, due_date, submit_date
-    ):
-        calls.append(
-            {
-                "student_id": student_id,
-                "module_id": module_id,
-                "submitted": submitted,
-                "grade": grade,
-                "due_date": due_date,
-                "submit_date": submit_date,
-            }
-        )
-
+    calls: List[Any] = []
     monkeypatch.setattr(
-        upload_service.create, "insert_submission", fake_insert_submission
+        upload_service.create, "upsert_submissions", _fake_upsert(calls)
     )
 
     upload_service.import_submissions_csv(fs)
 
-    assert len(calls) == 2
-    assert calls[0]["submitted"] == 1
-    assert calls[0]["grade"] == "70"
-    # Empty string should be converted to None
-    assert calls[1]["submitted"] == 0
-    assert calls[1]["grade"] is None
+    rows, _mode = calls[0]
+    assert rows[0] == (1, "CS101", 1, 1, "70", "2024-01-01", "2023-12-31")
+    # Empty strings should be converted to None
+    assert rows[1] == (2, "CS101", 1, 0, None, "2024-01-01", None)
 
 
 def test_import_csv_by_type_and_invalid(monkeypatch):
     # Only need to verify correct routing to corresponding functions / raising exceptions
     called = {"wellbeing": False, "attendance": False, "submissions": False}
 
-    def fake_wellbeing(fs):
+    def fake_wellbeing(fs, mode):
         called["wellbeing"] = True
 
-    def fake_attendance(fs):
+    def fake_attendance(fs, mode):
         called["attendance"] = True
 
-    def fake_submissions(fs):
+    def fake_submissions(fs, mode):
         called["submissions"] = True
 
     monkeypatch.setattr(upload_service, "import_wellbeing_csv", fake_wellbeing)
@@ -188,6 +216,97 @@ def test_import_csv_by_type_and_invalid(monkeypatch):
         upload_service.import_csv_by_type("unknown_type", dummy_fs)
 
 
+def test_background_import_job(tmp_path, monkeypatch):
+    from werkzeug.datastructures import FileStorage
+
+    from student_wellbeing_monitor.services import import_jobs
+
+    monkeypatch.setattr(db_core, "DB_PATH", tmp_path / "student.db")
+    schema.init_db_schema()
+    create.insert_programme("P1", "Computer Science", "CS")
+    create.insert_student("1", "Alice", "P1")
+    create.insert_student("2", "Bob", "P1")
+    monkeypatch.setattr(import_jobs, "CHUNK_ROWS", 2)
+
+    header = b"student_id,week,stress_level,hours_slept\n"
+    good = b"1,1,3,7\n2,2,4,6.5\n1,2,5,4\n"
+    files = {
+        "unparsable": header + b"1,1,3,7\n2,1,oops,6\n2,2,4,6.5\n",  # line 3
+        "refused": header + good + b"9,1,2,8\n",  # line 5: unknown student (FK)
+        "good": header + good,
+    }
+    jobs = import_jobs.ImportJobs(spool_dir=tmp_path / "spool", workers=1)
+    status = {}
+    try:
+        for name, body in files.items():
+            job_id = jobs.submit(
+                "wellbeing", FileStorage(io.BytesIO(body), filename="week.csv")
+            )
+            status[name] = jobs.wait(job_id)
+    finally:
+        jobs.stop()
+
+    # a file with bad rows is rejected as a whole, with the offending lines
+    for name, line in (("unparsable", 3), ("refused", 5)):
+        assert status[name]["state"] == "failed"
+        assert [r["line"] for r in status[name]["rejects"]] == [line]
+        assert status[name]["rejected"] == 1
+        assert status[name]["inserted"] == 0
+    assert status["refused"]["processed"] == 4
+
+    # ... and nothing of it was written before the good file went in
+    good = status["good"]
+    assert good["state"] == "done"
+    assert good["totalRows"] == good["processed"] == 3
+    assert (good["inserted"], good["updated"], good["unchanged"]) == (3, 0, 0)
+    assert good["etaSeconds"] == 0
+    conn = db_core.get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM wellbeing").fetchone()[0] == 3
+    conn.close()
+
+    # finished jobs keep their status but not the uploaded rows; old ones expire
+    job_dirs = sorted((tmp_path / "spool").iterdir())
+    assert len(job_dirs) == 3
+    assert not any((d / "upload.csv").exists() for d in job_dirs)
+    monkeypatch.setattr(import_jobs, "STATUS_TTL", -1)
+    jobs._expire_old_jobs()
+    assert list((tmp_path / "spool").iterdir()) == []
+
+    assert jobs.status("../../etc") is None
+    with pytest.raises(ValueError):
+        jobs.submit("grades", FileStorage(io.BytesIO(b""), filename="x.csv"))
+    with pytest.raises(KeyError):
+        jobs.wait("ab" * 16)
+
+
+def test_import_job_of_a_dead_worker_fails(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    from student_wellbeing_monitor.services import import_jobs
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    jobs = import_jobs.ImportJobs(spool_dir=tmp_path / "spool", workers=1)
+    for job_id, pid in (("ab" * 16, dead.pid), ("cd" * 16, os.getpid())):
+        (tmp_path / "spool" / job_id).mkdir(parents=True)
+        (tmp_path / "spool" / job_id / "upload.csv").write_text("student_id\n")
+        jobs._write_status(
+            job_id,
+            {"jobId": job_id, "state": "queued", "workerPid": pid, "error": None},
+        )
+
+    assert jobs.recover_orphans() == 1
+    orphan = jobs.status("ab" * 16)
+    assert orphan["state"] == "failed"
+    assert "upload the file again" in orphan["error"]
+    assert not (tmp_path / "spool" / ("ab" * 16) / "upload.csv").exists()
+    # a job of a live worker (here: this process) is left alone
+    assert jobs.status("cd" * 16)["state"] == "queued"
+    assert jobs.recover_orphans() == 0
+
+
 # =============================================================================
 # wellbeing_service tests
 # =============================================================================
@@ -236,7 +355,7 @@ def test_wellbeing_dashboard_summary(monkeypatch, wb_students):
         (3, 1, None, 6, "P2"),
     ]
 
-    def fake_get_wellbeing_records(start_week, end_week, programme_id=None):
+    def fake_iter_wellbeing_records(start_week, end_week, programme_id=None):
         return rows
 
     monkeypatch.setattr(wellbeing_service, "get_all_students", fake_get_all_students)
@@ -244,7 +363,7 @@ def test_wellbeing_dashboard_summary(monkeypatch, wb_students):
         wellbeing_service, "get_students_by_programme", fake_get_students_by_programme
     )
     monkeypatch.setattr(
-        wellbeing_service, "get_wellbeing_records", fake_get_wellbeing_records
+        wellbeing_service, "iter_wellbeing_records", fake_iter_wellbeing_records
     )
 
     service = wellbeing_service.WellbeingService()
@@ -268,11 +387,11 @@ def test_wellbeing_stress_sleep_trend(monkeypatch):
         (3, 2, None, 6, "P2"),
     ]
 
-    def fake_get_wellbeing_records(start_week, end_week, programme_id=None):
+    def fake_iter_wellbeing_records(start_week, end_week, programme_id=None):
         return rows
 
     monkeypatch.setattr(
-        wellbeing_service, "get_wellbeing_records", fake_get_wellbeing_records
+        wellbeing_service, "iter_wellbeing_records", fake_iter_wellbeing_records
     )
 
     service = wellbeing_service.WellbeingService()
@@ -312,7 +431,7 @@ def _setup_wellbeing_risk_data(monkeypatch, wb_students):
     def fake_get_students_by_programme(pid):
         return [r for r in wb_students if r[3] == pid]
 
-    def fake_get_wellbeing_records(start_week, end_week, programme_id=None):
+    def fake_iter_wellbeing_records(start_week, end_week, programme_id=None):
         return rows
 
     monkeypatch.setattr(wellbeing_service, "get_all_students", fake_get_all_students)
@@ -320,7 +439,7 @@ def _setup_wellbeing_risk_data(monkeypatch, wb_students):
         wellbeing_service, "get_students_by_programme", fake_get_students_by_programme
     )
     monkeypatch.setattr(
-        wellbeing_service, "get_wellbeing_records", fake_get_wellbeing_records
+        wellbeing_service, "iter_wellbeing_records", fake_iter_wellbeing_records
     )
 
 
@@ -367,25 +486,333 @@ def test_wellbeing_get_risk_students_not_found(monkeypatch, wb_students):
     assert res["status"] == "not_found"
 
 
+def test_wellbeing_store_matches_sql_path(seeded_db):
+    sql_service = wellbeing_service.WellbeingService()
+    store_service = wellbeing_service.WellbeingService(
+        store=wellbeing_store.WellbeingStore()
+    )
+
+    for programme_id in (None, "P1", "P2"):
+        assert store_service.get_dashboard_summary(
+            1, 3, programme_id
+        ) == sql_service.get_dashboard_summary(1, 3, programme_id)
+        assert store_service.get_stress_sleep_trend(
+            2, 3, programme_id
+        ) == sql_service.get_stress_sleep_trend(2, 3, programme_id)
+        assert store_service.get_risk_students(
+            1, 3, programme_id
+        ) == sql_service.get_risk_students(1, 3, programme_id)
+
+    assert store_service.get_risk_students(
+        1, 3, student_id="S3"
+    ) == sql_service.get_risk_students(1, 3, student_id="S3")
+
+    items = store_service.get_risk_students(1, 3)["items"]
+    assert [(i["studentId"], i["riskType"]) for i in items] == [
+        ("S1", "high_risk"),
+        ("S2", "potential_risk"),
+    ]
+
+
+def test_wellbeing_store_refreshes_on_writes(seeded_db):
+    store = wellbeing_store.WellbeingStore()
+    store.refresh()
+    assert len(store) == 9
+    # 13 bytes per row: int32 + int16 + int8 + float32 + int16
+    assert store.nbytes == 9 * 13
+
+    # insert → appended by id
+    create.insert_wellbeing("S3", 4, 5, 4.0, "late week")
+    assert store.summary(4, 4)["stress_sum"] == 5.0
+    assert len(store) == 10
+
+    # update → full reload picks up the edited value
+    first_id = db_core.get_conn().execute("SELECT MIN(id) FROM wellbeing").fetchone()[0]
+    update.update_wellbeing(first_id, new_stress=1, new_sleep=9.0)
+    assert store.summary(1, 1, "P1")["stress_sum"] == 1.0 + 3.0
+    assert len(store) == 10
+
+
+def test_dimension_cache_invalidated_by_writes(seeded_db, monkeypatch):
+    cache = dimension_cache.DimensionCache()
+    calls = []
+    real_get_all_weeks = dimension_cache.read.get_all_weeks
+
+    def counting_get_all_weeks():
+        calls.append(1)
+        return real_get_all_weeks()
+
+    monkeypatch.setattr(dimension_cache.read, "get_all_weeks", counting_get_all_weeks)
+
+    assert cache.weeks() == (1, 2, 3)
+    assert cache.weeks() == (1, 2, 3)
+    assert len(calls) == 1
+
+    create.insert_wellbeing("S1", 4, 2, 8.0)
+    assert cache.weeks() == (1, 2, 3, 4)
+    assert len(calls) == 2
+
+    assert cache.student_count() == 3
+    assert cache.student_count("P1") == 2
+    assert cache.student_names()["S3"] == "Carol"
+    create.insert_student("S4", "Dave", "P2", email="dave@example.com")
+    assert cache.student_count("P2") == 2
+    assert cache.student_emails()["S4"] == "dave@example.com"
+
+    assert cache.programme_labels()["P1"].startswith(
+        cache.programmes()[0]["programme_code"]
+    )
+    assert [m["module_id"] for m in cache.modules()] == ["M1", "M2"]
+
+
+def test_risk_state_maintained_on_writes(seeded_db):
+    computed = wellbeing_service.WellbeingService()
+    indexed = wellbeing_service.WellbeingService(use_risk_state=True)
+
+    def risky(service, start=1, end=3, **kwargs):
+        items = service.get_risk_students(start, end, **kwargs)["items"]
+        return [(i["studentId"], i["riskType"], i["details"]) for i in items]
+
+    # a fresh schema builds the state as rows are inserted
+    assert risk_state.risk_state_covers(1, 3, 4.5, 6.0)
+    for programme_id in (None, "P1", "P2"):
+        assert indexed.get_risk_students(
+            1, 3, programme_id
+        ) == computed.get_risk_students(1, 3, programme_id)
+    assert [r[:2] for r in risky(indexed)] == [
+        ("S1", "high_risk"),
+        ("S2", "potential_risk"),
+    ]
+
+    # insert: S3 gets a risky week 4 → potential risk, the range widens
+    create.insert_wellbeing("S3", 4, 5, 4.0, "late week")
+    assert not risk_state.risk_state_covers(1, 3, 4.5, 6.0)
+    assert risky(indexed, end=4) == risky(computed, end=4)
+    assert ("S3", "potential_risk") in [r[:2] for r in risky(indexed, end=4)]
+
+    # update: S1's week 2 recovers, breaking the 3-week streak
+    conn = db_core.get_conn()
+    rid = conn.execute(
+        "SELECT id FROM wellbeing WHERE student_id = 'S1' AND week = 2"
+    ).fetchone()[0]
+    conn.close()
+    update.update_wellbeing(rid, new_stress=2, new_sleep=8.0)
+    assert risky(indexed, end=4) == risky(computed, end=4)
+    assert ("S1", "potential_risk") in [r[:2] for r in risky(indexed, end=4)]
+
+    # other thresholds are computed until the state is rebuilt with them
+    assert risky(indexed, end=4, threshold=3) == risky(computed, end=4, threshold=3)
+    assert risk_state.rebuild_risk_state(threshold=3) == 3
+    assert risk_state.risk_state_covers(1, 4, 3, 6.0)
+    assert risky(indexed, end=4, threshold=3) == risky(computed, end=4, threshold=3)
+
+
+def test_student_features_maintained_on_writes(seeded_db):
+    computed = course_service.CourseService()
+    featured = course_service.CourseService(use_features=True)
+
+    def scatter(service, **kwargs):
+        return service.get_attendance_vs_grades(programme_id="P1", **kwargs)
+
+    def comparison(service, **kwargs):
+        return service.get_high_stress_sleep_engagement_analysis("P1", **kwargs)
+
+    # a fresh schema builds the features as rows are inserted
+    assert scatter(featured) == scatter(computed)
+    assert scatter(featured, week_start=2, week_end=3) == scatter(
+        computed, week_start=2, week_end=3
+    )
+    assert comparison(featured, stress_threshold=5) == comparison(
+        computed, stress_threshold=5
+    )
+    features = student_features.get_student_features("P1", 1, 3, 4.0, 6.0)
+    assert features.values("student_id") == ["S1", "S2"]
+    assert features["high_weeks"].tolist() == [3, 1]
+    assert features["mean_stress"][0] == pytest.approx(5.0)
+
+    # insert / update: attendance and grades move the vectors
+    create.insert_attendance("S2", "M1", 4, 0)
+    create.insert_submission("S2", "M1", "2024-02-10", "2024-02-09", 90.0, 1, 2)
+    assert scatter(featured, week_start=1, week_end=4) == scatter(
+        computed, week_start=1, week_end=4
+    )
+    conn = db_core.get_conn()
+    rid = conn.execute(
+        "SELECT id FROM attendance WHERE student_id = 'S1' AND week = 3"
+    ).fetchone()[0]
+    conn.close()
+    update.update_attendance(rid, 1)
+    points = {p["studentId"]: p for p in scatter(featured)["points"]}
+    assert points["S1"]["attendanceRate"] == 1.0
+    assert points["S2"]["avgGrade"] == 80.0
+    assert comparison(featured, week_end=3) == comparison(computed, week_end=3)
+    # no check-ins in the range: both paths give the same empty result
+    assert comparison(featured, week_start=9) == comparison(computed, week_start=9)
+    assert scatter(featured, week_start=9) == scatter(computed, week_start=9)
+
+    # a database without the tables falls back to the raw rows
+    conn = db_core.get_conn()
+    conn.execute("DROP TABLE student_features_config")
+    conn.commit()
+    conn.close()
+    assert student_features.get_student_features("P1") is None
+    assert scatter(featured) == scatter(computed)
+
+
+def test_student_features_match_raw_rows_with_several_modules(seeded_db):
+    # a second module in P1, two sessions a week and several assignments
+    create.insert_module("M3", "Databases", "CS102", "P1")
+    for sid in ("S1", "S2"):
+        create.insert_student_module(sid, "M3")
+        for week in (1, 2, 3):
+            create.insert_attendance(sid, "M3", week, week % 2, session_number=1)
+            create.insert_attendance(sid, "M3", week, 1, session_number=2)
+    create.insert_submission("S1", "M3", "2024-01-12", "2024-01-12", 55.0, 1, 1)
+    create.insert_submission("S1", "M3", "2024-02-12", "2024-02-12", 75.0, 1, 2)
+    create.insert_submission("S2", "M3", "2024-01-12", None, None, 0, 1)
+    # attendance of a module the student is not enrolled in is ignored
+    create.insert_attendance("S2", "M2", 2, 1)
+
+    computed = course_service.CourseService()
+    featured = course_service.CourseService(use_features=True)
+    for weeks in ({}, {"week_start": 2}, {"week_start": 1, "week_end": 2}):
+        assert featured.get_attendance_vs_grades(
+            programme_id="P1", **weeks
+        ) == computed.get_attendance_vs_grades(programme_id="P1", **weeks)
+        for min_weeks in (1, 2, 3):
+            assert featured.get_high_stress_sleep_engagement_analysis(
+                "P1", min_weeks=min_weeks, **weeks
+            ) == computed.get_high_stress_sleep_engagement_analysis(
+                "P1", min_weeks=min_weeks, **weeks
+            )
+
+
+def test_stream_export_formats(seeded_db):
+    import csv
+    import gzip
+    import io
+    import json
+
+    body = b"".join(
+        export_service.stream_export("wellbeing", "csv", sort_week="desc")
+    ).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0][:4] == ["id", "student_id", "name", "week"]
+    assert len(rows) == 1 + 9
+    assert [r[3] for r in rows[1:4]] == ["3", "3", "3"]
+
+    packed = b"".join(
+        export_service.stream_export(
+            "attendance", "jsonl", student_id="S2", gzip=True, batch_rows=1
+        )
+    )
+    lines = gzip.decompress(packed).decode("utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["status"] for r in records] == [0, 1, 1]
+    assert {r["student_id"] for r in records} == {"S2"}
+
+    # closing early releases the cursor; unknown inputs are rejected
+    stream = export_service.stream_export("students", "csv", batch_rows=1)
+    assert next(stream).startswith(b"student_id,name")
+    stream.close()
+    with pytest.raises(ValueError):
+        next(export_service.stream_export("users", "csv"))
+    with pytest.raises(ValueError):
+        next(export_service.stream_export("students", "xml"))
+
+
+def test_writes_succeed_while_an_export_is_open(seeded_db, monkeypatch):
+    # a download paced by a slow client must not lock the writer out
+    from student_wellbeing_monitor.database import writer
+
+    monkeypatch.setattr(writer, "BUSY_TIMEOUT_MS", 200)
+    writer.db_writer.stop()  # next write reconnects with the short timeout
+
+    from student_wellbeing_monitor.database.read import iter_export_rows
+
+    # the export's cursor is mid-table: its statement is still open
+    rows = iter_export_rows("students", chunk_size=1)
+    assert next(rows)[0] == "student_id"
+    assert next(rows)[1] == "Alice"
+    create.insert_programme("P9", "Late Programme", "LP")
+    create.insert_student("S9", "Ivy", "P9", email="ivy@example.com")
+    rest = [row[1] for row in rows]
+
+    # the export finishes on the snapshot it started with
+    assert rest == ["Bob", "Carol"]
+    conn = db_core.get_conn()
+    assert (
+        conn.execute("SELECT name FROM student WHERE student_id = 'S9'").fetchone()[0]
+        == "Ivy"
+    )
+    conn.close()
+
+
+def test_reduce_scatter_is_bounded():
+    # 5000 students around 80% / 65, plus two clear outliers
+    points = [
+        {"studentId": str(i), "attendanceRate": 0.8, "avgGrade": 60 + i % 10}
+        for i in range(5000)
+    ]
+    points.append({"studentId": "low", "attendanceRate": 0.05, "avgGrade": 5})
+    points.append({"studentId": "none", "attendanceRate": 0.5, "avgGrade": None})
+
+    sample = chart_reduction.reduce_scatter(
+        points, "attendanceRate", "avgGrade", "name", mode="auto", x_scale=100
+    )
+    assert sample["mode"] == "sample"
+    assert sample["total"] == 5001
+    assert len(sample["x"]) == chart_reduction.MAX_POINTS
+    assert "low" in sample["label"]
+    # fixed seed → identical payload on every call
+    assert sample == chart_reduction.reduce_scatter(
+        points, "attendanceRate", "avgGrade", "name", x_scale=100
+    )
+
+    grid = chart_reduction.reduce_scatter(
+        points, "attendanceRate", "avgGrade", "name", mode="bin", x_scale=100
+    )
+    assert grid["mode"] == "bin"
+    assert sum(grid["count"]) == 5001
+    assert len(grid["x"]) <= chart_reduction.GRID_BINS**2
+
+    with pytest.raises(ValueError):
+        chart_reduction.reduce_scatter(points, "a", "b", "c", mode="pie")
+
+
 # =============================================================================
 # attendance_service tests
 # =============================================================================
+def _fake_module_rows(monkeypatch):
+    monkeypatch.setattr(
+        attendance_service.dimension_cache,
+        "modules",
+        lambda: (
+            {"module_id": "CS101", "module_code": "CS101", "module_name": "Intro CS"},
+            {"module_id": "CS102", "module_code": "CS102", "module_name": "Algo"},
+        ),
+    )
+
+
 def test_attendance_get_trends(monkeypatch):
-    # rows: (module_id, module_name, student_id, student_name, week, status)
+    # rows: (module_id, week, present, total)
     rows = [
-        ("CS101", "Intro CS", 1, "Alice", 1, 1),
-        ("CS101", "Intro CS", 2, "Bob", 1, 0),
-        ("CS101", "Intro CS", 3, "Cara", 2, 1),
+        ("CS101", 1, 1, 2),
+        ("CS101", 2, 1, 1),
     ]
 
-    def fake_attendance_for_course(
-        programme_id=None, module_id=None, week_start=None, week_end=None
+    def fake_attendance_weekly_by_module(
+        programme_id=None, module_ids=None, week_start=None, week_end=None
     ):
+        assert module_ids == ["CS101"]
         return rows
 
     monkeypatch.setattr(
-        attendance_service, "attendance_for_course", fake_attendance_for_course
+        attendance_service,
+        "attendance_weekly_by_module",
+        fake_attendance_weekly_by_module,
     )
+    _fake_module_rows(monkeypatch)
 
     service = attendance_service.AttendanceService()
     res = service.get_attendance_trends("CS101", week_start=1, week_end=3)
@@ -400,11 +827,13 @@ def test_attendance_get_trends(monkeypatch):
 
 
 def test_attendance_get_trends_empty(monkeypatch):
-    def fake_attendance_for_course(**kwargs):
+    def fake_attendance_weekly_by_module(**kwargs):
         return []
 
     monkeypatch.setattr(
-        attendance_service, "attendance_for_course", fake_attendance_for_course
+        attendance_service,
+        "attendance_weekly_by_module",
+        fake_attendance_weekly_by_module,
     )
 
     service = attendance_service.AttendanceService()
@@ -414,6 +843,30 @@ def test_attendance_get_trends_empty(monkeypatch):
     assert res["points"] == []
 
 
+def test_attendance_module_trends(monkeypatch):
+    rows = [
+        ("CS101", 1, 1, 2),
+        ("CS101", 2, 2, 2),
+        ("CS102", 1, 3, 4),
+    ]
+    monkeypatch.setattr(
+        attendance_service, "attendance_weekly_by_module", lambda **kwargs: rows
+    )
+    _fake_module_rows(monkeypatch)
+
+    res = attendance_service.AttendanceService().get_module_attendance_trends("P1")
+
+    assert res["weeks"] == [1, 2]
+    assert [m["courseName"] for m in res["modules"]] == ["Intro CS", "Algo"]
+    assert [p["week"] for p in res["modules"][1]["points"]] == [1]
+    # programme aggregate sums the modules per week: (1 + 3) / (2 + 4)
+    programme = {p["week"]: p for p in res["programme"]["points"]}
+    assert programme[1]["presentCount"] == 4
+    assert programme[1]["totalCount"] == 6
+    assert pytest.approx(programme[1]["attendanceRate"]) == 0.67
+    assert pytest.approx(programme[2]["attendanceRate"]) == 1.0
+
+
 def test_attendance_get_low_attendance_students(monkeypatch):
     # rows: (module_id, module_name, student_id, student_name, email, week, status)
     rows = [
@@ -423,15 +876,15 @@ def test_attendance_get_low_attendance_students(monkeypatch):
         ("CS101", "Intro CS", 2, "Bob", "bob@example.com", 2, 0),
     ]
 
-    def fake_attendance_detail_for_students(
+    def fake_iter_attendance_detail_for_students(
         module_id=None, programme_id=None, week_start=None, week_end=None
     ):
         return rows
 
     monkeypatch.setattr(
         attendance_service,
-        "attendance_detail_for_students",
-        fake_attendance_detail_for_students,
+        "iter_attendance_detail_for_students",
+        fake_iter_attendance_detail_for_students,
     )
 
     service = attendance_service.AttendanceService()
@@ -453,34 +906,19 @@ def test_attendance_get_low_attendance_students(monkeypatch):
 # course_service tests
 # =============================================================================
 def test_course_leader_summary(monkeypatch):
-    # New version of get_course_leader_summary uses status "present"/"absent"
-    def fake_get_attendance_filtered(programme_id, module_id, week_start, week_end):
-        return [
-            {"student_id": 1, "module_id": module_id, "week": 1, "status": 1},
-            {
-                "student_id": 2,
-                "module_id": module_id,
-                "week": 1,
-                "status": 0,
-            },
-        ]
-
-    def fake_get_submissions_filtered(programme_id, module_id):
-        return [
-            {"student_id": 1, "module_id": module_id, "submitted": 1, "grade": 60},
-            {
-                "student_id": 2,
-                "module_id": module_id,
-                "submitted": 0,
-                "grade": None,
-            },
-        ]
+    # aggregates come straight from SQL: (present, total) / (submitted, total, avg)
+    def fake_attendance_totals_filtered(programme_id, module_id, week_start, week_end):
+        return 1, 2
+
+    def fake_submission_totals_filtered(programme_id, module_id, week_start, week_end):
+        assert (week_start, week_end) == (1, 10)
+        return 1, 2, 60.0
 
     monkeypatch.setattr(
-        course_service, "get_attendance_filtered", fake_get_attendance_filtered
+        course_service, "attendance_totals_filtered", fake_attendance_totals_filtered
     )
     monkeypatch.setattr(
-        course_service, "get_submissions_filtered", fake_get_submissions_filtered
+        course_service, "submission_totals_filtered", fake_submission_totals_filtered
     )
 
     service = course_service.CourseService()
@@ -547,9 +985,17 @@ def test_course_repeated_missing_students(monkeypatch):
     ]
 
     def fake_unsubmissions_for_repeated_issues(
-        module_id=None, programme_id=None, week_start=None, week_end=None
+        module_id=None,
+        programme_id=None,
+        week_start=None,
+        week_end=None,
+        min_offending_modules=None,
     ):
-        return rows
+        # the HAVING clause runs in SQL: mimic it here
+        modules = {}
+        for r in rows:
+            modules.setdefault(r[3], set()).add(r[0])
+        return [r for r in rows if len(modules[r[3]]) >= min_offending_modules]
 
     monkeypatch.setattr(
         course_service,
@@ -568,11 +1014,10 @@ def test_course_repeated_missing_students(monkeypatch):
 
 
 def test_course_attendance_vs_grades(monkeypatch):
-    # rows: (module_id, module_name, student_id, student_name, week, status, grade)
+    # rows: (module_name, student_id, student_name, present, total, avg_grade)
     rows = [
-        ("CS101", "Intro CS", "1", "Alice", 1, 1, 70),
-        ("CS101", "Intro CS", "1", "Alice", 2, 1, 80),
-        ("CS101", "Intro CS", "2", "Bob", 1, 0, 60),
+        ("Intro CS", "1", "Alice", 2, 2, 75.0),
+        ("Intro CS", "2", "Bob", 0, 1, 60.0),
     ]
 
     def fake_attendance_and_grades(
@@ -615,9 +1060,10 @@ def test_course_programme_wellbeing_engagement(monkeypatch):
     ]
 
     def fake_programme_wellbeing_engagement(
-        programme_id=None, week_start=None, week_end=None
+        programme_id=None, week_start=None, week_end=None, as_columns=False
     ):
-        return rows
+        assert as_columns
+        return ColumnarRows.from_rows(ENGAGEMENT_COLUMNS, rows)
 
     monkeypatch.setattr(
         course_service,
@@ -653,9 +1099,10 @@ def test_course_high_stress_sleep_engagement_analysis(monkeypatch):
     ]
 
     def fake_programme_wellbeing_engagement(
-        programme_id=None, week_start=None, week_end=None
+        programme_id=None, week_start=None, week_end=None, as_columns=False
     ):
-        return rows
+        assert as_columns
+        return ColumnarRows.from_rows(ENGAGEMENT_COLUMNS, rows)
 
     monkeypatch.setattr(
         course_service,
@@ -758,13 +1205,13 @@ def test_archive_export_wellbeing_summary(tmp_path, monkeypatch):
         (3, 2, None, 6, "P1"),
     ]
 
-    def fake_get_wellbeing_records(
+    def fake_iter_wellbeing_records(
         start_week, end_week, programme_id=None, student_id=None
     ):
         return rows
 
     monkeypatch.setattr(
-        archive_service, "get_wellbeing_records", fake_get_wellbeing_records
+        archive_service, "iter_wellbeing_records", fake_iter_wellbeing_records
     )
 
     out_dir = tmp_path
@@ -787,9 +1234,6 @@ def test_archive_export_wellbeing_summary(tmp_path, monkeypatch):
 
 
 def test_archive_export_attendance_summary(tmp_path, monkeypatch):
-    def fake_count_attendance():
-        return 4
-
     rows = [
         {"module_id": "CS101", "week": 1, "status": 1},
         {"module_id": "CS101", "week": 1, "status": 0},
@@ -797,13 +1241,11 @@ def test_archive_export_attendance_summary(tmp_path, monkeypatch):
         {"module_id": "CS101", "week": 2, "status": 1},
     ]
 
-    def fake_get_attendance_page(limit, offset):
-        assert limit == 4
-        return rows
+    def fake_iter_attendance_records():
+        return iter(rows)
 
-    monkeypatch.setattr(archive_service, "count_attendance", fake_count_attendance)
     monkeypatch.setattr(
-        archive_service, "get_attendance_page", fake_get_attendance_page
+        archive_service, "iter_attendance_records", fake_iter_attendance_records
     )
 
     out_dir = tmp_path
@@ -816,9 +1258,6 @@ def test_archive_export_attendance_summary(tmp_path, monkeypatch):
 
 
 def test_archive_export_submission_summary(tmp_path, monkeypatch):
-    def fake_count_submission():
-        return 3
-
     rows = [
         {
             "module_id": "CS101",
@@ -840,13 +1279,11 @@ def test_archive_export_submission_summary(tmp_path, monkeypatch):
         },
     ]
 
-    def fake_get_submission_page(limit, offset):
-        assert limit == 3
-        return rows
+    def fake_iter_submission_records():
+        return iter(rows)
 
-    monkeypatch.setattr(archive_service, "count_submission", fake_count_submission)
     monkeypatch.setattr(
-        archive_service, "get_submission_page", fake_get_submission_page
+        archive_service, "iter_submission_records", fake_iter_submission_records
     )
 
     out_dir = tmp_path
@@ -858,42 +1295,19 @@ def test_archive_export_submission_summary(tmp_path, monkeypatch):
     assert len(lines) == 2  # header + 1 aggregated row
 
 
-def test_archive_delete_all_data_order(monkeypatch):
-    called = []
+def test_archive_delete_all_data_uses_chunked_purge(monkeypatch):
+    calls = []
 
-    def make_recorder(name):
-        def inner():
-            called.append(name)
+    def fake_purge(chunk_size, reclaim):
+        calls.append((chunk_size, reclaim))
+        return {"deleted": {"wellbeing": 3, "student": 1}, "freed_pages": 7}
 
-        return inner
+    monkeypatch.setattr(archive_service, "purge_student_data", fake_purge)
 
-    monkeypatch.setattr(
-        archive_service, "delete_all_wellbeing", make_recorder("wellbeing")
-    )
-    monkeypatch.setattr(
-        archive_service, "delete_all_attendance", make_recorder("attendance")
-    )
-    monkeypatch.setattr(
-        archive_service, "delete_all_submissions", make_recorder("submissions")
-    )
-    monkeypatch.setattr(
-        archive_service,
-        "delete_all_student_modules",
-        make_recorder("student_modules"),
-    )
-    monkeypatch.setattr(
-        archive_service, "delete_all_students", make_recorder("students")
-    )
+    result = archive_service.delete_all_data(chunk_size=50)
 
-    archive_service.delete_all_data()
-
-    assert called == [
-        "wellbeing",
-        "attendance",
-        "submissions",
-        "student_modules",
-        "students",
-    ]
+    assert calls == [(50, True)]
+    assert result["freed_pages"] == 7
 
 
 def test_archive_run_archive_dry_run(monkeypatch, tmp_path):
@@ -930,7 +1344,7 @@ def test_archive_run_archive_with_delete(monkeypatch, tmp_path):
     def fake_export(*args, **kwargs):
         pass
 
-    def fake_delete_all_data():
+    def fake_delete_all_data(**kwargs):
         called_delete["flag"] = True
 
     monkeypatch.setattr(archive_service, "export_wellbeing_summary", fake_export)
@@ -943,3 +1357,110 @@ def test_archive_run_archive_with_delete(monkeypatch, tmp_path):
 
     archive_service.run_archive(str(tmp_path), delete_confirm=True)
     assert called_delete["flag"]
+
+
+# =============================================================================
+# snapshot_service tests
+# =============================================================================
+def test_export_and_load_snapshot(seeded_db, tmp_path):
+    pytest.importorskip("pyarrow")
+    out_dir = tmp_path / "snapshot"
+
+    manifest = snapshot_service.export_snapshot(str(out_dir), chunk_size=2)
+
+    assert manifest["tables"]["wellbeing"] == {"rows": 9, "weeks": [1, 2, 3]}
+    assert (out_dir / "wellbeing" / "week=2" / "part-0.parquet").exists()
+    assert (out_dir / "manifest.json").exists()
+
+    wellbeing = snapshot_service.load_snapshot(str(out_dir), "wellbeing", weeks=[1])
+    assert len(wellbeing) == 3
+    assert set(wellbeing["week"]) == {1}
+    assert str(wellbeing["student_id"].dtype) == "category"
+    assert str(wellbeing["stress_level"].dtype) == "Int8"
+
+    submissions = snapshot_service.load_snapshot(str(out_dir), "submission")
+    assert len(submissions) == 4
+    assert submissions["submit_date"].isna().sum() == 2
+
+    with pytest.raises(FileExistsError):
+        snapshot_service.export_snapshot(str(out_dir))
+
+
+def test_export_snapshot_without_pyarrow(seeded_db, tmp_path, monkeypatch, capsys):
+    import sys
+
+    from student_wellbeing_monitor.tools import export_snapshot
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)  # import pyarrow fails
+    monkeypatch.setattr(sys, "argv", ["export-snapshot", "--output", str(tmp_path)])
+
+    with pytest.raises(SystemExit) as exc:
+        export_snapshot.main()
+
+    assert exc.value.code == 1
+    assert "poetry install --extras snapshot" in capsys.readouterr().out
+
+
+# =============================================================================
+# parallel seeding (tools.parallel_seed)
+# =============================================================================
+def test_seed_parallel_matches_files(tmp_path, monkeypatch):
+    from student_wellbeing_monitor.tools import parallel_seed
+
+    monkeypatch.setattr(db_core, "DB_PATH", tmp_path / "student.db")
+    schema.init_db_schema()
+    create.insert_programme("P1", "Computer Science", "CS")
+    for sid in ("1", "2", "3"):
+        create.insert_student(sid, f"Student {sid}", "P1")
+    create.insert_module("10", "Intro", "M10", "P1")
+    for sid in ("1", "2", "3"):
+        create.insert_student_module(sid, "10")
+
+    mock = tmp_path / "mock"
+    mock.mkdir()
+    for week in (1, 2, 3):
+        (mock / f"wellbeing_week{week}.csv").write_text(
+            "student_id,week,stress_level,hours_slept,comment\n"
+            + "".join(f"{sid},{week},{sid},7.5,ok\n" for sid in (1, 2, 3))
+        )
+        (mock / f"attendance_week{week}.csv").write_text(
+            "student_id,module_id,week,attendance_status\n"
+            + "".join(f"{sid},10,{week},1\n" for sid in (1, 2, 3))
+        )
+    (mock / "submissions_M10.csv").write_text(
+        "student_id,module_id,submitted,grade,due_date,submit_date\n"
+        "1,10,1,65,2024-01-10,2024-01-09\n"
+        "2,10,0,,2024-01-10,\n"
+    )
+
+    stats = parallel_seed.seed_parallel(mock, max_week=2, workers=2, batch_rows=2)
+
+    assert {t: s["rows"] for t, s in stats.items()} == {
+        "wellbeing": 6,
+        "attendance": 6,
+        "submission": 2,
+    }
+    assert stats["wellbeing"]["files"] == 3
+    # weeks 1 and 2 hold 3 rows each → 2 + 2 batches; week 3 is filtered out
+    assert {t: s["batches"] for t, s in stats.items()} == {
+        "wellbeing": 4,
+        "attendance": 4,
+        "submission": 1,
+    }
+    conn = db_core.get_conn()
+    try:
+        assert conn.execute("SELECT MAX(week) FROM wellbeing").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 6
+        grades = conn.execute("SELECT grade FROM submission ORDER BY student_id")
+        assert [r[0] for r in grades] == [65.0, None]
+        # risk state and features are refreshed once, after the last batch
+        assert (
+            conn.execute("SELECT COUNT(*) FROM student_risk_state").fetchone()[0] == 3
+        )
+        features = conn.execute(
+            "SELECT student_id, SUM(att_total), SUM(has_wellbeing) "
+            "FROM student_features GROUP BY student_id"
+        ).fetchall()
+        assert [tuple(r) for r in features] == [("1", 2, 2), ("2", 2, 2), ("3", 2, 2)]
+    finally:
+        conn.close()
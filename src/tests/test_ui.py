@@ -92,8 +92,8 @@ def test_upload_page(client):
 # -----------------------
 #  Test: Upload CSV POST
 # -----------------------
-@patch("student_wellbeing_monitor.ui.app.import_csv_by_type")
-def test_upload_csv(mock_import, client):
+@patch("student_wellbeing_monitor.ui.app.import_jobs.submit", return_value="ab" * 16)
+def test_upload_csv(mock_submit, client):
     file_data = (
         BytesIO(b"student_id,week,stress_level,hours_slept\n1,1,3,7\n"),
         "test.csv",
@@ -106,14 +106,27 @@ def test_upload_csv(mock_import, client):
         follow_redirects=False,
     )
 
+    # the request only queues the import and sends the user to its progress
     assert resp.status_code in (302, 303)
-    mock_import.assert_called_once()
+    assert "job=" + "ab" * 16 in resp.headers["Location"]
+    mock_submit.assert_called_once()
+
+
+@patch("student_wellbeing_monitor.ui.app.import_jobs.status")
+def test_import_status_endpoint(mock_status, client):
+    mock_status.return_value = {"jobId": "ab" * 16, "state": "running"}
+    resp = client.get("/imports/" + "ab" * 16)
+    assert resp.status_code == 200
+    assert resp.get_json()["state"] == "running"
+
+    mock_status.return_value = None
+    assert client.get("/imports/unknown").status_code == 404
 
 
 # -----------------------
 #  Test: View data (students)
 # -----------------------
-@patch("student_wellbeing_monitor.ui.app.get_programmes", return_value=[])
+@patch("student_wellbeing_monitor.ui.app.get_programme_map", return_value={})
 @patch("student_wellbeing_monitor.ui.app.count_students", return_value=1)
 @patch("student_wellbeing_monitor.ui.app.get_all_students")
 def test_view_students_table(mock_get, mock_count, mock_prog, client):
@@ -132,6 +145,42 @@ def test_view_students_table(mock_get, mock_count, mock_prog, client):
     assert b"Alice" in resp.data
 
 
+# -----------------------
+#  Test: Full-text search (table + JSON)
+# -----------------------
+@patch("student_wellbeing_monitor.ui.app.search_page")
+def test_search_records(mock_search, client):
+    mock_search.return_value = {
+        "total": 1,
+        "page": 1,
+        "totalPages": 1,
+        "rows": [
+            {
+                "id": 7,
+                "student_id": "1001",
+                "name": "Alice",
+                "week": 3,
+                "stress_level": 5,
+                "hours_slept": 4.0,
+                "snippet": "feeling \x02<overwhelmed>\x03 again",
+            }
+        ],
+    }
+
+    resp = client.get("/data/wellbeing/wellbeing?q=overwhelm")
+    assert resp.status_code == 200
+    assert b'name="q"' in resp.data
+    assert b"<mark>&lt;overwhelmed&gt;</mark>" in resp.data
+    assert mock_search.call_args.args[:2] == ("wellbeing", "overwhelm")
+
+    data = client.get("/search/wellbeing?q=overwhelm").get_json()
+    assert data["total"] == 1
+    assert data["results"][0]["snippet"] == (
+        "feeling <mark>&lt;overwhelmed&gt;</mark> again"
+    )
+    assert client.get("/search/attendance?q=x").status_code == 404
+
+
 # -----------------------
 #  Test: Edit wellbeing GET
 # -----------------------
@@ -192,3 +241,94 @@ def client():
     app.config["TESTING"] = True
     with app.test_client() as client:
         yield client
+
+
+# -----------------------
+#  Test: production preload
+# -----------------------
+def test_serve_preload_compiles_templates(tmp_path, monkeypatch):
+    import gc
+
+    from student_wellbeing_monitor.database import create, db_core, schema
+    from student_wellbeing_monitor.services.dimension_cache import dimension_cache
+    from student_wellbeing_monitor.tools import serve
+
+    monkeypatch.setattr(db_core, "DB_PATH", tmp_path / "student.db")
+    schema.init_db_schema()
+    create.insert_programme("P1", "Computer Science", "CS")
+
+    try:
+        assert serve.preload() is serve.app
+        templates = serve.app.jinja_env.list_templates()
+        assert templates
+        assert len(serve.app.jinja_env.cache) >= len(templates)
+        assert [p["programme_id"] for p in dimension_cache.programmes()] == ["P1"]
+    finally:
+        gc.unfreeze()
+        dimension_cache.clear()
+
+
+# -----------------------
+#  Test: conditional requests
+# -----------------------
+@patch("student_wellbeing_monitor.ui.app.count_students", return_value=1)
+@patch("student_wellbeing_monitor.ui.app.get_all_students")
+def test_view_data_etag_304(mock_get, mock_count, client, monkeypatch):
+    from student_wellbeing_monitor.ui import app as app_module
+
+    versions = {"student": (3, 0, 1_700_000_000.0)}
+    monkeypatch.setattr(app_module, "get_data_versions", lambda: dict(versions))
+    mock_get.return_value = [
+        {
+            "student_id": "1001",
+            "name": "Alice",
+            "email": "alice@test.com",
+            "programme_id": "P1",
+        }
+    ]
+
+    first = client.get("/data/wellbeing")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+    calls = mock_get.call_count
+
+    # unchanged data → 304 without touching the read layer
+    again = client.get("/data/wellbeing", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert mock_get.call_count == calls
+
+    # other filters → other ETag
+    page2 = client.get("/data/wellbeing?page=2")
+    assert page2.headers["ETag"] != etag
+
+    # a write bumps the version → full response again
+    versions["student"] = (4, 0, 1_700_000_100.0)
+    changed = client.get("/data/wellbeing", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+# -----------------------
+#  Test: download data table
+# -----------------------
+@patch("student_wellbeing_monitor.ui.app.stream_export")
+def test_download_data_streams(mock_stream, client):
+    mock_stream.return_value = iter([b"id,student_id\n", b"1,S1\n"])
+
+    resp = client.get("/data/course_leader/attendance/download?student_id=S1&gzip=1")
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/gzip"
+    assert 'filename="attendance.csv.gz"' in resp.headers["Content-Disposition"]
+    assert resp.data == b"id,student_id\n1,S1\n"
+    mock_stream.assert_called_once_with(
+        "attendance", fmt="csv", student_id="S1", sort_week=None, gzip=True
+    )
+
+    assert client.get("/data/course_leader/grades/download").status_code == 404
+    assert (
+        client.get("/data/course_leader/attendance/download?format=xml").status_code
+        == 400
+    )